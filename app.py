@@ -1,19 +1,256 @@
 import streamlit as st
-import pandas as pd  # Importação do pandas para evitar NameError
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-from PIL import Image
-import base64
+import hashlib
 import os
 
+# pandas, pyarrow e plotly só são importados (em get_cube, load_chart_data
+# e load_figure) quando há snapshot e algum gráfico precisa deles; sem
+# snapshot o painel exibe só imagens e não carrega essas bibliotecas
+from pnad import metrics
+from pnad.assets import ImageCache, StaticAssets, encode_file, mime_type
+from pnad.shared import shared_store
+from pnad.snapshot import snapshot_version
+from pnad.variants import VariantManifest
+
+# Modo de entrega das imagens: "static" (URL servida em app/static, com cache
+# no navegador), "inline" (base64 dentro do HTML) ou "auto" (static quando
+# server.enableStaticServing está ativo em .streamlit/config.toml)
+ASSET_MODE = os.environ.get("PNAD_ASSET_MODE", "auto")
+
+# Modo da página: "full" desenha todas as seções, uma após a outra; "lazy"
+# desenha só a seção escolhida no menu lateral
+PAGE_MODE = os.environ.get("PNAD_PAGE_MODE", "full")
+
+# Artefatos compartilhados entre processos (PNAD_SHARED_DIR; pnad/shared.py)
+@st.cache_resource
+def get_shared_store():
+    return shared_store()
+
+# Imagem em base64 no armazém compartilhado: cada imagem tem um espaço
+# próprio, com uma versão por (mtime, tamanho); quando a imagem muda, as
+# versões antigas dela são apagadas
+def encode_shared(store, path, key):
+    namespace = os.path.join("imagens", hashlib.sha256(path.encode()).hexdigest()[:16])
+    version = "-".join(str(part) for part in key)
+    store.prune(namespace, keep=version)
+    return store.text(namespace, version, path, lambda: encode_file(path))
+
+# Cache das imagens em base64, compartilhado entre sessões e reruns (e, no
+# modo de serviço, a codificação é feita por um só processo)
+@st.cache_resource
+def get_image_cache():
+    store = get_shared_store()
+    if store is None:
+        return ImageCache()
+    return ImageCache(encode=lambda path, key: encode_shared(store, path, key))
+
+@st.cache_resource
+def get_static_assets():
+    return StaticAssets()
+
 # Função para carregar e codificar a imagem em base64
 def get_image_as_base64(image_path):
-    if not os.path.exists(image_path):
+    return get_image_cache().get(image_path)
+
+# Variantes AVIF/WebP geradas por `python -m pnad.variants`
+@st.cache_resource
+def get_variant_manifest():
+    return VariantManifest()
+
+def use_static_assets():
+    if ASSET_MODE == "auto":
+        return bool(st.get_option("server.enableStaticServing"))
+    return ASSET_MODE == "static"
+
+# Endereço da imagem para o atributo src: URL estática ou data URI em base64
+def image_src(image_path):
+    cache = get_static_assets() if use_static_assets() else get_image_cache()
+    misses = cache.misses
+    if use_static_assets():
+        src = cache.url(image_path)
+    else:
+        src = get_image_as_base64(image_path)
+    metrics.cache_call("imagens", hit=cache.misses == misses)
+    if not src:
         return ""
-    with open(image_path, "rb") as image_file:
-        encoded = base64.b64encode(image_file.read()).decode()
-    return encoded
+    if use_static_assets():
+        return src
+    metrics.record_image_bytes(len(src))
+    return f"data:{mime_type(image_path)};base64,{src}"
+
+# Largura (px) em que os gráficos são exibidos na coluna central
+LARGURA_EXIBIDA = 800
+
+# No modo static o navegador baixa cada URL uma vez e depois usa o cache
+# dele: os bytes só contam na primeira referência da sessão
+def record_static_image(url, size):
+    sent = st.session_state.setdefault("imagens_enviadas", set())
+    if url not in sent:
+        sent.add(url)
+        metrics.record_image_bytes(size)
+
+# Exibe uma imagem centralizada ou uma mensagem de erro se ela não existir.
+# No modo static, usa as variantes responsivas quando elas já foram geradas
+# e conta os bytes da variante que o navegador escolhe para display_width.
+def show_image(image_path, alt, css_class="graf", sizes=None, display_width=LARGURA_EXIBIDA):
+    src = image_src(image_path)
+    if src:
+        picture = None
+        if use_static_assets():
+            manifest = get_variant_manifest()
+            picture = manifest.picture_html(image_path, alt, css_class, src, sizes=sizes)
+            variant = manifest.chosen_variant(image_path, display_width) if picture else None
+            record_static_image(*(variant or (src, os.path.getsize(image_path))))
+        image_html = f"""
+    <div style="text-align: center;">
+        {picture or f'<img src="{src}" alt="{alt}" class="{css_class}">'}
+    </div>
+    """
+        st.markdown(image_html, unsafe_allow_html=True)
+    else:
+        st.error(f"Imagem não encontrada no caminho: {image_path}")
+
+# Versão do snapshot da PNAD (pnad/snapshot.py), verificada a cada 30 s
+@st.cache_data(ttl=30, show_spinner=False)
+def get_snapshot_version():
+    return snapshot_version()
+
+# Prefixo da versão de um mês usado nas chaves de dados
+TAMANHO_VERSAO_MES = 10
+
+# Versão dos dados que uma combinação de filtros lê no cubo: as versões dos
+# meses filtrados (ou de todos), gravadas com o próprio cubo, separadas por
+# "-". Depois de uma atualização mensal (pnad.refresh), as tabelas e figuras
+# filtradas só por outros meses continuam válidas no cache.
+def data_version(cube, filters):
+    versions = cube.month_versions
+    months = dict(filters).get("data")
+    keys = sorted(f"{m.year:04d}-{m.month:02d}" for m in months) if months else sorted(versions)
+    return "-".join(versions.get(key, "")[:TAMANHO_VERSAO_MES] for key in keys)
+
+# Cubo de agregados (pnad/cube.py), um por versão do snapshot, compartilhado
+# entre as sessões (e entre os processos, no modo de serviço)
+@st.cache_resource(show_spinner="Montando o cubo de agregados...")
+def get_cube(version):
+    from pnad.cube import Cube, cube_for_snapshot
+
+    metrics.cache_miss("cubo")
+    store = get_shared_store()
+    if store is None:
+        return cube_for_snapshot(version)
+
+    def build():
+        import pandas as pd
+
+        cube = cube_for_snapshot(version)
+        months = pd.DataFrame({"mes": list(cube.month_versions), "versao": list(cube.month_versions.values())})
+        return {"tabela": cube.table, "meses": months, "renda": cube.income_bins}
+
+    store.prune("cubo", keep=version)
+    tables = store.frames("cubo", version, "cubo_meses_renda", build)
+    cube = Cube(tables["tabela"], dict(zip(tables["meses"]["mes"], tables["meses"]["versao"])), tables["renda"])
+    # tabelas dos gráficos com algum mês que não está mais no snapshot
+    current = {value[:TAMANHO_VERSAO_MES] for value in cube.month_versions.values()}
+    store.prune("graficos", keep=lambda name: set(name.split("-")) <= current)
+    return cube
+
+# Tabelas dos gráficos para uma combinação de filtros, consultadas no cubo
+# (com weighted, nas medidas ponderadas pelo peso amostral); no modo de
+# serviço, calculadas uma vez para todos os processos. O cache é indexado
+# pela versão dos dados filtrados (data_version); a versão do snapshot
+# (_version, fora da chave) só escolhe o cubo.
+@st.cache_data(show_spinner=False, max_entries=256)
+def load_chart_data(data_key, filters, weighted, _version):
+    from pnad.charts import chart_data
+
+    metrics.cache_miss("tabelas")
+
+    def build():
+        metrics.cache_call("cubo")
+        cube = get_cube(_version)
+        if weighted:
+            cube = cube.weighted()
+        cube = cube.filter(**dict(filters))
+        return chart_data(cube, cube.income_distribution())
+
+    store = get_shared_store()
+    if store is None:
+        return build()
+    return store.frames("graficos", data_key, (filters, weighted), build)
+
+# Figura Plotly pronta, também guardada pela versão dos dados e pelos filtros
+@st.cache_data(show_spinner=False, max_entries=1024)
+def load_figure(name, data_key, filters, weighted, _version):
+    from pnad.charts import build_figure
+
+    metrics.cache_miss("figuras")
+    metrics.cache_call("tabelas")
+    return build_figure(name, load_chart_data(data_key, filters, weighted, _version))
+
+# Filtros do painel na barra lateral; retorna uma tupla de (dimensão, valores)
+def sidebar_filters(version):
+    metrics.cache_call("cubo")
+    cube = get_cube(version)
+    st.sidebar.markdown("### Filtros")
+    selected = {
+        "data": st.sidebar.multiselect("Mês", cube.values("data"), format_func=lambda d: d.strftime("%m/%Y")),
+        "sigla_uf": st.sidebar.multiselect("UF", cube.values("sigla_uf")),
+        "sexo": st.sidebar.multiselect("Sexo", cube.values("sexo")),
+        "faixa_etaria": st.sidebar.multiselect("Faixa etária", cube.values("faixa_etaria")),
+        "escolaridade": st.sidebar.multiselect("Escolaridade", cube.values("escolaridade")),
+    }
+    return tuple((dim, tuple(values)) for dim, values in selected.items() if values)
+
+# Estimativas da população (peso amostral, pnad/weighted.py) em vez de
+# contagens de respondentes, quando o snapshot traz a coluna de peso
+def sidebar_weighting(version):
+    metrics.cache_call("cubo")
+    if not get_cube(version).has_weights:
+        return False
+    weighted = st.sidebar.toggle("Estimativas da população", value=True)
+    st.sidebar.caption(
+        "Com o peso amostral, cada respondente conta pelas pessoas que representa; "
+        "desligado, os gráficos contam respondentes."
+    )
+    return weighted
+
+# Exibe o gráfico interativo calculado a partir do snapshot ou, se não
+# houver snapshot, a imagem estática gerada no notebook
+def show_chart(name, image_path, alt):
+    version = get_snapshot_version()
+    if version is None:
+        show_image(image_path, alt)
+    else:
+        metrics.cache_call("cubo")
+        data_key = data_version(get_cube(version), chart_filters)
+        metrics.cache_call("figuras")
+        st.plotly_chart(load_figure(name, data_key, chart_filters, chart_weighted, version))
+
+# Painel de depuração (PNAD_METRICS=debug): métricas desta execução e das
+# últimas execuções do processo, por seção
+def show_metrics_panel(record):
+    with st.sidebar.expander("Métricas de renderização"):
+        st.caption(
+            f"Execução: {record['total_ms']:.0f} ms, {record['bytes_total'] / 1024:.0f} KiB enviados, "
+            f"RSS {record['rss_mb']:.0f} MB (pico {record['rss_pico_mb']:.0f} MB)"
+        )
+        st.dataframe(
+            [
+                {
+                    "seção": section["secao"],
+                    "ms": section["tempo_ms"],
+                    "KiB": round(section["bytes_total"] / 1024, 1),
+                    "imagens KiB": round(section["imagens_bytes"] / 1024, 1),
+                    "pico RSS MB": section["rss_pico_mb"],
+                    "cache (acertos/faltas)": ", ".join(
+                        f"{name} {counts['hits']}/{counts['misses']}" for name, counts in section["cache"].items()
+                    ),
+                }
+                for section in record["secoes"]
+            ],
+            hide_index=True,
+        )
+        st.caption("Últimas execuções do processo")
+        st.dataframe(metrics.section_stats(), hide_index=True)
 
 # Configuração da página
 st.set_page_config(
@@ -22,6 +259,9 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# Instrumentação desta execução (PNAD_METRICS=log ou debug; pnad/metrics.py)
+metrics.start_run(mode=PAGE_MODE)
+
 # CSS personalizado para Dark Mode com a paleta Dracula e Sidebar estilizado como balão
 dracula_css = """
 <style>
@@ -103,93 +343,100 @@ html {
 
 img {
     max-width: 100%;
+    height: auto;
 }
 </style>
 """
 
 st.markdown(dracula_css, unsafe_allow_html=True)
 
+# Seções do painel, na ordem da página: (âncora, título no menu, nível no
+# menu, função que desenha a seção). O menu lateral e o modo "lazy" usam
+# esta lista.
+SECOES = []
+
+def secao(anchor, label, nivel=0):
+    def register(func):
+        SECOES.append((anchor, label, nivel, func))
+        return func
+    return register
+
+def show_section(anchor, func):
+    with metrics.section(anchor):
+        st.markdown(f"<a id='{anchor}'></a>", unsafe_allow_html=True)
+        func()
+
 # Menu Lateral de Navegação com Links de Âncoras
-st.sidebar.title("Navegação")
-st.sidebar.markdown("""
+def sidebar_links():
+    indent = ' style="margin-left: 10px;"'
+    items = "\n".join(
+        f'    <li{indent if nivel else ""}><a href="#{anchor}">{label}</a></li>'
+        for anchor, label, nivel, _ in SECOES
+    )
+    st.sidebar.markdown(f"""
 <ul style="list-style-type: none; padding: 0;">
-    <li><a href="#introducao">Introdução</a></li>
-    <li><a href="#sintomas-clinicos">Sintomas Clínicos</a></li>
-    <li style="margin-left: 10px;"><a href="#sintomas-faixa-etaria">Por Faixa Etária</a></li>
-    <li style="margin-left: 10px;"><a href="#Distribuição Percentual de Pessoas que Buscaram Ajuda Médica por Sexo">Por Sexo</a></li>
-    <li style="margin-left: 10px;"><a href="#Caracterização dos sintomas clínicos da população">Caracterização</a></li>
-    <li style="margin-left: 10px;"><a href="#Distribuição de Sintomas por Gênero">Por Gênero</a></li>
-    <li><a href="#Nível de Restrição de Contato Social Durante a Pandemia">Restrição de Contato Social</a></li>
-    <li><a href="#Adoção de Home Office Durante a Pandemia">Home Office</a></li>
-    <li><a href="#Distribuição de Renda por Nível de Escolaridade">Renda por Escolaridade</a></li>
-    <li><a href="#Média de Renda por Estado">Renda por Estado</a></li>
-    <li><a href="#Conclusao">Conclusão</a></li>
+{items}
 </ul>
 """, unsafe_allow_html=True)
 
-# Inserir a imagem de capa
-image_path = "images/unsplash.jpg"  # Caminho relativo para a imagem
-encoded_image = get_image_as_base64(image_path)
-
-if encoded_image:
-    cover_image_html = f"""
-    <div style="text-align: center;">
-        <img src="data:image/jpeg;base64,{encoded_image}" alt="Cover Image" class="cover-image">
-    </div>
-    """
-    st.markdown(cover_image_html, unsafe_allow_html=True)
-else:
-    st.error(f"Imagem não encontrada no caminho: {image_path}")
-
-# Espaço para centralizar o conteúdo
-st.markdown("<div class='main-content'>", unsafe_allow_html=True)
-
-# Introdução
-st.markdown("<a id='introducao'></a>", unsafe_allow_html=True)
-st.markdown("<h1 style='text-align: center;'>Análise de Dados COVID-19 - PNAD IBGE</h1>", unsafe_allow_html=True)
-st.markdown("""
+# No modo lazy, o menu escolhe a seção exibida; a escolha fica na URL
+# (?secao=...) para que links e recarregamentos abram a mesma seção. A URL
+# só define a seção inicial da sessão: depois disso o estado do widget
+# (chave fixa) manda, e a URL é atualizada a partir dele.
+def sidebar_section():
+    anchors = [anchor for anchor, _, _, _ in SECOES]
+    labels = {anchor: ("\u2003" * nivel) + label for anchor, label, nivel, _ in SECOES}
+    if "secao" not in st.session_state:
+        current = st.query_params.get("secao")
+        st.session_state["secao"] = current if current in anchors else anchors[0]
+    selected = st.sidebar.radio(
+        "Seção",
+        anchors,
+        key="secao",
+        format_func=labels.get,
+        label_visibility="collapsed",
+    )
+    st.query_params["secao"] = selected
+    return selected
+
+@secao("introducao", "Introdução")
+def secao_introducao():
+    # Imagem de capa
+    show_image("images/unsplash.jpg", "Cover Image", css_class="cover-image", sizes="100vw", display_width=1600)
+
+    st.markdown("<h1 style='text-align: center;'>Análise de Dados COVID-19 - PNAD IBGE</h1>", unsafe_allow_html=True)
+    st.markdown("""
 <div style="text-align: justify;">
 A pandemia de COVID-19, iniciada em 2019, representou um dos maiores desafios de saúde pública da era moderna. Desde os primeiros meses, governos e instituições ao redor do mundo se mobilizaram para monitorar o impacto da doença, tanto em termos clínicos quanto em relação ao comportamento social e econômico da população. No Brasil, o Instituto Brasileiro de Geografia e Estatística (IBGE) desempenhou um papel fundamental ao coletar dados por meio da Pesquisa Nacional por Amostra de Domicílios (PNAD) COVID-19, um levantamento minucioso realizado por telefone. Essa pesquisa visou traçar um panorama abrangente das características de saúde, sociais e econômicas da população brasileira ao longo da pandemia.</div>
 """, unsafe_allow_html=True)
-st.markdown("")
-st.markdown("""
+    st.markdown("")
+    st.markdown("""
 <div style="text-align: justify;">
 Os dados coletados fornecem um vasto acervo para análise, especialmente no que tange à identificação de sintomas clínicos prevalentes, às atitudes adotadas pela população para lidar com a crise, e às repercussões econômicas decorrentes das medidas de isolamento social e distanciamento físico. Esse material é essencial para entender os efeitos multidimensionais da pandemia e, mais importante, para guiar a formulação de estratégias eficazes em caso de futuros surtos de doenças infecciosas.</div>
 """, unsafe_allow_html=True)
-st.markdown("")
-st.markdown("""
+    st.markdown("")
+    st.markdown("""
 <div style="text-align: justify;">
 Esta análise exploratória, foca em três aspectos principais: a caracterização dos sintomas clínicos reportados pela população, o comportamento adotado frente à pandemia, e as características econômicas resultantes do período de crise. A partir dessa análise, serão sugeridas medidas e recomendações que instituições de saúde, como hospitais, podem implementar para otimizar suas respostas a potenciais novas ondas da COVID-19 ou futuras pandemias. A correta compreensão desses fatores permitirá que o sistema de saúde e governo se prepare de forma mais eficiente, adotando ações preventivas e corretivas com base em evidências.
 </div>
 """, unsafe_allow_html=True)
 
-# Separador
-st.markdown("---")
+    # Separador
+    st.markdown("---")
 
-# Análise dos Sintomas Clínicos Relacionados à COVID-19
-st.markdown("<a id='sintomas-clinicos'></a>", unsafe_allow_html=True)
-st.markdown("<h2>Análise dos Sintomas Clínicos Relacionados à COVID-19</h2>", unsafe_allow_html=True)
-st.markdown("""
+@secao("sintomas-clinicos", "Sintomas Clínicos")
+def secao_sintomas_clinicos():
+    st.markdown("<h2>Análise dos Sintomas Clínicos Relacionados à COVID-19</h2>", unsafe_allow_html=True)
+    st.markdown("""
 <div style="text-align: justify;">
 De acordo com a análise exploratória dos dados clínicos selecionados, foram registrados 66.564 casos clínicos relacionados à COVID-19 com respostas afirmativas “SIM” na pesquisa da PNAD COVID-19. Esses números nos permitem entender como os sintomas se distribuíram entre a população durante o período estudado.</div>
 """, unsafe_allow_html=True)
 
-st.markdown("<h3>Distribuição dos Sintomas Clínicos</h3>", unsafe_allow_html=True)
-
-image_path_sintomas = "graficos/graf1.png"
-encoded_image_sintomas = get_image_as_base64(image_path_sintomas)
+    st.markdown("<h3>Distribuição dos Sintomas Clínicos</h3>", unsafe_allow_html=True)
 
-if encoded_image_sintomas:
-    sintomas_image_html = f"""
-    <div style="text-align: center;">
-        <img src="data:image/jpeg;base64,{encoded_image_sintomas}" alt="Sintomas Clínicos" class="graf">
-    </div>
-    """
-    st.markdown(sintomas_image_html, unsafe_allow_html=True)
-else:
-    st.error(f"Imagem não encontrada no caminho: {image_path_sintomas}")
+    show_chart("sintomas", "graficos/graf1.png", "Sintomas Clínicos")
 
-st.markdown("""
+    st.markdown("""
 <div style="text-align: justify;">
 O sintoma mais frequente foi a <strong>tosse</strong>, presente em 29.554 casos, o que corresponde a <strong>44,4%</strong> de todos os quadros clínicos analisados. Este resultado está alinhado com a característica de infecções respiratórias, nas quais a tosse é um dos sinais mais comuns e facilmente perceptíveis, o que a torna um dos primeiros sintomas a ser monitorado em futuras triagens.
 
@@ -201,24 +448,13 @@ Por fim, a <strong>dor nos olhos</strong>, um sintoma menos discutido, foi relat
 </div>
 """, unsafe_allow_html=True)
 
-# Sintomas Clínicos por Faixa Etária
-st.markdown("<a id='sintomas-faixa-etaria'></a>", unsafe_allow_html=True)
-st.markdown("<h2>Sintomas Clínicos por Faixa Etária</h2>", unsafe_allow_html=True)
-
-image_path_sintomas = "graficos/graf2.png"
-encoded_image_sintomas = get_image_as_base64(image_path_sintomas)
+@secao("sintomas-faixa-etaria", "Por Faixa Etária", nivel=1)
+def secao_sintomas_faixa_etaria():
+    st.markdown("<h2>Sintomas Clínicos por Faixa Etária</h2>", unsafe_allow_html=True)
 
-if encoded_image_sintomas:
-    sintomas_image_html = f"""
-    <div style="text-align: center;">
-        <img src="data:image/jpeg;base64,{encoded_image_sintomas}" alt="Sintomas Clínicos" class="graf">
-    </div>
-    """
-    st.markdown(sintomas_image_html, unsafe_allow_html=True)
-else:
-    st.error(f"Imagem não encontrada no caminho: {image_path_sintomas}")
+    show_chart("sintomas_faixa_etaria", "graficos/graf2.png", "Sintomas Clínicos")
 
-st.markdown("""
+    st.markdown("""
 <div style="text-align: justify;">
 O gráfico apresenta a prevalência de sintomas clínicos relacionados à COVID-19, distribuídos em quatro faixas etárias: crianças, adolescentes, adultos e idosos. A tosse é o sintoma mais reportado em todas as faixas etárias, com maior incidência entre os adultos, onde representa aproximadamente 60% dos casos totais observados. Em relação à perda de olfato/paladar, esse sintoma também aparece com destaque entre os adultos, correspondendo a cerca de 20% dos casos registrados nesta faixa etária. Nos idosos, tanto a tosse quanto a perda de olfato/paladar também são significativos, representando juntos cerca de 20% dos casos totais exibidos no gráfico.
 
@@ -228,13 +464,11 @@ No geral, mais de 70% dos casos no gráfico estão associados à tosse, tornando
 </div>
 """, unsafe_allow_html=True)
 
-image_path_sintomas = "graficos/graf3.png"
-encoded_image_sintomas = get_image_as_base64(image_path_sintomas)
-
-st.markdown("<a id='Distribuição Percentual de Pessoas que Buscaram Ajuda Médica por Sexo'></a>", unsafe_allow_html=True)
-st.markdown("<h2>Distribuição Percentual de Pessoas que Buscaram Ajuda Médica por Sexo</h2>", unsafe_allow_html=True)
+@secao("Distribuição Percentual de Pessoas que Buscaram Ajuda Médica por Sexo", "Por Sexo", nivel=1)
+def secao_ajuda_medica_sexo():
+    st.markdown("<h2>Distribuição Percentual de Pessoas que Buscaram Ajuda Médica por Sexo</h2>", unsafe_allow_html=True)
 
-st.markdown("""
+    st.markdown("""
 <p>O gráfico horizontal de barras ilustra a <b>distribuição percentual</b> de pessoas que buscaram ajuda médica, diferenciando entre <b>homens</b> e <b>mulheres</b> durante a pandemia da COVID-19. Ele exibe três categorias principais:</p>
 <ul>
     <li><b>Sim</b> (indivíduos que buscaram ajuda médica),</li>
@@ -261,21 +495,13 @@ Uma pequena porcentagem de respostas foi ignorada para ambos os sexos: <b>1,8% p
 <p>Essa informação pode ser relevante para estratégias futuras de saúde pública, incentivando campanhas de conscientização para que mais pessoas busquem atendimento médico antes que os sintomas se agravem, especialmente em situações de crise sanitária como a pandemia da COVID-19.</p>
 """, unsafe_allow_html=True)
 
+    show_chart("ajuda_medica_sexo", "graficos/graf3.png", "Sintomas Clínicos")
 
-if encoded_image_sintomas:
-    sintomas_image_html = f"""
-    <div style="text-align: center;">
-        <img src="data:image/jpeg;base64,{encoded_image_sintomas}" alt="Sintomas Clínicos" class="graf">
-    </div>
-    """
-    st.markdown(sintomas_image_html, unsafe_allow_html=True)
-else:
-    st.error(f"Imagem não encontrada no caminho: {image_path_sintomas}")
-
-st.markdown("<a id='Caracterização dos sintomas clínicos da população'></a>", unsafe_allow_html=True)
-st.markdown("<h2>Caracterização dos sintomas clínicos da população</h2>", unsafe_allow_html=True)
+@secao("Caracterização dos sintomas clínicos da população", "Caracterização", nivel=1)
+def secao_caracterizacao_sintomas():
+    st.markdown("<h2>Caracterização dos sintomas clínicos da população</h2>", unsafe_allow_html=True)
 
-st.markdown("""
+    st.markdown("""
 O trecho apresenta uma análise sobre a caracterização dos sintomas clínicos mais comuns reportados pela população durante a pandemia da COVID-19. O gráfico destaca quatro sintomas principais: tosse, perda de olfato/paladar, dor nos olhos e dificuldade respiratória.
 
 Entre os sintomas, a tosse é o mais prevalente, com mais de 30.000 casos relatados, sendo significativamente mais comum do que os outros sintomas. Esse dado é importante, pois a tosse foi um dos primeiros e mais amplamente associados à COVID-19, especialmente em casos moderados a graves.
@@ -287,91 +513,49 @@ Além disso, a dificuldade respiratória e a dor nos olhos foram relatadas com f
 Em termos de interpretação, a tosse e a perda de olfato/paladar aparecem como os principais sintomas relacionados à COVID-19. A dificuldade respiratória e a dor nos olhos ocorrem com menos frequência, mas ainda em números consideráveis, ressaltando a importância de se considerar esses sintomas na triagem e no tratamento dos pacientes.
 """, unsafe_allow_html=True)
 
+    show_chart("prevalencia_sintomas", "graficos/graf4.png", "Sintomas Clínicos")
 
-image_path_sintomas = "graficos/graf4.png"
-encoded_image_sintomas = get_image_as_base64(image_path_sintomas)
+@secao("Distribuição de Sintomas por Gênero", "Por Gênero", nivel=1)
+def secao_sintomas_genero():
+    st.markdown("<h2>Distribuição de Sintomas por Gênero</h2>", unsafe_allow_html=True)
 
-if encoded_image_sintomas:
-    sintomas_image_html = f"""
-    <div style="text-align: center;">
-        <img src="data:image/jpeg;base64,{encoded_image_sintomas}" alt="Sintomas Clínicos" class="graf">
-    </div>
-    """
-    st.markdown(sintomas_image_html, unsafe_allow_html=True)
-else:
-    st.error(f"Imagem não encontrada no caminho: {image_path_sintomas}")
-
-st.markdown("<a id='Distribuição de Sintomas por Gênero'></a>", unsafe_allow_html=True)
-st.markdown("<h2>Distribuição de Sintomas por Gênero</h2>", unsafe_allow_html=True)
-
-st.markdown("""
+    st.markdown("""
 <p>O gráfico exibe a <b>frequência de sintomas</b> relatados por homens e mulheres durante a pandemia. A <b>tosse</b> é o sintoma mais frequente entre ambos os gêneros, com uma prevalência maior entre as mulheres. Outros sintomas, como <b>perda de olfato/paladar</b> e <b>dor nos olhos</b>, também aparecem mais frequentemente nas mulheres, enquanto a <b>dificuldade respiratória</b> foi reportada com menor frequência em ambos os grupos, embora mais comum entre as mulheres.</p>
 
 <p>Esses dados sugerem uma maior prevalência de sintomas entre as mulheres, indicando que elas podem ter sido mais afetadas ou estavam mais propensas a relatar esses sintomas em comparação aos homens.</p>
 """, unsafe_allow_html=True)
 
-image_path_sintomas = "graficos/graf5.png"
-encoded_image_sintomas = get_image_as_base64(image_path_sintomas)
-
-if encoded_image_sintomas:
-    sintomas_image_html = f"""
-    <div style="text-align: center;">
-        <img src="data:image/jpeg;base64,{encoded_image_sintomas}" alt="Distribuição de Sintomas por Gênero" class="graf">
-    </div>
-    """
-    st.markdown(sintomas_image_html, unsafe_allow_html=True)
-else:
-    st.error(f"Imagem não encontrada no caminho: {image_path_sintomas}")
-
+    show_chart("sintomas_sexo", "graficos/graf5.png", "Distribuição de Sintomas por Gênero")
 
-st.markdown("<a id='Nível de Restrição de Contato Social Durante a Pandemia'></a>", unsafe_allow_html=True)
-st.markdown("<h2>Nível de Restrição de Contato Social Durante a Pandemia</h2>", unsafe_allow_html=True)
+@secao("Nível de Restrição de Contato Social Durante a Pandemia", "Restrição de Contato Social")
+def secao_restricao():
+    st.markdown("<h2>Nível de Restrição de Contato Social Durante a Pandemia</h2>", unsafe_allow_html=True)
 
-st.markdown("""
+    st.markdown("""
 <p>Este gráfico apresenta os diferentes níveis de <b>restrição de contato social</b> adotados pela população durante a pandemia. Uma grande parte dos respondentes (<b>mais de 700.000</b>) não especificou seu nível de restrição. Entre os que responderam, a maioria afirmou que <b>ficou em casa e só saiu em casos de necessidade</b>, seguida por aqueles que <b>reduziram o contato social</b>, mas continuaram saindo para atividades essenciais.</p>
 
 <p>Apenas uma pequena parte da população <b>não fez restrição</b> e levou uma vida normal, enquanto um número ainda menor ficou <b>rigorosamente em casa</b> sem sair.</p>
 """, unsafe_allow_html=True)
 
-image_path_sintomas = "graficos/graf6.png"
-encoded_image_sintomas = get_image_as_base64(image_path_sintomas)
+    show_chart("restricao", "graficos/graf6.png", "Nível de Restrição de Contato Social")
 
-if encoded_image_sintomas:
-    sintomas_image_html = f"""
-    <div style="text-align: center;">
-        <img src="data:image/jpeg;base64,{encoded_image_sintomas}" alt="Nível de Restrição de Contato Social" class="graf">
-    </div>
-    """
-    st.markdown(sintomas_image_html, unsafe_allow_html=True)
-else:
-    st.error(f"Imagem não encontrada no caminho: {image_path_sintomas}")
-
-st.markdown("<a id='Adoção de Home Office Durante a Pandemia'></a>", unsafe_allow_html=True)
-st.markdown("<h2>Adoção de Home Office Durante a Pandemia</h2>", unsafe_allow_html=True)
+@secao("Adoção de Home Office Durante a Pandemia", "Home Office")
+def secao_home_office():
+    st.markdown("<h2>Adoção de Home Office Durante a Pandemia</h2>", unsafe_allow_html=True)
 
-st.markdown("""
+    st.markdown("""
 <p>O gráfico a seguir mostra a <b>adoção do home office</b> durante a pandemia. A maioria das pessoas classificadas como "Não aplicável" sugere que suas ocupações não permitiam a modalidade de trabalho remoto. Apenas uma pequena parcela da população conseguiu adotar o home office, com um número ligeiramente maior indicando que o trabalho remoto não foi uma opção viável para elas.</p>
 
 <p>Esses dados refletem a limitação do home office a setores específicos, enquanto grande parte da população, que atua em setores onde o trabalho remoto não era aplicável, continuou operando de forma presencial ou em atividades que não permitiam essa flexibilidade.</p>
 """, unsafe_allow_html=True)
 
-image_path_sintomas = "graficos/graf7.png"
-encoded_image_sintomas = get_image_as_base64(image_path_sintomas)
-
-if encoded_image_sintomas:
-    sintomas_image_html = f"""
-    <div style="text-align: center;">
-        <img src="data:image/jpeg;base64,{encoded_image_sintomas}" alt="Adoção de Home Office" class="graf">
-    </div>
-    """
-    st.markdown(sintomas_image_html, unsafe_allow_html=True)
-else:
-    st.error(f"Imagem não encontrada no caminho: {image_path_sintomas}")
+    show_chart("home_office", "graficos/graf7.png", "Adoção de Home Office")
 
-st.markdown("<a id='Média de Renda por Estado'></a>", unsafe_allow_html=True)
-st.markdown("<h2>Média de Renda por Estado</h2>", unsafe_allow_html=True)
+@secao("Média de Renda por Estado", "Renda por Estado")
+def secao_renda_uf():
+    st.markdown("<h2>Média de Renda por Estado</h2>", unsafe_allow_html=True)
 
-st.markdown("""
+    st.markdown("""
 <p>O gráfico a seguir apresenta a <b>média de renda</b> por estado no Brasil, destacando as diferenças econômicas entre as diversas regiões do país. Essa análise fornece uma visão clara das disparidades de renda entre os estados, com alguns estados tendo uma média significativamente maior que outros.</p>
 
 <h3>Principais Observações:</h3>
@@ -393,23 +577,13 @@ Os estados do <b>Centro-Oeste</b>, como <b>Mato Grosso (MT)</b> e <b>Goiás (GO)
 <p>O gráfico destaca as <b>disparidades econômicas regionais</b> no Brasil, com o <b>Distrito Federal</b> e os estados do <b>Sudeste</b> e <b>Sul</b> liderando com as maiores médias de renda. Essas regiões concentram a maior parte das oportunidades de emprego em setores que pagam melhor, como o setor público, tecnologia, serviços e indústrias. Por outro lado, os estados do <b>Norte</b> e <b>Nordeste</b> continuam apresentando médias de renda mais baixas, reflexo de uma economia baseada em setores menos valorizados no mercado de trabalho.</p>
 """, unsafe_allow_html=True)
 
-image_path_sintomas = "graficos/graf9.png"
-encoded_image_sintomas = get_image_as_base64(image_path_sintomas)
+    show_chart("renda_uf", "graficos/graf9.png", "Média de Renda por Estado")
 
-if encoded_image_sintomas:
-    sintomas_image_html = f"""
-    <div style="text-align: center;">
-        <img src="data:image/jpeg;base64,{encoded_image_sintomas}" alt="Média de Renda por Estado" class="graf">
-    </div>
-    """
-    st.markdown(sintomas_image_html, unsafe_allow_html=True)
-else:
-    st.error(f"Imagem não encontrada no caminho: {image_path_sintomas}")
-
-st.markdown("<a id='Distribuição de Renda por Nível de Escolaridade'></a>", unsafe_allow_html=True)
-st.markdown("<h2>Distribuição de Renda por Nível de Escolaridade</h2>", unsafe_allow_html=True)
+@secao("Distribuição de Renda por Nível de Escolaridade", "Renda por Escolaridade")
+def secao_renda_escolaridade():
+    st.markdown("<h2>Distribuição de Renda por Nível de Escolaridade</h2>", unsafe_allow_html=True)
 
-st.markdown("""O trecho de código apresenta a seguinte análise sobre a distribuição de renda por nível de escolaridade no Brasil. Ele evidencia como a renda é predominantemente concentrada em valores mais baixos, especialmente entre aqueles com menor escolaridade, enquanto há uma variação significativa entre os indivíduos com educação superior.
+    st.markdown("""O trecho de código apresenta a seguinte análise sobre a distribuição de renda por nível de escolaridade no Brasil. Ele evidencia como a renda é predominantemente concentrada em valores mais baixos, especialmente entre aqueles com menor escolaridade, enquanto há uma variação significativa entre os indivíduos com educação superior.
 
 No gráfico, observamos que a maior parte da população, independentemente do nível de escolaridade, possui renda abaixo de Reais 5.000. Esse fenômeno é mais evidente nos grupos com Sem Instrução e Fundamental Incompleto, onde praticamente não há dispersão para faixas de renda mais altas. Já os grupos com Pós-graduação e Superior Completo apresentam uma maior dispersão de renda, com uma parte significativa atingindo valores superiores a R$ 10.000, refletindo melhores oportunidades de trabalho e remunerações para indivíduos com maior qualificação.
 
@@ -419,23 +593,13 @@ Em conclusão, a distribuição da renda no Brasil está fortemente ligada ao n
 
 O gráfico ilustrativo da distribuição de renda acompanha essa análise, mas, caso o arquivo da imagem não seja encontrado, será exibida uma mensagem de erro.""", unsafe_allow_html=True)
 
-image_path_sintomas = "graficos/graf10.png"
-encoded_image_sintomas = get_image_as_base64(image_path_sintomas)
-
-if encoded_image_sintomas:
-    sintomas_image_html = f"""
-    <div style="text-align: center;">
-        <img src="data:image/jpeg;base64,{encoded_image_sintomas}" alt="Distribuição de Renda por Nível de Escolaridade" class="graf">
-    </div>
-    """
-    st.markdown(sintomas_image_html, unsafe_allow_html=True)
-else:
-    st.error(f"Imagem não encontrada no caminho: {image_path_sintomas}")
+    show_chart("renda_escolaridade", "graficos/graf10.png", "Distribuição de Renda por Nível de Escolaridade")
 
-st.markdown("<a id='Conclusao Geral'></a>", unsafe_allow_html=True)
-st.markdown("<h2>Conclusão Geral</h2>", unsafe_allow_html=True)
+@secao("Conclusao", "Conclusão")
+def secao_conclusao():
+    st.markdown("<h2>Conclusão Geral</h2>", unsafe_allow_html=True)
 
-st.markdown("""
+    st.markdown("""
 Com base na análise dos dados da PNAD COVID-19, é evidente que a prevalência de sintomas como tosse, dificuldade respiratória, dor nos olhos e perda de olfato/paladar variou significativamente entre as diferentes faixas etárias e regiões do Brasil. Essa variação demonstra a importância de uma preparação diferenciada e direcionada por parte do governo e dos hospitais para lidar com futuras crises de saúde pública.
 
 Uma das principais lições aprendidas é que a resposta a uma pandemia não pode ser padronizada para todo o país, uma vez que algumas regiões foram significativamente mais afetadas por sintomas graves, como dificuldade respiratória, enquanto outras apresentaram sintomas mais leves. No futuro, o governo deve priorizar o desenvolvimento de planos de contingência regionais, levando em consideração as diferenças demográficas e de infraestrutura entre os estados. Um sistema de vigilância epidemiológica mais robusto, com monitoramento contínuo dos dados regionais em tempo real, permitirá respostas mais rápidas e adequadas.
@@ -447,5 +611,27 @@ Outro ponto essencial é o uso de tecnologia para aprimorar a gestão de dados e
 Por fim, a pandemia evidenciou a importância de se manter uma reserva estratégica de equipamentos médicos e medicamentos essenciais, como ventiladores e EPI’s, principalmente em locais onde a demanda por atendimento pode crescer rapidamente. Com essas medidas, o Brasil estará mais preparado para enfrentar futuras emergências de saúde, minimizando os impactos sociais e econômicos, e salvando mais vidas.
 """, unsafe_allow_html=True)
 
+st.sidebar.title("Navegação")
+selected_section = sidebar_section() if PAGE_MODE == "lazy" else None
+if selected_section is None:
+    sidebar_links()
+
+# Filtros aplicados aos gráficos calculados a partir do snapshot
+chart_filters = ()
+chart_weighted = False
+if get_snapshot_version() is not None:
+    chart_filters = sidebar_filters(get_snapshot_version())
+    chart_weighted = sidebar_weighting(get_snapshot_version())
+
+# Espaço para centralizar o conteúdo
+st.markdown("<div class='main-content'>", unsafe_allow_html=True)
+
+for anchor, _, _, func in SECOES:
+    if selected_section in (None, anchor):
+        show_section(anchor, func)
 
 st.markdown("</div>", unsafe_allow_html=True)
+
+run_metrics = metrics.finish_run()
+if run_metrics is not None and metrics.METRICS_MODE == "debug":
+    show_metrics_panel(run_metrics)
@@ -0,0 +1,403 @@
+# Benchmarks do pipeline de dados e da renderização do painel.
+#
+# Para cada tamanho de extrato sintético (benchmarks/synthetic.py), mede
+# tempo e pico de memória dos estágios:
+#   carga        - extrato em Parquet lido com pandas, como no notebook, e
+#                  snapshot lido com pnad.snapshot
+#   codificacao  - gravação do snapshot em lotes (pnad.ingest) e máscara de
+#                  sintomas / faixas etárias
+#   agregacao    - operações do notebook (somas de sintomas, pd.cut por
+#                  faixa etária, renda média por UF, histogramas e KDE por
+#                  escolaridade) e os equivalentes do pacote pnad (contagem
+#                  de sintomas, cubo, distribuição de renda) e as
+#                  estimativas ponderadas (pnad.weighted) ao lado das mesmas
+#                  somas com groupby do pandas
+#   renderizacao - tabelas e figuras Plotly de todos os gráficos e uma
+#                  execução completa do app.py (primeira, rerun e rerun com
+#                  filtro) em outro processo
+# O pico de memória é o maior RSS durante o estágio menos o RSS no início
+# (amostrado em uma thread, o que inclui memória do Arrow e do numpy).
+#
+# Uso (na raiz do repositório):
+#   python -m benchmarks.pipeline [--tamanhos 100k,1m,10m] [--estagios carga,agregacao]
+#                                 [--save] [--check] [--json resultado.json]
+# --save grava os resultados em benchmarks/baseline.json; --check compara
+# com essa referência e falha se algum estágio piorar mais que TOLERANCIA.
+import gc
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import DADOS_DIR, extract_path
+from pnad.aggregates import DIMENSOES, age_band_codes, count_symptoms, symptom_mask
+from pnad.charts import FIGURES, build_figure, chart_data
+from pnad.cube import COLUNAS_CUBO, build_cube
+from pnad.income import income_distribution
+from pnad.ingest import ingest
+from pnad.schema import SINTOMAS
+from pnad.snapshot import read_snapshot
+from pnad.weighted import PESO, weighted_aggregates
+
+TAMANHOS = {"100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+# Piora aceita em relação à referência (e folga absoluta, para estágios
+# curtos demais para medir com precisão)
+TOLERANCIA = 0.25
+FOLGA_S = 0.05
+FOLGA_MB = 16
+
+# Colunas que o notebook usa nas análises
+COLUNAS_NOTEBOOK = [
+    "sigla_uf",
+    "idade",
+    "sexo",
+    "escolaridade",
+    *SINTOMAS,
+    "renda",
+    "buscou_ajuda_medica",
+    "restringiu_contato_com_pessoas",
+    "home_office",
+]
+
+
+def _rss_mb():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+# Devolve ao sistema a memória já liberada pelo Python e pelo Arrow, para
+# que o RSS no início de um estágio não inclua sobras do anterior
+def _release_memory():
+    import ctypes
+
+    import pyarrow as pa
+
+    gc.collect()
+    pa.default_memory_pool().release_unused()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class PeakMemory:
+    # Maior RSS acima do valor inicial enquanto o bloco executa (peak_mb) e
+    # maior RSS absoluto (max_mb)
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self.max_mb = 0.0
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._max = max(self._max, _rss_mb())
+
+    def __enter__(self):
+        _release_memory()
+        self._start = self._max = _rss_mb()
+        self._maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        peak = max(self._max, _rss_mb())
+        # o pico do processo só sobe se este bloco passou do pico anterior
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        if maxrss > self._maxrss:
+            peak = max(peak, maxrss)
+        self.peak_mb = peak - self._start
+        self.max_mb = peak
+
+
+# Estágios do notebook, sobre o extrato lido com pandas
+
+def carga_extrato(ctx):
+    ctx["extrato"] = pd.read_parquet(ctx["extrato_path"], columns=COLUNAS_NOTEBOOK)
+
+
+def notebook_sintomas(ctx):
+    df = ctx["extrato"]
+    [(df[col] == "Sim").sum() for col in SINTOMAS]
+    df.groupby("sexo")[SINTOMAS].apply(lambda x: (x == "Sim").sum())
+
+
+def notebook_faixa_etaria(ctx):
+    df = ctx["extrato"]
+    filtered = df[["idade", *SINTOMAS]].map(lambda x: 1 if x == "Sim" else 0)
+    filtered["idade"] = pd.to_numeric(df["idade"], errors="coerce")
+    filtered = filtered.dropna(subset=["idade"])
+    filtered["faixa_etaria"] = pd.cut(
+        filtered["idade"],
+        bins=[0, 12, 17, 59, np.inf],
+        labels=["Crianças", "Adolescentes", "Adultos", "Idosos"],
+        right=False,
+    )
+    filtered.groupby("faixa_etaria", observed=False).sum()
+
+
+def notebook_renda_uf(ctx):
+    ctx["extrato"].groupby("sigla_uf")["renda"].mean()
+
+
+# Histograma de 50 faixas e KDE (a mesma do seaborn, avaliada em 200
+# pontos) por escolaridade, sobre todas as linhas
+def notebook_histogramas(ctx):
+    from seaborn.external.kde import gaussian_kde
+
+    df = ctx["extrato"]
+    df = df[df["renda"] <= 100000]
+    for _, renda in df.groupby("escolaridade")["renda"]:
+        values = renda.to_numpy()
+        np.histogram(values, bins=50)
+        gaussian_kde(values).evaluate(np.linspace(values.min(), values.max(), 200))
+
+
+# Estágios do pacote pnad, sobre o snapshot
+
+def codificacao_snapshot(ctx):
+    ingest(ctx["extrato_path"], aggregators=[], snapshot_root=ctx["snapshot"])
+    ctx["snapshot_gravado"] = True
+
+
+def carga_snapshot(ctx):
+    ctx["dados"] = read_snapshot(columns=[*COLUNAS_CUBO, PESO], root=ctx["snapshot"])
+
+
+def codificacao_mascara(ctx):
+    symptom_mask(ctx["dados"])
+    age_band_codes(ctx["dados"]["idade"])
+
+
+def agregacao_sintomas(ctx):
+    counts = count_symptoms(ctx["dados"], DIMENSOES)
+    counts.total()
+    counts.by("faixa_etaria")
+    counts.by("sexo")
+
+
+def agregacao_cubo(ctx):
+    ctx["cubo"] = build_cube(ctx["dados"])
+
+
+def agregacao_renda(ctx):
+    distribution = income_distribution(ctx["dados"])
+    distribution.quantile_table()
+    for group in distribution.groups:
+        distribution.histogram(group)
+        distribution.kde(group)
+    ctx["renda"] = distribution
+
+
+# Proporções de buscou_ajuda_medica e home_office por sexo e renda média
+# por UF, ponderadas e com erro padrão
+def agregacao_ponderada(ctx):
+    aggregates = weighted_aggregates(
+        ctx["dados"], ("sexo", "sigla_uf"), categoricas=["buscou_ajuda_medica", "home_office"], numericas=["renda"]
+    )
+    aggregates.proportions("buscou_ajuda_medica", "sexo")
+    aggregates.proportions("home_office", "sexo")
+    aggregates.means("renda", "sigla_uf")
+
+
+# As mesmas somas (Σw, Σw², Σwy, ...) com colunas derivadas e groupby
+def pandas_ponderada(ctx):
+    df = ctx["dados"]
+    w = df[PESO]
+    for col in ("buscou_ajuda_medica", "home_office"):
+        pd.DataFrame({"sexo": df["sexo"], col: df[col], "w": w, "w2": w**2}).groupby(
+            ["sexo", col], observed=True
+        ).agg(n=("w", "size"), w=("w", "sum"), w2=("w2", "sum"))
+    valid = df["renda"].notna()
+    renda = df.loc[valid, "renda"]
+    wv = w[valid]
+    pd.DataFrame({
+        "sigla_uf": df.loc[valid, "sigla_uf"],
+        "w": wv,
+        "w2": wv**2,
+        "wy": wv * renda,
+        "w2y": wv**2 * renda,
+        "w2y2": (wv * renda) ** 2,
+    }).groupby("sigla_uf", observed=True).sum()
+
+
+def renderizacao_figuras(ctx):
+    data = chart_data(ctx["cubo"], ctx["renda"])
+    for name in FIGURES:
+        build_figure(name, data).to_json()
+
+
+# (grupo, nome, função, chaves de ctx lidas, chave de ctx produzida)
+ESTAGIOS = [
+    ("carga", "extrato_pandas", carga_extrato, [], "extrato"),
+    ("agregacao", "notebook_sintomas", notebook_sintomas, ["extrato"], None),
+    ("agregacao", "notebook_faixa_etaria", notebook_faixa_etaria, ["extrato"], None),
+    ("agregacao", "notebook_renda_uf", notebook_renda_uf, ["extrato"], None),
+    ("agregacao", "notebook_histogramas", notebook_histogramas, ["extrato"], None),
+    ("codificacao", "snapshot", codificacao_snapshot, [], "snapshot_gravado"),
+    ("carga", "snapshot", carga_snapshot, ["snapshot_gravado"], "dados"),
+    ("codificacao", "mascara", codificacao_mascara, ["dados"], None),
+    ("agregacao", "sintomas", agregacao_sintomas, ["dados"], None),
+    ("agregacao", "cubo", agregacao_cubo, ["dados"], "cubo"),
+    ("agregacao", "renda", agregacao_renda, ["dados"], "renda"),
+    ("agregacao", "ponderada", agregacao_ponderada, ["dados"], None),
+    ("agregacao", "pandas_ponderada", pandas_ponderada, ["dados"], None),
+    ("renderizacao", "figuras", renderizacao_figuras, ["cubo", "renda"], None),
+]
+
+
+# Estágios a executar para os grupos pedidos: os pedidos e os que produzem
+# o que eles leem (esses rodam, mas não entram no resultado)
+def plan(groups):
+    producers = {writes: i for i, (_, _, _, _, writes) in enumerate(ESTAGIOS) if writes}
+    needed = {i for i, (group, *_rest) in enumerate(ESTAGIOS) if group in groups}
+    if "renderizacao" in groups:
+        needed.add(producers["snapshot_gravado"])
+    pending = list(needed)
+    while pending:
+        for key in ESTAGIOS[pending.pop()][3]:
+            if producers[key] not in needed:
+                needed.add(producers[key])
+                pending.append(producers[key])
+    return sorted(needed)
+
+
+# Processo filho: primeira execução do app.py, rerun e rerun com filtro
+def app_child():
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=3600)
+    # ru_maxrss não serve aqui: no Linux o pico herdado do processo pai
+    # sobrevive ao exec, então o pico é amostrado
+    runs = [
+        ("app_primeira", at.run),
+        ("app_rerun", at.run),
+        ("app_filtro", lambda: at.sidebar.multiselect[1].select("SP").run()),
+    ]
+    for name, run in runs:
+        with PeakMemory() as memory:
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+        results[name] = {"tempo_s": round(elapsed, 3), "pico_mb": round(memory.max_mb, 1)}
+    print(json.dumps({"resultados": results, "erros": [str(e.value) for e in at.exception]}))
+
+
+def run_app(snapshot, workdir):
+    env = dict(os.environ, PNAD_SNAPSHOT_DIR=snapshot, PNAD_CUBE_PATH=os.path.join(workdir, "cubo.parquet"))
+    env.pop("PNAD_METRICS", None)
+    process = subprocess.run(
+        [sys.executable, "-m", "benchmarks.pipeline", "--app-child"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    if result["erros"]:
+        raise RuntimeError(f"app.py falhou: {result['erros']}")
+    return result["resultados"]
+
+
+def run_size(n, groups):
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="pnad-bench-")
+    ctx = {"extrato_path": extract_path(n), "snapshot": os.path.join(workdir, "snapshot")}
+    steps = plan(groups)
+    try:
+        for position, index in enumerate(steps):
+            group, name, stage, _, _ = ESTAGIOS[index]
+            with PeakMemory() as memory:
+                start = time.perf_counter()
+                stage(ctx)
+                elapsed = time.perf_counter() - start
+            if group in groups:
+                results[f"{group}/{name}"] = {"tempo_s": round(elapsed, 3), "pico_mb": round(memory.peak_mb, 1)}
+                print(f"  {group}/{name}: {elapsed:.3f} s, {memory.peak_mb:.0f} MB", flush=True)
+            # libera o que nenhum estágio seguinte lê
+            still_read = {key for later in steps[position + 1 :] for key in ESTAGIOS[later][3]}
+            for key in ("extrato", "dados", "cubo", "renda"):
+                if key not in still_read:
+                    ctx.pop(key, None)
+        ctx.clear()
+        gc.collect()
+        if "renderizacao" in groups:
+            for name, result in run_app(os.path.join(workdir, "snapshot"), workdir).items():
+                results[f"renderizacao/{name}"] = result
+                print(f"  renderizacao/{name}: {result['tempo_s']:.3f} s, {result['pico_mb']:.0f} MB (processo)", flush=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def check(results, baseline):
+    problems = []
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            reference = baseline.get(size, {}).get(stage)
+            if not reference:
+                continue
+            if result["tempo_s"] > reference["tempo_s"] * (1 + TOLERANCIA) + FOLGA_S:
+                problems.append(f"{size} {stage}: {result['tempo_s']} s (referência {reference['tempo_s']} s)")
+            if result["pico_mb"] > reference["pico_mb"] * (1 + TOLERANCIA) + FOLGA_MB:
+                problems.append(f"{size} {stage}: {result['pico_mb']} MB (referência {reference['pico_mb']} MB)")
+    return problems
+
+
+def _option(args, name, default):
+    if name in args:
+        return args[args.index(name) + 1]
+    return default
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--app-child" in args:
+        app_child()
+        sys.exit()
+    sizes = _option(args, "--tamanhos", ",".join(TAMANHOS)).split(",")
+    groups = _option(args, "--estagios", "carga,codificacao,agregacao,renderizacao").split(",")
+    unknown = [size for size in sizes if size not in TAMANHOS]
+    if unknown:
+        sys.exit(f"tamanhos desconhecidos: {', '.join(unknown)} (disponíveis: {', '.join(TAMANHOS)})")
+
+    results = {}
+    for size in sizes:
+        print(f"{size} linhas (dados em {DADOS_DIR})", flush=True)
+        results[size] = run_size(TAMANHOS[size], groups)
+
+    if "--json" in args:
+        with open(_option(args, "--json", None), "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE, encoding="utf-8") as f:
+            baseline = json.load(f)
+    if "--save" in args:
+        for size, stages in results.items():
+            baseline.setdefault(size, {}).update(stages)
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+    if "--check" in args:
+        problems = check(results, baseline)
+        if problems:
+            sys.exit("regressão em relação a benchmarks/baseline.json:\n  " + "\n  ".join(problems))
+        print("todos os estágios dentro da referência")
@@ -0,0 +1,178 @@
+# Benchmark de partida a frio do painel.
+#
+# Roda a primeira renderização do app.py (streamlit.testing.AppTest) em um
+# processo novo com `python -X importtime` e mede:
+#   - tempo de import por pacote de primeiro nível (só o que o app.py
+#     importa além do próprio streamlit);
+#   - tempo da primeira renderização;
+#   - RSS antes e depois da renderização e o pico de RSS.
+# Também confere que bibliotecas pesadas que a página não usa (PESADAS) não
+# foram carregadas no cenário sem snapshot. O próprio streamlit já importa
+# PIL e plotly antes do marcador, então essas não apareceriam como
+# carregadas pela página: os módulos pnad que o app.py importa no topo são
+# conferidos também em um processo sem o streamlit.
+#
+# Uso:
+#   python benchmarks/startup.py                  # relatório em JSON
+#   python benchmarks/startup.py --save           # grava a referência
+#   python benchmarks/startup.py --check          # falha se piorar mais que TOLERANCIA
+#   python benchmarks/startup.py --snapshot DIR   # cenário com snapshot (gráficos Plotly)
+import ast
+import importlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, "benchmarks", "startup_baseline.json")
+
+# Bibliotecas que a página sem snapshot não deve importar
+PESADAS = ["pandas", "pyarrow", "matplotlib", "seaborn", "PIL", "plotly"]
+
+# Piora aceita em relação à referência antes de --check falhar
+TOLERANCIA = 0.25
+
+MARCADOR = "--- startup: app ---"
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _rss_mb():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+# Executado no processo filho: importa o streamlit (base, fora da medida),
+# marca o stderr e renderiza o app uma vez
+def child():
+    import resource
+    import time
+
+    from streamlit.testing.v1 import AppTest
+
+    before = set(sys.modules)
+    rss_before = _rss_mb()
+    print(MARCADOR, file=sys.stderr, flush=True)
+    start = time.perf_counter()
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=600).run()
+    elapsed = time.perf_counter() - start
+    loaded = sorted({name.split(".")[0] for name in set(sys.modules) - before})
+    result = {
+        "primeira_renderizacao_s": round(elapsed, 3),
+        "rss_antes_mb": round(rss_before, 1),
+        "rss_depois_mb": round(_rss_mb(), 1),
+        "rss_pico_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "pacotes_carregados": loaded,
+        "excecoes": [str(e.value) for e in at.exception],
+    }
+    print(json.dumps(result))
+
+
+# Módulos do pacote pnad importados no topo do app.py
+def app_modules():
+    with open(os.path.join(ROOT, "app.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return [
+        node.module for node in tree.body if isinstance(node, ast.ImportFrom) and node.module.startswith("pnad")
+    ]
+
+
+# Executado em outro processo filho, sem o streamlit: pacotes de primeiro
+# nível carregados pelos módulos pnad do app.py
+def child_modules():
+    sys.path.insert(0, ROOT)
+    before = set(sys.modules)
+    for name in app_modules():
+        importlib.import_module(name)
+    print(json.dumps(sorted({name.split(".")[0] for name in set(sys.modules) - before})))
+
+
+# Soma o tempo próprio (self) dos imports feitos depois do marcador, por
+# pacote de primeiro nível
+def parse_importtime(stderr):
+    _, _, after = stderr.partition(MARCADOR)
+    per_package = {}
+    for line in after.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            package = match.group(4).split(".")[0]
+            per_package[package] = per_package.get(package, 0) + int(match.group(1))
+    return {package: round(us / 1000, 1) for package, us in sorted(per_package.items(), key=lambda item: -item[1])}
+
+
+def run(snapshot=None):
+    env = dict(os.environ)
+    # sem snapshot: aponta para um diretório vazio para não usar dados/ local
+    env["PNAD_SNAPSHOT_DIR"] = snapshot or tempfile.mkdtemp(prefix="pnad-startup-")
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(process.stderr)
+    result["imports_ms"] = round(sum(imports.values()), 1)
+    result["imports_por_pacote_ms"] = dict(list(imports.items())[:15])
+    result["cenario"] = "com snapshot" if snapshot else "sem snapshot"
+    if not snapshot:
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child-modules"],
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result["pacotes_modulos_pnad"] = json.loads(process.stdout.strip().splitlines()[-1])
+    return result
+
+
+def check(result, baseline):
+    problems = []
+    if result["excecoes"]:
+        problems.append(f"exceções na renderização: {result['excecoes']}")
+    if result["cenario"] == "sem snapshot":
+        loaded = set(result["pacotes_carregados"]) | set(result.get("pacotes_modulos_pnad", []))
+        heavy = [name for name in PESADAS if name in loaded]
+        if heavy:
+            problems.append(f"bibliotecas pesadas importadas sem snapshot: {', '.join(heavy)}")
+    for key in ("imports_ms", "primeira_renderizacao_s", "rss_pico_mb"):
+        reference = baseline.get(key)
+        if reference and result[key] > reference * (1 + TOLERANCIA):
+            problems.append(f"{key}: {result[key]} (referência {reference}, tolerância {TOLERANCIA:.0%})")
+    return problems
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--child" in args:
+        child()
+        sys.exit()
+    if "--child-modules" in args:
+        child_modules()
+        sys.exit()
+    snapshot = args[args.index("--snapshot") + 1] if "--snapshot" in args else None
+    result = run(snapshot)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+    baselines = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE, encoding="utf-8") as f:
+            baselines = json.load(f)
+    if "--save" in args:
+        baselines[result["cenario"]] = {
+            key: result[key] for key in ("imports_ms", "primeira_renderizacao_s", "rss_pico_mb")
+        }
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, ensure_ascii=False)
+    if "--check" in args:
+        problems = check(result, baselines.get(result["cenario"], {}))
+        if problems:
+            sys.exit("regressão na partida:\n  " + "\n  ".join(problems))
+        print("partida dentro da referência")
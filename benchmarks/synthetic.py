@@ -0,0 +1,112 @@
+# Extratos sintéticos com o formato da PNAD COVID-19 para os benchmarks.
+#
+# Mesmas 21 colunas e tipos do extrato baixado do BigQuery no notebook
+# (respostas como texto, idade como texto, renda com ~63% de ausentes), com
+# proporções de respostas próximas às do extrato real e o peso amostral
+# v1032 usado por pnad.weighted. A geração é determinística (seed) e feita
+# em lotes, gravados direto em Parquet, para que o extrato de 10M de linhas
+# não precise caber inteiro na memória.
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pnad.schema import ESCOLARIDADES
+from pnad.weighted import PESO
+
+DADOS_DIR = os.environ.get("PNAD_BENCH_DIR", os.path.join("benchmarks", ".dados"))
+
+LOTE = 1_000_000
+
+UFS = (
+    "AC AL AM AP BA CE DF ES GO MA MG MS MT PA PB PE PI PR RJ RN RO RR RS SC SE SP TO".split()
+)
+
+RESTRICOES = [
+    "Não fez restrição, levou vida normal como antes da pandemia",
+    "Reduziu o contato com as pessoas, mas continuou saindo de casa para trabalho ou atividades não essenciais e/ou recebendo visitas",
+    "Ficou em casa e só saiu em caso de necessidade básica",
+    "Ficou rigorosamente em casa",
+    "Ignorado",
+    "Não especificado",
+]
+
+# Proporção de respostas 'Sim' de cada sintoma
+SINTOMAS_SIM = {
+    "dificuldade_respiracao": 0.0106,
+    "dor_olhos": 0.01,
+    "perda_oufato_paladar": 0.0125,
+    "tosse": 0.0265,
+}
+
+
+def _pick(rng, values, p, n):
+    return np.array(values, dtype=object)[rng.choice(len(values), n, p=p)]
+
+
+def make_extract(n, seed=0, meses=(5, 6, 7)):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "ano": pd.array(np.full(n, 2020), dtype="Int64"),
+        "mes": pd.array(np.array(meses)[rng.integers(0, len(meses), n)], dtype="Int64"),
+        "sigla_uf": np.array(UFS, dtype=object)[rng.integers(0, len(UFS), n)],
+        "idade": rng.integers(0, 100, n).astype(str).astype(object),
+        "sexo": _pick(rng, ["homem", "mulher"], [0.48, 0.52], n),
+        "escolaridade": np.array(ESCOLARIDADES, dtype=object)[rng.integers(0, len(ESCOLARIDADES), n)],
+    })
+    for col, p in SINTOMAS_SIM.items():
+        df[col] = _pick(rng, ["Sim", "Não", "Não sabe", "Não especificado"], [p, 0.98 - p, 0.002, 0.018], n)
+    df["empregado"] = _pick(
+        rng,
+        ["Sim, tem carteira de trabalho assinada", "Sim, é servidor público estatutário", "Não", "Não aplicável"],
+        [0.2, 0.05, 0.15, 0.6],
+        n,
+    )
+    df["este_domicilio_e"] = _pick(rng, ["Próprio - já pago", "Alugado", "Cedido por familiar"], [0.7, 0.2, 0.1], n)
+    renda = np.round(rng.lognormal(7.3, 0.9, n), 0)
+    renda[rng.random(n) < 0.63] = np.nan
+    df["renda"] = renda
+    df["aula_presencial"] = _pick(
+        rng, ["Sim, normalmente", "Não, meu curso é online", "Não aplicável"], [0.02, 0.08, 0.9], n
+    )
+    df["buscou_ajuda_medica"] = _pick(rng, ["Sim", "Não", "Ignorado", "Não aplicável"], [0.004, 0.05, 0.001, 0.945], n)
+    df["restringiu_contato_com_pessoas"] = _pick(rng, RESTRICOES, [0.02, 0.06, 0.1, 0.02, 0.001, 0.799], n)
+    df["home_office"] = _pick(rng, ["Sim", "Não", "Não aplicável"], [0.03, 0.3, 0.67], n)
+    df["morador"] = pd.array(rng.integers(1, 8, n), dtype="Int64")
+    for col in ("resultado_covid_cotonete", "resultado_covid_sangue_furo_dedo", "resultado_covid_sangue_veia_braco"):
+        df[col] = _pick(rng, ["Positivo", "Negativo", "Não aplicável"], [0.005, 0.03, 0.965], n)
+    # ~380 mil entrevistas por mês para ~211 milhões de pessoas
+    df[PESO] = np.round(rng.lognormal(np.log(550) - 0.18, 0.6, n), 4)
+    return df
+
+
+# Grava um extrato de n linhas em Parquet, lote a lote (cada lote com sua
+# própria seed derivada de `seed`)
+def write_extract(path, n, seed=0, batch_size=LOTE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    writer = None
+    try:
+        for i, start in enumerate(range(0, n, batch_size)):
+            table = pa.Table.from_pandas(
+                make_extract(min(batch_size, n - start), seed=seed * 1_000_003 + i), preserve_index=False
+            )
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, table.schema, compression="zstd")
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp, path)
+    return path
+
+
+# Caminho do extrato de n linhas, gerado na primeira vez (e de novo se o
+# arquivo for de uma versão anterior, sem a coluna de peso)
+def extract_path(n, seed=0, root=DADOS_DIR):
+    path = os.path.join(root, f"extrato-{n}-{seed}.parquet")
+    if not os.path.exists(path) or PESO not in pq.read_schema(path).names:
+        write_extract(path, n, seed)
+    return path
@@ -0,0 +1,114 @@
+# Benchmark de vários processos do painel servindo ao mesmo tempo.
+#
+# Sobe N processos com o app.py (streamlit.testing.AppTest) apontando para o
+# mesmo snapshot, cada um fazendo a primeira execução e um rerun com filtro,
+# como workers atrás de um balanceador, com e sem o modo de serviço
+# (PNAD_SHARED_DIR, pnad/shared.py). Para cada processo mede o tempo e, no
+# fim, a memória anônima (RssAnon, o heap próprio do processo) e o PSS (RSS
+# com as páginas compartilhadas divididas entre os processos que as usam).
+#
+# Uso (na raiz do repositório):
+#   python -m benchmarks.workers --snapshot DIR [--workers 1,2,4]
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _memory_mb():
+    memory = {}
+    for path, fields in (("/proc/self/status", ("RssAnon",)), ("/proc/self/smaps_rollup", ("Pss",))):
+        try:
+            with open(path) as f:
+                for line in f:
+                    name, _, value = line.partition(":")
+                    if name in fields:
+                        memory[name] = int(value.split()[0]) / 1024
+        except OSError:
+            pass
+    return {"anon_mb": round(memory.get("RssAnon", 0.0), 1), "pss_mb": round(memory.get("Pss", 0.0), 1)}
+
+
+# Processo filho: um worker do painel
+def worker_child():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=3600)
+    start = time.perf_counter()
+    at.run()
+    at.sidebar.multiselect[1].select("SP").run()
+    result = {"tempo_s": round(time.perf_counter() - start, 3), "erros": [str(e.value) for e in at.exception]}
+    result.update(_memory_mb())
+    print(json.dumps(result))
+
+
+def run_workers(snapshot, n, shared):
+    workdir = tempfile.mkdtemp(prefix="pnad-workers-")
+    env = dict(os.environ, PNAD_SNAPSHOT_DIR=snapshot, PNAD_CUBE_PATH=os.path.join(workdir, "cubo.parquet"))
+    env.pop("PNAD_METRICS", None)
+    env.pop("PNAD_SHARED_DIR", None)
+    if shared:
+        env["PNAD_SHARED_DIR"] = os.path.join(workdir, "compartilhado")
+    try:
+        start = time.perf_counter()
+        processes = [
+            subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.workers", "--child"],
+                cwd=ROOT,
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+            )
+            for _ in range(n)
+        ]
+        results = []
+        for process in processes:
+            stdout, stderr = process.communicate()
+            if process.returncode:
+                raise RuntimeError(f"worker terminou com código {process.returncode}:\n{stderr}")
+            results.append(json.loads(stdout.strip().splitlines()[-1]))
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    errors = [error for result in results for error in result["erros"]]
+    if errors:
+        raise RuntimeError(f"app.py falhou: {errors}")
+    return {
+        "workers": n,
+        "modo": "compartilhado" if shared else "isolado",
+        "tempo_total_s": round(elapsed, 3),
+        "tempo_por_worker_s": [result["tempo_s"] for result in results],
+        "anon_total_mb": round(sum(result["anon_mb"] for result in results), 1),
+        "pss_total_mb": round(sum(result["pss_mb"] for result in results), 1),
+    }
+
+
+def _option(args, name, default):
+    if name in args:
+        return args[args.index(name) + 1]
+    return default
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--child" in args:
+        worker_child()
+        sys.exit()
+    snapshot = _option(args, "--snapshot", None)
+    if snapshot is None:
+        sys.exit("informe o snapshot com --snapshot DIR (python -m pnad.snapshot ou pnad.ingest)")
+    snapshot = os.path.abspath(snapshot)
+    for n in [int(value) for value in _option(args, "--workers", "1,2,4").split(",")]:
+        for shared in (False, True):
+            result = run_workers(snapshot, n, shared)
+            print(
+                f"{n} worker(s), {result['modo']:<13} {result['tempo_total_s']:7.2f} s"
+                f"   heap somado {result['anon_total_mb']:7.0f} MB   PSS somado {result['pss_total_mb']:7.0f} MB",
+                flush=True,
+            )
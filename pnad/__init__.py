@@ -0,0 +1 @@
+# Módulos de apoio ao painel de análise da PNAD COVID-19 (app.py)
@@ -0,0 +1,124 @@
+# Contagens de sintomas (respostas 'Sim') em uma única passada vetorizada.
+#
+# As quatro colunas de sintomas são codificadas uma vez em uma máscara de
+# bits (uint8, um bit por sintoma). As dimensões de quebra (faixa etária,
+# sexo, UF, ...) viram códigos inteiros combinados em uma chave única, e um
+# só np.bincount conta cada padrão de sintomas por célula. Total e quebras
+# por dimensão são somas sobre esse cubo pequeno, sem reler a tabela.
+import numpy as np
+import pandas as pd
+
+from pnad.schema import ESCOLARIDADES, SINTOMAS
+
+FAIXAS_ETARIAS = ["Crianças", "Adolescentes", "Adultos", "Idosos"]
+LIMITES_IDADE = [0, 12, 17, 59, np.inf]
+
+DIMENSOES = ("faixa_etaria", "sexo", "sigla_uf")
+
+# Linha p, coluna j: 1 se o padrão de bits p contém o sintoma j
+_BITS = ((np.arange(1 << len(SINTOMAS))[:, None] >> np.arange(len(SINTOMAS))) & 1).astype(np.int64)
+
+
+# Vetor booleano de respostas iguais a `value`, sem comparar strings linha
+# a linha quando a coluna já é categórica
+def is_value(series, value="Sim"):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        if value not in categories:
+            return np.zeros(len(series), dtype=bool)
+        return series.cat.codes.to_numpy() == categories.get_loc(value)
+    return (series == value).to_numpy(dtype=bool, na_value=False)
+
+
+def symptom_mask(df, sintomas=SINTOMAS):
+    mask = np.zeros(len(df), dtype=np.uint8)
+    for bit, col in enumerate(sintomas):
+        mask |= is_value(df[col]).astype(np.uint8) << bit
+    return mask
+
+
+# Faixas etárias do notebook (pd.cut com right=False); -1 para idade ausente
+def age_band_codes(idade):
+    idade = pd.to_numeric(idade, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    codes = np.searchsorted(LIMITES_IDADE[1:-1], idade, side="right").astype(np.int8)
+    codes[np.isnan(idade) | (idade < LIMITES_IDADE[0])] = -1
+    return codes
+
+
+# Dimensões com ordem natural (as demais ficam em ordem alfabética)
+ORDEM_CATEGORIAS = {"escolaridade": ESCOLARIDADES}
+
+
+# Códigos inteiros e rótulos de uma dimensão; -1 para valor ausente
+def dimension_codes(df, dim):
+    if dim == "faixa_etaria" and dim not in df:
+        return age_band_codes(df["idade"]), FAIXAS_ETARIAS
+    series = df[dim]
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype("category")
+    if dim in ORDEM_CATEGORIAS:
+        ordem = ORDEM_CATEGORIAS[dim]
+        categories = series.cat.categories
+        series = series.cat.set_categories(
+            [c for c in ordem if c in categories] + [c for c in categories if c not in ordem]
+        )
+    return series.cat.codes.to_numpy(), list(series.cat.categories)
+
+
+class SymptomCounts:
+    # counts: array (n_1 + 1, ..., n_k + 1, 2**len(sintomas)) com o número de
+    # pessoas por célula e padrão de sintomas; o último índice de cada
+    # dimensão guarda os valores ausentes
+    def __init__(self, counts, dims, labels, sintomas=SINTOMAS):
+        self.counts = counts
+        self.dims = tuple(dims)
+        self.labels = dict(labels)
+        self.sintomas = list(sintomas)
+
+    # Casos 'Sim' por sintoma, considerando todas as linhas
+    def total(self):
+        patterns = self.counts.reshape(-1, self.counts.shape[-1]).sum(axis=0)
+        return pd.Series(patterns @ _BITS[:, : len(self.sintomas)], index=self.sintomas)
+
+    # Soma o cubo sobre as dimensões não pedidas, na ordem de `dims`, sem as
+    # células de valor ausente (como um groupby do pandas)
+    def _rollup(self, dims):
+        axes = [self.dims.index(dim) for dim in dims]
+        others = tuple(i for i in range(len(self.dims)) if i not in axes)
+        cube = self.counts.sum(axis=others) if others else self.counts
+        if len(axes) > 1:
+            cube = np.moveaxis(cube, list(range(len(axes))), np.argsort(axes))
+        return cube[tuple(slice(0, len(self.labels[dim])) for dim in dims)]
+
+    def _index(self, dims):
+        if len(dims) == 1:
+            return pd.CategoricalIndex(self.labels[dims[0]], categories=self.labels[dims[0]], name=dims[0])
+        return pd.MultiIndex.from_product([self.labels[dim] for dim in dims], names=list(dims))
+
+    # Casos 'Sim' por sintoma quebrados por uma ou mais dimensões
+    def by(self, *dims):
+        cube = self._rollup(dims)
+        values = cube.reshape(-1, cube.shape[-1]) @ _BITS[:, : len(self.sintomas)]
+        return pd.DataFrame(values, index=self._index(dims), columns=self.sintomas)
+
+    # Número de pessoas por célula de uma ou mais dimensões
+    def respondents(self, *dims):
+        return pd.Series(self._rollup(dims).sum(axis=-1).reshape(-1), index=self._index(dims))
+
+
+def count_symptoms(df, dims=DIMENSOES, sintomas=SINTOMAS):
+    n_patterns = 1 << len(sintomas)
+    key = symptom_mask(df, sintomas).astype(np.int64)
+    shape = []
+    labels = {}
+    stride = n_patterns
+    for dim in reversed(dims):
+        codes, dim_labels = dimension_codes(df, dim)
+        size = len(dim_labels) + 1
+        codes = np.where(codes < 0, size - 1, codes).astype(np.int64)
+        key += codes * stride
+        stride *= size
+        shape.insert(0, size)
+        labels[dim] = dim_labels
+    counts = np.bincount(key, minlength=stride).reshape(*shape, n_patterns)
+    return SymptomCounts(counts, dims, labels, sintomas)
@@ -0,0 +1,224 @@
+# Entrega das imagens do painel (capa e gráficos): cache em base64 para o
+# modo inline e publicação como arquivos estáticos para o modo static.
+#
+# O Streamlit reexecuta o app.py a cada interação e para cada sessão; sem
+# cache, cada rerun relia e recodificava ~3 MB de imagens. O cache guarda a
+# string já codificada, indexada pelo caminho e validada por mtime/tamanho,
+# e descarta as entradas menos usadas quando passa do limite de memória.
+import base64
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+STATIC_URL_PREFIX = "app/static"
+
+
+# Lê e codifica o arquivo em base64
+def encode_file(image_path):
+    with open(image_path, "rb") as image_file:
+        return base64.b64encode(image_file.read()).decode()
+
+
+class ImageCache:
+    # max_bytes: limite de memória das strings codificadas guardadas
+    # check_interval: segundos entre verificações de mtime/tamanho do arquivo
+    # encode: função (caminho, (mtime, tamanho)) -> base64; o modo de serviço
+    # (pnad/shared.py) a troca para ler a codificação feita por outro processo
+    def __init__(self, max_bytes=32 * 1024 * 1024, check_interval=2.0, encode=None):
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+        self.encode = encode or (lambda path, key: encode_file(path))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    # Retorna a imagem em base64 ("" se o arquivo não existir)
+    def get(self, image_path):
+        path = os.path.abspath(image_path)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and now - entry["checked"] < self.check_interval:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry["encoded"]
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._discard(path)
+            return ""
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry["key"] == key:
+                entry["checked"] = now
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry["encoded"]
+
+        encoded = self.encode(path, key)
+
+        with self._lock:
+            self.misses += 1
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._bytes -= len(old["encoded"])
+            if len(encoded) <= self.max_bytes:
+                self._entries[path] = {"key": key, "checked": now, "encoded": encoded}
+                self._bytes += len(encoded)
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= len(evicted["encoded"])
+                    self.evictions += 1
+        return encoded
+
+    def _discard(self, path):
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._bytes -= len(old["encoded"])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+# Publica as imagens na pasta de arquivos estáticos do Streamlit
+# (servida em app/static/ com server.enableStaticServing = true).
+#
+# O nome publicado leva o hash do conteúdo (graf1.3f2a9c1b7e04.png): a URL
+# muda sempre que a imagem muda, então o navegador pode manter a cópia em
+# cache e revalidar pelo ETag em vez de baixar de novo a cada rerun. Ao
+# publicar um hash novo, as cópias anteriores da mesma imagem (mesmo nome
+# e extensão) são apagadas; uma página aberta antes da troca precisa ser
+# recarregada para ver a imagem nova.
+class StaticAssets:
+    def __init__(self, static_dir="static", url_prefix=STATIC_URL_PREFIX, check_interval=2.0):
+        self.static_dir = static_dir
+        self.url_prefix = url_prefix
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    # Retorna a URL da imagem publicada ("" se o arquivo não existir)
+    def url(self, image_path):
+        path = os.path.abspath(image_path)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and now - entry["checked"] < self.check_interval:
+                self.hits += 1
+                return entry["url"]
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self._lock:
+                self._entries.pop(path, None)
+            return ""
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry["key"] == key:
+                entry["checked"] = now
+                self.hits += 1
+                return entry["url"]
+
+        name = self.publish(path)
+        url = f"{self.url_prefix}/{name}"
+        with self._lock:
+            self.misses += 1
+            self._entries[path] = {"key": key, "checked": now, "url": url}
+        return url
+
+    # Copia o arquivo para a pasta estática com o hash no nome; retorna o nome
+    def publish(self, image_path):
+        with open(image_path, "rb") as image_file:
+            data = image_file.read()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        stem, ext = os.path.splitext(os.path.basename(image_path))
+        name = f"{stem}.{digest}{ext}"
+        target = os.path.join(self.static_dir, name)
+        if not os.path.exists(target):
+            os.makedirs(self.static_dir, exist_ok=True)
+            tmp = f"{target}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as out:
+                out.write(data)
+            os.replace(tmp, target)
+            self._remove_superseded(stem, ext, name)
+        return name
+
+    # Apaga as cópias publicadas com outro hash da mesma imagem
+    def _remove_superseded(self, stem, ext, current):
+        pattern = re.compile(rf"{re.escape(stem)}\.[0-9a-f]{{12}}{re.escape(ext)}")
+        for entry in os.listdir(self.static_dir):
+            if entry != current and pattern.fullmatch(entry):
+                try:
+                    os.remove(os.path.join(self.static_dir, entry))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+def mime_type(image_path):
+    return mimetypes.guess_type(image_path)[0] or "application/octet-stream"
+
+
+# Bytes enviados ao navegador por visualização de página em cada modo.
+#
+# inline: as imagens vão dentro do HTML (base64, ~33% maior) em toda visita.
+# static: o HTML leva só as URLs; as imagens são baixadas na primeira visita
+# e, nas seguintes, revalidadas pelo ETag (304 sem corpo).
+def page_bytes(image_paths):
+    inline_html = 0
+    static_html = 0
+    image_bytes = 0
+    for image_path in image_paths:
+        size = os.path.getsize(image_path)
+        encoded_size = 4 * ((size + 2) // 3)
+        inline_html += len(f"data:{mime_type(image_path)};base64,") + encoded_size
+        stem, ext = os.path.splitext(os.path.basename(image_path))
+        static_html += len(f"{STATIC_URL_PREFIX}/{stem}.{'0' * 12}{ext}")
+        image_bytes += size
+    return {
+        "inline": {"primeira_visita": inline_html, "visitas_seguintes": inline_html},
+        "static": {"primeira_visita": static_html + image_bytes, "visitas_seguintes": static_html},
+    }
+
+
+if __name__ == "__main__":
+    import glob
+    import sys
+
+    paths = sys.argv[1:] or ["images/unsplash.jpg"] + sorted(glob.glob("graficos/*.png"))
+    for mode, sizes in page_bytes(paths).items():
+        print(
+            f"{mode:<7} primeira visita: {sizes['primeira_visita'] / 1024:9.1f} KiB"
+            f"   visitas seguintes: {sizes['visitas_seguintes'] / 1024:9.1f} KiB"
+        )
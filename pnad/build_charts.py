@@ -0,0 +1,414 @@
+# Geração headless dos gráficos estáticos de graficos/ (graf1.png ...
+# graf10.png) a partir do snapshot, sem o notebook.
+#
+# Cada gráfico é uma tarefa (ChartTask) com as colunas do snapshot que lê,
+# os parâmetros do desenho e a função que o desenha. Antes de desenhar, o
+# build calcula o hash de cada coluna usada (conteúdo, não data do arquivo)
+# e, por tarefa, combina os hashes das suas colunas, os parâmetros, o DPI,
+# a versão do matplotlib e o código de que o desenho depende: a função de
+# desenho, os auxiliares e constantes deste módulo que ela usa e os módulos
+# do pacote pnad que calculam os dados (pnad.aggregates, pnad.income...).
+# Tarefas cujo hash é igual ao do último build
+# (graficos/manifest.json) são puladas; as demais rodam em paralelo em um
+# ProcessPoolExecutor, com o backend Agg do matplotlib, uma por processo.
+#
+# graf8.png não tem origem conhecida no notebook e não é gerado.
+#
+# Uso: python -m pnad.build_charts [--force] [--workers N] [graf1 graf3 ...]
+import ast
+import hashlib
+import importlib
+import importlib.metadata
+import inspect
+import json
+import os
+import sys
+import types
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from pnad.aggregates import FAIXAS_ETARIAS, count_symptoms
+from pnad.schema import SINTOMAS
+from pnad.snapshot import SNAPSHOT_DIR, read_snapshot
+
+GRAFICOS_DIR = "graficos"
+MANIFEST = "manifest.json"
+DPI = 100
+
+CORES_AZUIS = ["#005f73", "#0a9396", "#94d2bd", "#e9d8a6"]
+CORES_GENERO = ["#0a9396", "#e9d8a6"]
+
+NOMES_SINTOMAS = ["Dificuldade Respiração", "Dor nos Olhos", "Perda Olfato/Paladar", "Tosse"]
+
+
+class ChartTask:
+    def __init__(self, name, columns, render, **params):
+        self.name = name
+        self.columns = list(columns)
+        self.render = render
+        self.params = params
+
+    @property
+    def filename(self):
+        return f"{self.name}.png"
+
+    # Hash das entradas: colunas (já com hash de conteúdo), parâmetros, DPI,
+    # versão do matplotlib e o código de que o desenho depende (code_inputs)
+    def input_hash(self, column_hashes):
+        digest = hashlib.sha256()
+        for col in self.columns:
+            digest.update(f"{col}={column_hashes[col]};".encode())
+        digest.update(repr(sorted(self.params.items())).encode())
+        digest.update(f"dpi={DPI};matplotlib={importlib.metadata.version('matplotlib')};".encode())
+        for name, code in sorted(code_inputs(self.render).items()):
+            digest.update(f"{name}={code};".encode())
+        return digest.hexdigest()
+
+
+def _source(obj):
+    return inspect.getsource(obj)
+
+
+def _names(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _names(const)
+    return names
+
+
+# Código-fonte de um módulo do pacote pnad e dos módulos pnad que ele
+# importa (no topo ou dentro de funções), recursivamente
+def _pnad_modules(name, found):
+    if name in found:
+        return
+    found[name] = _source(importlib.import_module(name))
+    for node in ast.walk(ast.parse(found[name])):
+        if isinstance(node, ast.ImportFrom) and (node.module or "").startswith("pnad."):
+            _pnad_modules(node.module, found)
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name.startswith("pnad."):
+                    _pnad_modules(alias.name, found)
+
+
+# Código de que uma função de desenho depende: {nome: código}. Entram a
+# própria função, as funções e constantes deste módulo que ela usa (e as
+# que elas usam) e o código-fonte dos módulos pnad de onde vêm os dados,
+# inclusive os importados dentro da função. Mudar uma função de desenho só
+# refaz o seu gráfico; mudar pnad.income refaz os que usam a distribuição
+# de renda.
+def code_inputs(render):
+    inputs = {}
+    modules = {}
+    pending = [render]
+    while pending:
+        func = pending.pop()
+        key = f"{func.__module__}.{func.__qualname__}"
+        if key in inputs:
+            continue
+        inputs[key] = _source(func)
+        for name in sorted(_names(func.__code__)):
+            if name.startswith("pnad."):
+                _pnad_modules(name, modules)
+                continue
+            if name not in func.__globals__:
+                continue
+            value = func.__globals__[name]
+            origin = value.__name__ if isinstance(value, types.ModuleType) else getattr(value, "__module__", None)
+            if isinstance(value, types.FunctionType) and origin == func.__module__:
+                pending.append(value)
+            elif isinstance(origin, str) and origin.startswith("pnad.") and origin != func.__module__:
+                _pnad_modules(origin, modules)
+            elif isinstance(value, (str, int, float, tuple, list, dict)):
+                inputs[f"{func.__module__}.{name}"] = repr(value)
+    inputs.update({f"modulo:{name}": code for name, code in modules.items()})
+    return inputs
+
+
+def _grid(ax, axis="y"):
+    ax.grid(True, axis=axis, linestyle="--", alpha=0.7)
+    ax.set_axisbelow(True)
+
+
+def _answer_counts(series):
+    counts = series.value_counts()
+    return counts[counts > 0]
+
+
+def render_frequencia_sintomas(df, figsize, cor):
+    import matplotlib.pyplot as plt
+
+    totals = count_symptoms(df, dims=()).total()
+    fig, ax = plt.subplots(figsize=figsize)
+    ax.bar(NOMES_SINTOMAS, totals[SINTOMAS].to_numpy(), color=cor)
+    ax.set_title("Frequência de Sintomas Clínicos", fontsize=16, weight="bold")
+    ax.set_ylabel("Frequência", fontsize=12)
+    ax.set_xlabel("Resposta", fontsize=12)
+    _grid(ax)
+    return fig
+
+
+def render_sintomas_faixa_etaria(df, figsize, cores):
+    import matplotlib.pyplot as plt
+
+    ordem = ["tosse", "dificuldade_respiracao", "dor_olhos", "perda_oufato_paladar"]
+    table = count_symptoms(df, dims=("faixa_etaria",)).by("faixa_etaria")[ordem]
+    fig, ax = plt.subplots(figsize=figsize)
+    table.plot(kind="bar", color=cores, ax=ax)
+    ax.set_title("Prevalência de Sintomas de COVID-19 por Faixa Etária", fontsize=16, pad=20)
+    ax.set_ylabel("Número de Casos", fontsize=12)
+    ax.set_xlabel("Faixa Etária", fontsize=12)
+    ax.set_xticks(range(len(FAIXAS_ETARIAS)), FAIXAS_ETARIAS, rotation=0)
+    ax.legend(title="Sintomas", bbox_to_anchor=(1.05, 1), loc="upper left")
+    _grid(ax)
+    return fig
+
+
+def render_ajuda_medica_sexo(df, figsize, cores):
+    import matplotlib.pyplot as plt
+
+    counts = pd.crosstab(df["sexo"], df["buscou_ajuda_medica"])
+    counts = counts.loc[counts.sum(axis=1) > 0, counts.sum(axis=0) > 0]
+    shares = counts.div(counts.sum(axis=1), axis=0) * 100
+    fig, ax = plt.subplots(figsize=figsize)
+    shares.plot(kind="barh", stacked=True, color=cores, ax=ax)
+    ax.set_title("Distribuição Percentual de Pessoas que Buscaram Ajuda Médica por Sexo")
+    ax.set_xlabel("Porcentagem de Pessoas (%)")
+    ax.set_ylabel("Sexo")
+    _grid(ax, axis="x")
+    ax.legend(title="Buscou ajuda médica", bbox_to_anchor=(1.05, 1), loc="upper left")
+    for patch in ax.patches:
+        if patch.get_width() > 0:
+            ax.annotate(
+                f"{patch.get_width():.1f}%",
+                (patch.get_x() + patch.get_width() / 2, patch.get_y() + patch.get_height() / 2),
+                ha="center",
+                va="center",
+                color="black",
+                fontsize=10,
+            )
+    return fig
+
+
+def render_prevalencia_sintomas(df, figsize, cores):
+    import matplotlib.pyplot as plt
+
+    totals = count_symptoms(df, dims=()).total()
+    fig, ax = plt.subplots(figsize=figsize)
+    ax.bar(SINTOMAS, totals[SINTOMAS].to_numpy(), color=cores)
+    ax.set_title("Prevalência dos Sintomas Relatados pela População", fontsize=16)
+    ax.set_xlabel("Sintoma", fontsize=14)
+    ax.set_ylabel("Número de Casos", fontsize=14)
+    _grid(ax)
+    return fig
+
+
+def render_sintomas_sexo(df, figsize, cores):
+    import matplotlib.pyplot as plt
+
+    ordem = ["tosse", "dificuldade_respiracao", "dor_olhos", "perda_oufato_paladar"]
+    table = count_symptoms(df, dims=("sexo",)).by("sexo")[ordem]
+    indice = np.arange(len(ordem))
+    largura = 0.35
+    fig, ax = plt.subplots(figsize=figsize)
+    for offset, (sexo, label), cor in zip((-largura / 2, largura / 2), (("homem", "Homem"), ("mulher", "Mulher")), cores):
+        values = table.loc[sexo].to_numpy() if sexo in table.index else np.zeros(len(ordem))
+        ax.bar(indice + offset, values, largura, label=label, color=cor)
+    ax.set_xticks(indice, ordem, rotation=0, ha="center")
+    ax.set_xlabel("Sintomas", fontsize=14)
+    ax.set_ylabel("Frequência de Sintomas", fontsize=14)
+    ax.set_title("Distribuição de Sintomas por Gênero", fontsize=16)
+    ax.legend(title="Gênero")
+    _grid(ax)
+    return fig
+
+
+def render_restricao(df, figsize, cor):
+    import matplotlib.pyplot as plt
+
+    counts = _answer_counts(df["restringiu_contato_com_pessoas"])
+    fig, ax = plt.subplots(figsize=figsize)
+    ax.barh(counts.index.astype(str), counts.to_numpy(), color=cor)
+    ax.invert_yaxis()
+    ax.set_title("Nível de Restrição de Contato Social Durante a Pandemia", fontsize=16)
+    ax.set_xlabel("Número de Pessoas", fontsize=12)
+    _grid(ax, axis="x")
+    return fig
+
+
+def render_home_office(df, figsize, cores):
+    import matplotlib.pyplot as plt
+
+    counts = _answer_counts(df["home_office"])
+    fig, ax = plt.subplots(figsize=figsize)
+    ax.bar(counts.index.astype(str), counts.to_numpy(), color=cores[: len(counts)])
+    ax.set_title("Adoção de Home Office Durante a Pandemia", fontsize=16)
+    ax.set_xlabel("Home Office", fontsize=12)
+    ax.set_ylabel("Número de Pessoas", fontsize=12)
+    _grid(ax)
+    return fig
+
+
+def render_renda_uf(df, figsize, cores):
+    import matplotlib.pyplot as plt
+
+    media = df.groupby("sigla_uf", observed=True)["renda"].mean().sort_index()
+    fig, ax = plt.subplots(figsize=figsize)
+    ax.bar(media.index.astype(str), media.to_numpy(), color=[cores[i % len(cores)] for i in range(len(media))])
+    ax.set_title("Média de Renda por Estado", fontsize=16)
+    ax.set_xlabel("Estado", fontsize=14)
+    ax.set_ylabel("Média de Renda (R$)", fontsize=14)
+    _grid(ax)
+    return fig
+
+
+def render_renda_escolaridade(df, figsize, cor, bins, colunas):
+    import matplotlib.pyplot as plt
+
+    from pnad.income import income_distribution
+
+    distribution = income_distribution(df)
+    groups = [g for g in distribution.groups if distribution.counts()[g] > 0]
+    rows = max((len(groups) + colunas - 1) // colunas, 1)
+    fig, axes = plt.subplots(rows, colunas, figsize=figsize, squeeze=False)
+    for ax, group in zip(axes.flat, groups):
+        edges, counts = distribution.histogram(group, bins)
+        ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge", color=cor, alpha=0.75, edgecolor="white")
+        x, density = distribution.kde(group, bins)
+        ax.plot(x, density, color=cor)
+        ax.set_title(group)
+        ax.set_xlabel("Renda (R$)")
+        ax.set_ylabel("Contagem")
+        ax.grid(True, linestyle="--", alpha=0.7)
+    for ax in axes.flat[len(groups) :]:
+        ax.set_visible(False)
+    fig.suptitle("Distribuição de Renda por Nível de Escolaridade", fontsize=16)
+    fig.tight_layout(rect=(0, 0, 1, 0.95))
+    return fig
+
+
+TAREFAS = {
+    task.name: task
+    for task in [
+        ChartTask("graf1", SINTOMAS, render_frequencia_sintomas, figsize=(10, 6), cor=CORES_AZUIS[0]),
+        ChartTask("graf2", ["idade", *SINTOMAS], render_sintomas_faixa_etaria, figsize=(10, 6), cores=CORES_AZUIS),
+        ChartTask(
+            "graf3", ["sexo", "buscou_ajuda_medica"], render_ajuda_medica_sexo, figsize=(20, 7), cores=CORES_AZUIS[1:]
+        ),
+        ChartTask("graf4", SINTOMAS, render_prevalencia_sintomas, figsize=(10, 6), cores=CORES_AZUIS),
+        ChartTask("graf5", ["sexo", *SINTOMAS], render_sintomas_sexo, figsize=(10, 6), cores=CORES_GENERO),
+        ChartTask("graf6", ["restringiu_contato_com_pessoas"], render_restricao, figsize=(10, 6), cor=CORES_AZUIS[1]),
+        ChartTask("graf7", ["home_office"], render_home_office, figsize=(10, 6), cores=CORES_AZUIS),
+        ChartTask("graf9", ["sigla_uf", "renda"], render_renda_uf, figsize=(12, 6), cores=CORES_AZUIS),
+        ChartTask(
+            "graf10",
+            ["escolaridade", "renda"],
+            render_renda_escolaridade,
+            figsize=(16, 8),
+            cor=CORES_AZUIS[1],
+            bins=50,
+            colunas=4,
+        ),
+    ]
+}
+
+
+# Hash do conteúdo de cada coluna do snapshot (lida uma por vez)
+def column_hashes(columns, root=SNAPSHOT_DIR):
+    hashes = {}
+    for col in columns:
+        series = read_snapshot(columns=[col], root=root)[col]
+        values = pd.util.hash_pandas_object(series, index=False).to_numpy()
+        hashes[col] = hashlib.sha256(values.tobytes()).hexdigest()
+    return hashes
+
+
+def _init_worker():
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+# Desenha uma tarefa (em um processo do pool) e grava o PNG de forma
+# atômica
+def _render(name, root, output_dir):
+    import matplotlib.pyplot as plt
+
+    task = TAREFAS[name]
+    df = read_snapshot(columns=task.columns, root=root)
+    fig = task.render(df, **task.params)
+    path = os.path.join(output_dir, task.filename)
+    tmp = f"{path}.tmp"
+    try:
+        fig.savefig(tmp, format="png", dpi=DPI, bbox_inches="tight")
+    finally:
+        plt.close(fig)
+    os.replace(tmp, path)
+    return name
+
+
+def load_manifest(output_dir=GRAFICOS_DIR):
+    path = os.path.join(output_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, output_dir=GRAFICOS_DIR):
+    path = os.path.join(output_dir, MANIFEST)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# Redesenha as tarefas (todas, ou só `names`) cujas entradas mudaram desde
+# o último build. Retorna (redesenhadas, puladas).
+def build_charts(names=None, root=SNAPSHOT_DIR, output_dir=GRAFICOS_DIR, force=False, workers=None):
+    tasks = [TAREFAS[name] for name in (names or TAREFAS)]
+    hashes = column_hashes(sorted({col for task in tasks for col in task.columns}), root)
+    manifest = load_manifest(output_dir)
+    pending = {}
+    skipped = []
+    for task in tasks:
+        key = task.input_hash(hashes)
+        up_to_date = manifest.get(task.name) == key and os.path.exists(os.path.join(output_dir, task.filename))
+        if up_to_date and not force:
+            skipped.append(task.name)
+        else:
+            pending[task.name] = key
+
+    built = []
+    if pending:
+        os.makedirs(output_dir, exist_ok=True)
+        workers = min(workers or os.cpu_count() or 1, len(pending))
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [pool.submit(_render, name, root, output_dir) for name in pending]
+                for future in as_completed(futures):
+                    name = future.result()
+                    manifest[name] = pending[name]
+                    built.append(name)
+        finally:
+            # Grava o que já foi gerado mesmo se alguma tarefa falhar
+            save_manifest(manifest, output_dir)
+    return built, skipped
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    force = "--force" in args
+    workers = None
+    if "--workers" in args:
+        workers = int(args[args.index("--workers") + 1])
+        del args[args.index("--workers") : args.index("--workers") + 2]
+    names = [arg for arg in args if not arg.startswith("--")]
+    unknown = [name for name in names if name not in TAREFAS]
+    if unknown:
+        sys.exit(f"gráficos desconhecidos: {', '.join(unknown)} (disponíveis: {', '.join(TAREFAS)})")
+    built, skipped = build_charts(names, force=force, workers=workers)
+    print(f"{len(built)} gráficos gerados ({', '.join(built) or '-'}), {len(skipped)} sem alteração")
@@ -0,0 +1,220 @@
+# Gráficos interativos (Plotly) do painel, calculados a partir do cubo de
+# agregados (pnad/cube.py).
+#
+# chart_data() monta as tabelas pequenas de todos os gráficos, que o app.py
+# guarda com st.cache_data por combinação de filtros; as funções figure_*
+# só montam as figuras a partir dessas tabelas. Os títulos e as cores
+# seguem os gráficos do notebook (graficos/graf*.png). build_figure() é o
+# que vai para o navegador: a figura com as séries limitadas à largura do
+# gráfico em pixels (pnad/downsample.py).
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from pnad.downsample import limit_figure
+
+
+CORES_AZUIS = ["#005f73", "#0a9396", "#94d2bd", "#e9d8a6"]
+CORES_GENERO = ["#0a9396", "#e9d8a6"]
+
+NOMES_SINTOMAS = {
+    "dificuldade_respiracao": "Dificuldade Respiração",
+    "dor_olhos": "Dor nos Olhos",
+    "perda_oufato_paladar": "Perda Olfato/Paladar",
+    "tosse": "Tosse",
+}
+
+RENDA_BINS = 50
+
+# Pontos da curva de densidade enviados por faceta
+KDE_PONTOS = 200
+
+
+def _answer_counts(cube, col, name):
+    counts = cube.answers(col).sort_values(ascending=False)
+    counts = counts[counts > 0].astype("int64")
+    return counts.rename_axis(name).reset_index(name="Total")
+
+
+# Histograma, KDE e quantis de renda por escolaridade, a partir das
+# contagens de pnad.income (sem as linhas de dados)
+def income_tables(distribution):
+    histograms = []
+    curves = []
+    for group in distribution.groups:
+        edges, counts = distribution.histogram(group, RENDA_BINS)
+        histograms.append(
+            pd.DataFrame({"escolaridade": group, "renda": (edges[:-1] + edges[1:]) / 2, "contagem": counts})
+        )
+        x, density = distribution.kde(group, RENDA_BINS)
+        step = max(len(x) // KDE_PONTOS, 1)
+        curves.append(pd.DataFrame({"escolaridade": group, "renda": x[::step], "densidade": density[::step]}))
+    columns = {"histograma": ["escolaridade", "renda", "contagem"], "kde": ["escolaridade", "renda", "densidade"]}
+    return {
+        "histograma": pd.concat(histograms, ignore_index=True) if histograms else pd.DataFrame(columns=columns["histograma"]),
+        "kde": pd.concat(curves, ignore_index=True) if curves else pd.DataFrame(columns=columns["kde"]),
+        "quantis": distribution.quantile_table(),
+    }
+
+
+# Tabelas dos gráficos a partir do cubo (já filtrado) e da distribuição de
+# renda por escolaridade (pnad.income) com os mesmos filtros
+def chart_data(cube, renda_escolaridade):
+    return {
+        "sintomas": cube.symptoms().rename_axis("Sintoma").reset_index(name="Total"),
+        "sintomas_faixa_etaria": cube.symptoms("faixa_etaria"),
+        "sintomas_sexo": cube.symptoms("sexo"),
+        "ajuda_medica_sexo": cube.shares("buscou_ajuda_medica", "sexo"),
+        "restricao": _answer_counts(cube, "restringiu_contato_com_pessoas", "Restrição"),
+        "home_office": _answer_counts(cube, "home_office", "Home Office"),
+        "renda_uf": cube.income("sigla_uf")["media"].rename("renda").reset_index(),
+        "renda_escolaridade": income_tables(renda_escolaridade),
+    }
+
+
+def _layout(fig, title, xaxis, yaxis):
+    fig.update_layout(
+        title=title,
+        xaxis_title=xaxis,
+        yaxis_title=yaxis,
+        template="plotly_dark",
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+    )
+    fig.update_yaxes(showgrid=True, griddash="dash")
+    return fig
+
+
+def figure_sintomas(data):
+    table = data["sintomas"].assign(Sintoma=lambda t: t["Sintoma"].map(NOMES_SINTOMAS))
+    fig = px.bar(table, x="Sintoma", y="Total", color_discrete_sequence=[CORES_AZUIS[0]])
+    return _layout(fig, "Frequência de Sintomas Clínicos", "Quadro Clínico", "Frequência")
+
+
+def figure_sintomas_faixa_etaria(data):
+    table = data["sintomas_faixa_etaria"].reset_index().melt(
+        id_vars="faixa_etaria", var_name="Sintomas", value_name="Número de Casos"
+    )
+    fig = px.bar(
+        table,
+        x="faixa_etaria",
+        y="Número de Casos",
+        color="Sintomas",
+        barmode="group",
+        color_discrete_sequence=CORES_AZUIS,
+    )
+    return _layout(fig, "Prevalência de Sintomas de COVID-19 por Faixa Etária", "Faixa Etária", "Número de Casos")
+
+
+def figure_ajuda_medica_sexo(data):
+    table = data["ajuda_medica_sexo"].reset_index().melt(
+        id_vars="sexo", var_name="Buscou ajuda médica", value_name="Porcentagem"
+    )
+    fig = px.bar(
+        table,
+        x="Porcentagem",
+        y="sexo",
+        color="Buscou ajuda médica",
+        orientation="h",
+        text_auto=".1f",
+        color_discrete_sequence=["#0a9396", "#94d2bd", "#e9d8a6", "#005f73"],
+    )
+    fig.update_layout(barmode="stack")
+    return _layout(
+        fig,
+        "Distribuição Percentual de Pessoas que Buscaram Ajuda Médica por Sexo",
+        "Porcentagem de Pessoas (%)",
+        "Sexo",
+    )
+
+
+def figure_prevalencia_sintomas(data):
+    fig = px.bar(data["sintomas"], x="Sintoma", y="Total", color="Sintoma", color_discrete_sequence=CORES_AZUIS)
+    fig.update_layout(showlegend=False)
+    return _layout(fig, "Prevalência dos Sintomas Relatados pela População", "Sintoma", "Número de Casos")
+
+
+def figure_sintomas_sexo(data):
+    table = data["sintomas_sexo"].T.rename_axis("Sintomas").reset_index().melt(
+        id_vars="Sintomas", var_name="Gênero", value_name="Frequência"
+    )
+    table["Gênero"] = table["Gênero"].str.capitalize()
+    fig = px.bar(
+        table, x="Sintomas", y="Frequência", color="Gênero", barmode="group", color_discrete_sequence=CORES_GENERO
+    )
+    return _layout(fig, "Distribuição de Sintomas por Gênero", "Sintomas", "Frequência de Sintomas")
+
+
+def figure_restricao(data):
+    fig = px.bar(
+        data["restricao"], x="Total", y="Restrição", orientation="h", color_discrete_sequence=[CORES_AZUIS[1]]
+    )
+    fig.update_yaxes(autorange="reversed")
+    return _layout(fig, "Nível de Restrição de Contato Social Durante a Pandemia", "Número de Pessoas", "")
+
+
+def figure_home_office(data):
+    fig = px.bar(
+        data["home_office"], x="Home Office", y="Total", color="Home Office", color_discrete_sequence=CORES_AZUIS
+    )
+    fig.update_layout(showlegend=False)
+    return _layout(fig, "Adoção de Home Office Durante a Pandemia", "Home Office", "Número de Pessoas")
+
+
+def figure_renda_uf(data):
+    fig = px.bar(data["renda_uf"], x="sigla_uf", y="renda", color_discrete_sequence=[CORES_AZUIS[1]])
+    return _layout(fig, "Média de Renda por Estado", "Estado", "Média de Renda (R$)")
+
+
+def figure_renda_escolaridade(data):
+    tables = data["renda_escolaridade"]
+    groups = list(tables["quantis"].index)
+    cols = 4
+    rows = max((len(groups) + cols - 1) // cols, 1)
+    titles = [f"{group}<br><sup>mediana R$ {tables['quantis'].loc[group, 'p50']:,.0f}</sup>" for group in groups]
+    fig = make_subplots(rows=rows, cols=cols, subplot_titles=titles, vertical_spacing=0.18)
+    for i, group in enumerate(groups):
+        row, col = i // cols + 1, i % cols + 1
+        histogram = tables["histograma"][tables["histograma"]["escolaridade"] == group]
+        curve = tables["kde"][tables["kde"]["escolaridade"] == group]
+        fig.add_trace(
+            go.Bar(
+                x=histogram["renda"], y=histogram["contagem"], marker_color=CORES_AZUIS[1], marker_line_width=0,
+                name="Contagem", showlegend=False,
+            ),
+            row=row,
+            col=col,
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=curve["renda"], y=curve["densidade"], mode="lines", line_color=CORES_AZUIS[3],
+                name="KDE", showlegend=False,
+            ),
+            row=row,
+            col=col,
+        )
+    _layout(fig, "Distribuição de Renda por Nível de Escolaridade", None, None)
+    fig.update_layout(bargap=0, height=350 * rows)
+    fig.update_xaxes(title_text="Renda (R$)", row=rows)
+    fig.update_yaxes(title_text="Contagem", col=1)
+    return fig
+
+
+FIGURES = {
+    "sintomas": figure_sintomas,
+    "sintomas_faixa_etaria": figure_sintomas_faixa_etaria,
+    "ajuda_medica_sexo": figure_ajuda_medica_sexo,
+    "prevalencia_sintomas": figure_prevalencia_sintomas,
+    "sintomas_sexo": figure_sintomas_sexo,
+    "restricao": figure_restricao,
+    "home_office": figure_home_office,
+    "renda_uf": figure_renda_uf,
+    "renda_escolaridade": figure_renda_escolaridade,
+}
+
+
+# Figura pronta para o navegador: nenhuma série com mais pontos do que a
+# largura do gráfico em pixels, qualquer que seja o número de linhas
+def build_figure(name, data):
+    return limit_figure(FIGURES[name](data))
@@ -0,0 +1,407 @@
+# Cubo pré-calculado de agregados da PNAD COVID-19 para os filtros do painel.
+#
+# Cada linha do cubo é uma célula (mês, UF, sexo, faixa etária,
+# escolaridade) com contagens e somas: pessoas, casos 'Sim' por sintoma,
+# respostas de buscou_ajuda_medica / home_office / restrição de contato e
+# soma, soma dos quadrados e contagem de renda. Qualquer combinação de
+# filtros vira um filtro em poucas dezenas de milhares de linhas seguido de
+# um groupby, em milissegundos, sem voltar aos dados brutos.
+#
+# Ao lado do cubo fica a renda em faixas (income_bins): uma linha por
+# célula, faixa linear e balde logarítmico de pnad.income, com o número de
+# pessoas. A distribuição de renda por escolaridade de qualquer filtro sai
+# dessas contagens (Cube.income_distribution). Ela é gravada em um
+# segundo arquivo (income_path), ligado ao do cubo por um identificador nos
+# metadados dos dois.
+#
+# Se o extrato traz o peso amostral (pnad.weighted.PESO), cada medida ganha
+# uma versão ponderada (prefixo "peso:"; nas faixas de renda, a coluna
+# "peso"), e Cube.weighted() troca as contagens de respondentes pelas
+# estimativas da população.
+#
+# Uso: python -m pnad.cube  (grava dados/cubo.parquet a partir do snapshot)
+import json
+import os
+import sys
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pnad.aggregates import dimension_codes, is_value
+from pnad.income import N_LINEAR, N_SKETCH, distribution_from_bins, income_bins
+from pnad.schema import SINTOMAS
+from pnad.weighted import PESO
+
+DIMENSOES_CUBO = ["data", "sigla_uf", "sexo", "faixa_etaria", "escolaridade"]
+RESPOSTAS_CUBO = ["buscou_ajuda_medica", "home_office", "restringiu_contato_com_pessoas"]
+
+# Colunas dos dados brutos necessárias para montar o cubo
+COLUNAS_CUBO = ["ano", "mes", "sigla_uf", "sexo", "idade", "escolaridade", *SINTOMAS, *RESPOSTAS_CUBO, "renda"]
+
+CUBE_PATH = os.environ.get("PNAD_CUBE_PATH", os.path.join("dados", "cubo.parquet"))
+
+# Colunas da renda em faixas, além das dimensões
+COLUNAS_FAIXAS = ["faixa_renda", "balde_renda"]
+
+# Prefixo das medidas ponderadas pelo peso amostral
+PREFIXO_PESO = "peso:"
+
+AUSENTE = "Não informado"
+
+
+# Mês da pesquisa como no notebook: pd.to_datetime(ano + '-' + mes)
+def month_codes(df):
+    if "data" in df:
+        data = pd.to_datetime(df["data"])
+        periods = (data.dt.year * 100 + data.dt.month).to_numpy()
+    else:
+        periods = df["ano"].to_numpy(dtype=np.int32) * 100 + df["mes"].to_numpy(dtype=np.int32)
+    values, codes = np.unique(periods, return_inverse=True)
+    labels = [pd.Timestamp(year=int(p // 100), month=int(p % 100), day=1) for p in values]
+    return codes, labels
+
+
+def _cube_codes(df, dim):
+    if dim == "data":
+        return month_codes(df)
+    return dimension_codes(df, dim)
+
+
+# Monta o cubo em uma passada: um código de célula por linha e um
+# np.bincount por medida (dois, com o peso amostral)
+def build_cube(df):
+    cell = np.zeros(len(df), dtype=np.int64)
+    labels = []
+    for dim in DIMENSOES_CUBO:
+        codes, dim_labels = _cube_codes(df, dim)
+        size = len(dim_labels) + 1
+        cell = cell * size + np.where(codes < 0, size - 1, codes)
+        labels.append(list(dim_labels) + [AUSENTE])
+    n_cells = int(np.prod([len(dim_labels) for dim_labels in labels]))
+
+    w = None
+    if PESO in df:
+        w = pd.to_numeric(df[PESO], errors="coerce").to_numpy(dtype=float, na_value=0.0)
+    weighted = {}
+
+    measures = {"n": np.bincount(cell, minlength=n_cells)}
+    if w is not None:
+        weighted["n"] = np.bincount(cell, weights=w, minlength=n_cells)
+    for col in SINTOMAS:
+        sim = is_value(df[col])
+        measures[col] = np.bincount(cell, weights=sim, minlength=n_cells).astype(np.int64)
+        if w is not None:
+            weighted[col] = np.bincount(cell, weights=w * sim, minlength=n_cells)
+    for col in RESPOSTAS_CUBO:
+        codes, values = dimension_codes(df, col)
+        k = len(values) + 1
+        key = cell * k + np.where(codes < 0, k - 1, codes)
+        counts = np.bincount(key, minlength=n_cells * k).reshape(n_cells, k)
+        if w is not None:
+            totals = np.bincount(key, weights=w, minlength=n_cells * k).reshape(n_cells, k)
+        for j, value in enumerate(values):
+            measures[f"{col}={value}"] = counts[:, j]
+            if w is not None:
+                weighted[f"{col}={value}"] = totals[:, j]
+
+    renda = df["renda"].to_numpy(dtype=float, na_value=np.nan)
+    valid = ~np.isnan(renda)
+    measures["renda_n"] = np.bincount(cell[valid], minlength=n_cells)
+    measures["renda_soma"] = np.bincount(cell[valid], weights=renda[valid], minlength=n_cells)
+    measures["renda_soma2"] = np.bincount(cell[valid], weights=renda[valid] ** 2, minlength=n_cells)
+    if w is not None:
+        wv = w[valid]
+        weighted["renda_n"] = np.bincount(cell[valid], weights=wv, minlength=n_cells)
+        weighted["renda_soma"] = np.bincount(cell[valid], weights=wv * renda[valid], minlength=n_cells)
+        weighted["renda_soma2"] = np.bincount(cell[valid], weights=wv * renda[valid] ** 2, minlength=n_cells)
+    measures.update({f"{PREFIXO_PESO}{name}": values for name, values in weighted.items()})
+
+    # Dimensões como categorias, na ordem dos rótulos (faixas etárias da
+    # mais nova para a mais velha, meses em ordem cronológica)
+    shape = [len(dim_labels) for dim_labels in labels]
+    occupied = np.flatnonzero(measures["n"])
+    categories = [
+        dim_labels if (dim_codes == len(dim_labels) - 1).any() else dim_labels[:-1]
+        for dim_codes, dim_labels in zip(np.unravel_index(occupied, shape), labels)
+    ]
+    table = _dimension_columns(occupied, shape, categories)
+    table.update({name: values[occupied] for name, values in measures.items()})
+
+    # Renda em faixas: uma linha por (célula, faixa linear, balde)
+    linear, buckets = income_bins(renda[valid])
+    keys, inverse, counts = np.unique(
+        (cell[valid] * (N_LINEAR + 1) + linear + 1) * N_SKETCH + buckets, return_inverse=True, return_counts=True
+    )
+    cells, bins = np.divmod(keys, (N_LINEAR + 1) * N_SKETCH)
+    income = _dimension_columns(cells, shape, categories)
+    income["faixa_renda"] = (bins // N_SKETCH - 1).astype(np.int16)
+    income["balde_renda"] = (bins % N_SKETCH).astype(np.int16)
+    income["n"] = counts
+    if w is not None:
+        income["peso"] = np.bincount(inverse, weights=w[valid], minlength=len(keys))
+    return Cube(pd.DataFrame(table), income_bins=pd.DataFrame(income))
+
+
+def _dimension_columns(cells, shape, categories):
+    return {
+        dim: pd.Categorical.from_codes(dim_codes, categories=dim_categories)
+        for dim, dim_codes, dim_categories in zip(DIMENSOES_CUBO, np.unravel_index(cells, shape), categories)
+    }
+
+
+# Linhas de uma tabela do cubo (células ou faixas de renda) que passam nos
+# filtros; listas vazias ou None não filtram
+def _filter_mask(table, filters):
+    mask = np.ones(len(table), dtype=bool)
+    for dim, value in filters.items():
+        if value is None or (isinstance(value, (list, tuple, set)) and not value):
+            continue
+        if isinstance(value, (list, tuple, set)):
+            mask &= table[dim].isin(list(value)).to_numpy()
+        else:
+            mask &= (table[dim] == value).to_numpy()
+    return mask
+
+
+# Valores presentes de uma coluna, na ordem das categorias
+def _present(column):
+    present = set(column.unique())
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return [v for v in column.cat.categories if v in present and v != AUSENTE]
+    return sorted(v for v in present if v != AUSENTE)
+
+
+# Tabelas do cubo com as categorias das duas partes, para o concat
+def _union_categories(parts):
+    parts = [part.copy() for part in parts]
+    for dim in DIMENSOES_CUBO:
+        categories = list(parts[0][dim].cat.categories)
+        categories += [v for v in parts[1][dim].cat.categories if v not in categories]
+        if dim == "data":
+            categories = sorted(categories, key=lambda v: (v == AUSENTE, str(v)))
+        for part in parts:
+            part[dim] = part[dim].cat.set_categories(categories)
+    return pd.concat(parts, ignore_index=True)
+
+
+# Arquivo da renda em faixas de um cubo salvo em `path`
+def income_path(path):
+    return f"{os.path.splitext(path)[0]}.renda.parquet"
+
+
+def _write_parquet(table, path, metadata):
+    table = pa.Table.from_pandas(table, preserve_index=False)
+    if metadata:
+        merged = dict(table.schema.metadata or {})
+        merged.update({key.encode(): str(value).encode() for key, value in metadata.items()})
+        table = table.replace_schema_metadata(merged)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def _read_parquet(path):
+    table = pq.read_table(path, memory_map=True)
+    metadata = {
+        key.decode(): value.decode() for key, value in (table.schema.metadata or {}).items() if key != b"pandas"
+    }
+    return table.to_pandas(), metadata
+
+
+class Cube:
+    # month_versions: versão de cada mês do snapshot de onde o cubo saiu
+    # (pnad.snapshot.month_versions), gravada nos metadados do arquivo
+    # income_bins: renda em faixas por célula (None em cubos gravados antes
+    # dela existir; cube_for_snapshot os refaz)
+    def __init__(self, table, month_versions=None, income_bins=None):
+        self.table = table
+        self.month_versions = dict(month_versions or {})
+        self.income_bins = income_bins
+
+    def __len__(self):
+        return len(self.table)
+
+    @property
+    def has_weights(self):
+        return f"{PREFIXO_PESO}n" in self.table
+
+    # O mesmo cubo com as medidas ponderadas no lugar das contagens: as
+    # tabelas e a distribuição de renda passam a estimar pessoas da
+    # população, não respondentes
+    def weighted(self):
+        if not self.has_weights:
+            raise KeyError(f"cubo sem as somas do peso amostral '{PESO}' (PNAD_WEIGHT_COLUMN)")
+        columns = [col for col in self.table.columns if col.startswith(PREFIXO_PESO)]
+        table = self.table[DIMENSOES_CUBO + columns].rename(columns=lambda col: col.removeprefix(PREFIXO_PESO))
+        income = self.income_bins
+        if income is not None:
+            income = income.drop(columns="n").rename(columns={"peso": "n"})
+        return Cube(table, self.month_versions, income)
+
+    # Valores presentes de uma dimensão, na ordem das categorias
+    def values(self, dim):
+        return _present(self.table[dim])
+
+    # Restringe o cubo: filter(sigla_uf=["SP", "RJ"], sexo="mulher");
+    # listas vazias ou None não filtram
+    def filter(self, **filters):
+        income = self.income_bins
+        if income is not None:
+            income = income[_filter_mask(income, filters)]
+        return Cube(self.table[_filter_mask(self.table, filters)], self.month_versions, income)
+
+    # Soma as medidas (todas ou `columns`) por uma ou mais dimensões (sem
+    # dimensões: total geral, uma Series); células sem a informação da
+    # dimensão ficam de fora, como no groupby
+    def rollup(self, *dims, columns=None):
+        measures = self.table.drop(columns=DIMENSOES_CUBO)
+        if columns is not None:
+            measures = measures[list(columns)]
+        if not dims:
+            # contagens e somas de renda juntas virariam float64; com tipos
+            # misturados, cada total mantém o tipo da sua coluna
+            totals = {col: measures[col].sum() for col in measures.columns}
+            return pd.Series(totals, index=measures.columns, dtype=None if measures.dtypes.nunique() <= 1 else object)
+        table = self.table
+        for dim in dims:
+            table = table[table[dim] != AUSENTE]
+        return table.groupby(list(dims), observed=True)[list(measures.columns)].sum()
+
+    def measure_columns(self, col):
+        prefix = f"{col}="
+        return [name for name in self.table.columns if name.startswith(prefix)]
+
+    # Contagem de cada resposta de `col` (colunas) por dimensões (linhas)
+    def answers(self, col, *dims):
+        columns = self.measure_columns(col)
+        counts = self.rollup(*dims, columns=columns)
+        labels = {name: name[len(col) + 1 :] for name in columns}
+        return counts.rename(labels) if not dims else counts.rename(columns=labels)
+
+    # Percentual de cada resposta de `col` dentro de cada grupo
+    def shares(self, col, *dims):
+        counts = self.answers(col, *dims)
+        if not dims:
+            return counts / counts.sum() * 100
+        return counts.div(counts.sum(axis=1), axis=0) * 100
+
+    # Casos 'Sim' por sintoma
+    def symptoms(self, *dims):
+        return self.rollup(*dims, columns=SINTOMAS)
+
+    # Média e desvio padrão da renda a partir das somas (sem dimensões: uma
+    # linha "total")
+    def income(self, *dims):
+        sums = self.rollup(*dims, columns=["renda_n", "renda_soma", "renda_soma2"])
+        if not dims:
+            sums = sums.to_frame("total").T.infer_objects()
+        n = sums["renda_n"].astype(float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = sums["renda_soma"] / n
+            var = (sums["renda_soma2"] - n * mean**2) / (n - 1)
+        return pd.DataFrame({"n": sums["renda_n"], "media": mean, "desvio": np.sqrt(np.clip(var, 0, None))})
+
+    # Distribuição da renda por `group` (pnad.income), somando as faixas de
+    # renda das células do cubo
+    def income_distribution(self, group="escolaridade"):
+        income = self.income_bins
+        groups = _present(income[group])
+        codes = pd.Index(groups).get_indexer(income[group]).astype(np.int64)
+        valid = codes >= 0
+        return distribution_from_bins(
+            codes[valid],
+            groups,
+            income["faixa_renda"].to_numpy(dtype=np.int64)[valid],
+            income["balde_renda"].to_numpy(dtype=np.int64)[valid],
+            weights=income["n"].to_numpy()[valid],
+        )
+
+    # Soma cubos montados com partes diferentes dos dados
+    def merge(self, other):
+        table = _union_categories([self.table, other.table])
+        measures = [col for col in table.columns if col not in DIMENSOES_CUBO]
+        # uma resposta ausente em uma das partes vira NaN no concat; as
+        # contagens voltam a ser inteiras
+        dtypes = {**other.table.dtypes.to_dict(), **self.table.dtypes.to_dict()}
+        table[measures] = table[measures].fillna(0).astype({col: dtypes[col] for col in measures})
+        merged = table.groupby(DIMENSOES_CUBO, observed=True, sort=False)[measures].sum().reset_index()
+        income = None
+        if self.income_bins is not None and other.income_bins is not None:
+            income = _union_categories([self.income_bins, other.income_bins])
+            keys = DIMENSOES_CUBO + COLUNAS_FAIXAS
+            counts = [col for col in income.columns if col not in keys]
+            income[counts] = income[counts].fillna(0)
+            income = income.groupby(keys, observed=True, sort=False)[counts].sum().reset_index()
+        return Cube(merged, income_bins=income)
+
+    # Grava a renda em faixas antes do cubo; os dois levam o mesmo
+    # identificador, e load_cube só junta arquivos do mesmo save
+    def save(self, path=CUBE_PATH, metadata=None):
+        metadata = dict(metadata or {})
+        if self.month_versions:
+            metadata["month_versions"] = json.dumps(self.month_versions, sort_keys=True)
+        if self.income_bins is not None:
+            metadata["renda"] = uuid.uuid4().hex
+            _write_parquet(self.income_bins, income_path(path), {"renda": metadata["renda"]})
+        _write_parquet(self.table, path, metadata)
+
+
+def load_cube(path=CUBE_PATH):
+    table, metadata = _read_parquet(path)
+    months = json.loads(metadata.pop("month_versions", "{}"))
+    income = None
+    token = metadata.pop("renda", None)
+    if token is not None and os.path.exists(income_path(path)):
+        income, income_metadata = _read_parquet(income_path(path))
+        if income_metadata.get("renda") != token:
+            income = None
+    return Cube(table, months, income), metadata
+
+
+# Colunas do snapshot lidas para o cubo: COLUNAS_CUBO e o peso amostral,
+# quando o extrato o traz
+def cube_columns(root):
+    from pnad.snapshot import open_snapshot
+
+    return COLUNAS_CUBO + ([PESO] if PESO in open_snapshot(root).schema.names else [])
+
+
+# Cubo salvo se ele corresponde à versão atual do snapshot; senão monta um
+# novo a partir do snapshot e o grava. As versões dos meses são lidas antes
+# dos dados: se o snapshot mudar no meio, o cubo fica com versões antigas e
+# é refeito na próxima consulta, em vez de ficar com dados antigos sob
+# versões novas.
+def cube_for_snapshot(version, path=CUBE_PATH, snapshot_root=None):
+    from pnad.snapshot import SNAPSHOT_DIR, month_versions, read_snapshot
+
+    root = snapshot_root or SNAPSHOT_DIR
+    columns = cube_columns(root)
+    if os.path.exists(path):
+        cube, metadata = load_cube(path)
+        if (
+            metadata.get("snapshot_version") == version
+            and cube.month_versions
+            and cube.income_bins is not None
+            and cube.has_weights == (PESO in columns)
+        ):
+            return cube
+    months = month_versions(root)
+    cube = build_cube(read_snapshot(columns=columns, root=root))
+    cube.month_versions = months
+    cube.save(path, metadata={"snapshot_version": version})
+    return cube
+
+
+if __name__ == "__main__":
+    from pnad.snapshot import SNAPSHOT_DIR, snapshot_version
+
+    root = sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_DIR
+    version = snapshot_version(root)
+    if version is None:
+        sys.exit(f"snapshot não encontrado em {root}")
+    cube = cube_for_snapshot(version, snapshot_root=root)
+    print(f"cubo com {len(cube)} células gravado em {CUBE_PATH}")
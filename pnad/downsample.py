@@ -0,0 +1,391 @@
+# Redução das séries dos gráficos Plotly à largura do gráfico em pixels.
+#
+# O navegador recebe cada figura como JSON: uma série com uma linha por
+# pessoa (centenas de milhares de valores de renda) vira megabytes de
+# payload e um gráfico lento de desenhar, sem nada a mais visível na tela.
+# limit_figure() passa por todos os traços de uma figura e garante que
+# nenhum envia mais pontos do que cabem na largura do gráfico:
+#   - linhas: LTTB (Largest-Triangle-Three-Buckets), que escolhe um ponto
+#     por faixa de x preservando picos e vales;
+#   - pontos soltos (scatter só com marcadores) e histogram2d (contagem ou
+#     z agregado por histfunc, com histnorm): binagem 2D no servidor,
+#     enviada como heatmap;
+#   - histogramas com os valores brutos: valor de cada faixa (histfunc,
+#     histnorm e cumulative aplicados às faixas), enviado como barras;
+#   - box e violin: quartis, mediana, média e cercas de cada caixa,
+#     calculados no servidor e enviados como box pré-calculado (o violin
+#     perde o contorno da densidade e vira uma caixa).
+# O tamanho do payload passa a depender da largura em pixels, não do número
+# de linhas. Os gráficos do painel já partem de tabelas agregadas (cubo e
+# pnad.income) e não mudam; a redução protege gráficos novos que recebam
+# dados linha a linha.
+#
+# Uso: python -m pnad.downsample [linhas ...]  (bytes do JSON antes e depois)
+import os
+import sys
+
+import numpy as np
+
+# Largura útil do conteúdo (.main-content, max-width: 800px) e altura
+# padrão das figuras do Plotly
+LARGURA_PIXELS = int(os.environ.get("PNAD_CHART_WIDTH_PX", 800))
+ALTURA_PIXELS = 450
+
+# Tamanho, em pixels, de uma célula da binagem 2D
+PIXELS_POR_CELULA = 8
+
+
+# Índices dos n_out pontos escolhidos pelo LTTB (x crescente). O primeiro e
+# o último ponto são sempre mantidos; cada faixa intermediária contribui
+# com o ponto que forma o maior triângulo com o ponto escolhido na faixa
+# anterior e a média da faixa seguinte.
+def lttb(x, y, n_out):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        following = slice(edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else slice(n - 1, n)
+        mean_x = x[following].mean()
+        mean_y = y[following].mean()
+        ax, ay = x[previous], y[previous]
+        area = np.abs((ax - mean_x) * (y[start:stop] - ay) - (ax - x[start:stop]) * (mean_y - ay))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+# Célula (iy * nx + ix) de cada ponto válido em uma grade regular, a
+# máscara dos pontos válidos e os centros das células; valores fora de
+# `ranges` ((x0, x1), (y0, y1)) são descartados
+def grid_cells(x, y, nx, ny, ranges=None):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if ranges is None:
+        ranges = ((x[valid].min(), x[valid].max()), (y[valid].min(), y[valid].max())) if valid.any() else ((0, 1), (0, 1))
+    (x0, x1), (y0, y1) = ranges
+    x1 = x1 if x1 > x0 else x0 + 1
+    y1 = y1 if y1 > y0 else y0 + 1
+    valid &= (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+    ix = np.minimum(((x[valid] - x0) / (x1 - x0) * nx).astype(np.int64), nx - 1)
+    iy = np.minimum(((y[valid] - y0) / (y1 - y0) * ny).astype(np.int64), ny - 1)
+    x_centers = x0 + (np.arange(nx) + 0.5) * (x1 - x0) / nx
+    y_centers = y0 + (np.arange(ny) + 0.5) * (y1 - y0) / ny
+    return iy * nx + ix, valid, x_centers, y_centers
+
+
+# Contagens (ny, nx) em uma grade regular (ou somas de `weights`) e os
+# centros das células
+def bin2d(x, y, nx, ny, ranges=None, weights=None):
+    cells, valid, x_centers, y_centers = grid_cells(x, y, nx, ny, ranges)
+    counts = np.bincount(
+        cells, weights=None if weights is None else np.asarray(weights, dtype=float)[valid], minlength=nx * ny
+    )
+    return x_centers, y_centers, counts.reshape(ny, nx)
+
+
+def _numeric(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[ns]").astype(np.int64).astype(float)
+    try:
+        return values.astype(float)
+    except (TypeError, ValueError):
+        return None
+
+
+def _length(values):
+    return 0 if values is None else len(values)
+
+
+# Atributos por ponto que acompanham x e y quando a série é reduzida
+_POR_PONTO = ("text", "hovertext", "customdata", "ids")
+
+
+def _downsample_lines(trace, width):
+    x = _numeric(trace.x)
+    y = _numeric(trace.y)
+    if x is None or y is None:
+        return trace
+    order = np.argsort(x, kind="stable")
+    keep = order[lttb(x[order], np.nan_to_num(y[order]), width)]
+    updates = {"x": np.asarray(trace.x)[keep], "y": np.asarray(trace.y)[keep]}
+    for name in _POR_PONTO:
+        values = getattr(trace, name, None)
+        if values is not None and not isinstance(values, str) and _length(values) == len(x):
+            updates[name] = np.asarray(values)[keep]
+    # cópia: a figura original não é alterada
+    return type(trace)(trace).update(updates)
+
+
+# Valor de cada faixa segundo o histfunc do Plotly ("count", "sum", "avg",
+# "min", "max"), a partir do código da faixa de cada valor; também devolve
+# as contagens
+def _aggregate(codes, values, histfunc, size):
+    counts = np.bincount(codes, minlength=size).astype(float)
+    if values is None or histfunc in (None, "count"):
+        return counts, counts
+    if histfunc in ("sum", "avg"):
+        result = np.bincount(codes, weights=values, minlength=size)
+        if histfunc == "avg":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                result = result / counts
+    else:
+        result = np.full(size, np.nan)
+        (np.fmin if histfunc == "min" else np.fmax).at(result, codes, values)
+    return result, counts
+
+
+# histnorm do Plotly aplicado aos valores das faixas (só para "count" e
+# "sum", como no Plotly); `area` é a largura (ou área, em 2D) de cada faixa.
+# No modo cumulativo, "density" equivale a "" e "probability density" a
+# "probability", também como no Plotly.
+def _normalize(values, histnorm, histfunc, area, cumulative=False):
+    if not histnorm or histfunc not in (None, "count", "sum"):
+        return values
+    if cumulative:
+        histnorm = {"density": "", "probability density": "probability"}.get(histnorm, histnorm)
+    total = np.nansum(values)
+    if histnorm == "percent":
+        return values / total * 100
+    if histnorm == "probability":
+        return values / total
+    if histnorm == "density":
+        return values / area
+    if histnorm == "probability density":
+        return values / total / area
+    return values
+
+
+def _cumulative(values, cumulative):
+    if cumulative.direction == "decreasing":
+        summed = np.cumsum(values[::-1])[::-1]
+    else:
+        summed = np.cumsum(values)
+    if cumulative.currentbin == "exclude":
+        return summed - values
+    if cumulative.currentbin == "half":
+        return summed - values / 2
+    return summed
+
+
+def _heatmap(trace, x, y, width, height, z=None, histfunc=None, histnorm=None):
+    import plotly.graph_objects as go
+
+    nx = max(width // PIXELS_POR_CELULA, 1)
+    ny = max(height // PIXELS_POR_CELULA, 1)
+    if z is not None:
+        # pontos sem z ficam de fora, como no Plotly
+        keep = ~np.isnan(z)
+        x, y, z = x[keep], y[keep], z[keep]
+    cells, valid, x_centers, y_centers = grid_cells(x, y, nx, ny)
+    values, counts = _aggregate(cells, None if z is None else z[valid], histfunc, nx * ny)
+    dx = x_centers[1] - x_centers[0] if nx > 1 else 1.0
+    dy = y_centers[1] - y_centers[0] if ny > 1 else 1.0
+    area = dx * dy
+    values = _normalize(values, histnorm, histfunc, area)
+    counts = counts.reshape(ny, nx)
+    values = values.reshape(ny, nx)
+    return go.Heatmap(
+        x=x_centers,
+        y=y_centers,
+        # float32 (o Plotly envia arrays numpy como binário em base64); NaN
+        # deixa as células vazias transparentes
+        z=np.where(counts > 0, values, np.nan).astype(np.float32),
+        name=trace.name,
+        xaxis=trace.xaxis,
+        yaxis=trace.yaxis,
+        colorscale="Teal",
+        showscale=False,
+        hovertemplate="x: %{x}<br>y: %{y}<br>valor: %{z}<extra></extra>",
+    )
+
+
+def _histogram_bars(trace, width):
+    import plotly.graph_objects as go
+
+    if trace.x is not None and trace.y is not None:
+        horizontal = trace.orientation == "h"
+    else:
+        horizontal = trace.x is None
+    values = _numeric(trace.y if horizontal else trace.x)
+    other = trace.x if horizontal else trace.y
+    weights = None if other is None or trace.histfunc in (None, "count") else _numeric(other)
+    if values is None or (other is not None and trace.histfunc not in (None, "count") and weights is None):
+        return trace
+    valid = ~np.isnan(values)
+    if weights is not None:
+        valid &= ~np.isnan(weights)
+        weights = weights[valid]
+    values = values[valid]
+    bins = trace.nbinsy if horizontal else trace.nbinsx
+    edges = np.histogram_bin_edges(values, bins=min(bins or max(width // PIXELS_POR_CELULA, 1), width))
+    codes = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(edges) - 2)
+    heights, _ = _aggregate(codes, weights, trace.histfunc, len(edges) - 1)
+    cumulative = trace.cumulative.enabled
+    heights = _normalize(heights, trace.histnorm, trace.histfunc, np.diff(edges), cumulative)
+    if cumulative:
+        heights = _cumulative(heights, trace.cumulative)
+    centers = (edges[:-1] + edges[1:]) / 2
+    axes = {"x": heights, "y": centers, "orientation": "h"} if horizontal else {"x": centers, "y": heights}
+    return go.Bar(
+        **axes,
+        width=np.diff(edges),
+        name=trace.name,
+        marker=trace.marker.to_plotly_json(),
+        xaxis=trace.xaxis,
+        yaxis=trace.yaxis,
+        showlegend=trace.showlegend,
+        legendgroup=trace.legendgroup,
+    )
+
+
+# Estatísticas de cada caixa: quartis com interpolação linear (para os n
+# grandes em que a redução se aplica, os métodos do Plotly diferem disso em
+# menos que o espaçamento entre valores vizinhos) e cercas como no Plotly
+# (valores mais extremos dentro de 1,5 IQR dos quartis)
+def box_stats(values, groups=None):
+    import pandas as pd
+
+    values = np.asarray(values, dtype=float)
+    codes, labels = (np.zeros(len(values), dtype=np.int64), [None]) if groups is None else pd.factorize(groups)
+    valid = ~np.isnan(values) & (codes >= 0)
+    codes, values = codes[valid], values[valid]
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+    sizes = np.bincount(codes, minlength=len(labels))
+    present = sizes > 0
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])[present]
+    sizes = sizes[present]
+
+    def quantile(p):
+        position = (sizes - 1) * p
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, sizes - 1)
+        fraction = position - low
+        return values[starts + low] * (1 - fraction) + values[starts + high] * fraction
+
+    q1, median, q3 = quantile(0.25), quantile(0.5), quantile(0.75)
+    spread = 1.5 * (q3 - q1)
+    per_value = np.repeat(np.arange(len(sizes)), sizes)
+    lower = np.where(values >= (q1 - spread)[per_value], values, np.inf)
+    upper = np.where(values <= (q3 + spread)[per_value], values, -np.inf)
+    sums = np.add.reduceat(values, starts)
+    squares = np.add.reduceat((values - (sums / sizes)[per_value]) ** 2, starts)
+    return {
+        "posicoes": [label for label, keep in zip(labels, present) if keep],
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+        "lowerfence": np.minimum.reduceat(lower, starts),
+        "upperfence": np.maximum.reduceat(upper, starts),
+        "mean": sums / sizes,
+        "sd": np.sqrt(squares / np.maximum(sizes - 1, 1)),
+    }
+
+
+def _precomputed_box(trace):
+    import plotly.graph_objects as go
+
+    horizontal = trace.orientation == "h"
+    values = _numeric(trace.x if horizontal else trace.y)
+    groups = trace.y if horizontal else trace.x
+    if values is None:
+        return trace
+    stats = box_stats(values, None if groups is None else np.asarray(groups))
+    positions = stats.pop("posicoes")
+    mean = trace.type == "violin" and trace.meanline.visible or trace.type == "box" and trace.boxmean
+    sd = stats.pop("sd")
+    if not mean:
+        del stats["mean"]
+    elif trace.type == "box" and trace.boxmean == "sd":
+        stats["sd"] = sd
+    axes = {}
+    if groups is not None:
+        axes["y" if horizontal else "x"] = positions
+    else:
+        axes["y0" if horizontal else "x0"] = trace.y0 if horizontal else trace.x0
+    return go.Box(
+        **axes,
+        **stats,
+        boxmean="sd" if "sd" in stats else bool(mean),
+        boxpoints=False,
+        orientation=trace.orientation,
+        name=trace.name,
+        marker=trace.marker.to_plotly_json(),
+        line=trace.line.to_plotly_json(),
+        fillcolor=trace.fillcolor,
+        offsetgroup=trace.offsetgroup,
+        alignmentgroup=trace.alignmentgroup,
+        xaxis=trace.xaxis,
+        yaxis=trace.yaxis,
+        showlegend=trace.showlegend,
+        legendgroup=trace.legendgroup,
+    )
+
+
+# Figura com as séries limitadas à largura (e altura) do gráfico em pixels;
+# a própria figura, se nenhuma série passar do limite
+def limit_figure(fig, width=LARGURA_PIXELS, height=ALTURA_PIXELS):
+    import plotly.graph_objects as go
+
+    width = int(fig.layout.width or width)
+    height = int(fig.layout.height or height)
+    traces = []
+    changed = False
+    for trace in fig.data:
+        original = trace
+        if trace.type in ("scatter", "scattergl") and _length(trace.x) > width:
+            mode = trace.mode or "lines"
+            if "lines" in mode:
+                trace = _downsample_lines(trace, width)
+            elif _length(trace.x) > (width // PIXELS_POR_CELULA) * (height // PIXELS_POR_CELULA):
+                x, y = _numeric(trace.x), _numeric(trace.y)
+                if x is not None and y is not None:
+                    trace = _heatmap(trace, x, y, width, height)
+        elif trace.type == "histogram2d" and _length(trace.x) > width:
+            x, y = _numeric(trace.x), _numeric(trace.y)
+            z = None if trace.z is None else _numeric(trace.z)
+            if x is not None and y is not None and (trace.z is None or z is not None):
+                trace = _heatmap(trace, x, y, width, height, z, trace.histfunc, trace.histnorm)
+        elif trace.type == "histogram" and max(_length(trace.x), _length(trace.y)) > width:
+            trace = _histogram_bars(trace, width)
+        elif trace.type in ("box", "violin") and max(_length(trace.x), _length(trace.y)) > width:
+            trace = _precomputed_box(trace)
+        changed = changed or trace is not original
+        traces.append(trace)
+    if not changed:
+        return fig
+    return go.Figure(data=traces, layout=fig.layout)
+
+
+# Bytes do JSON de figuras com uma linha por valor de renda, antes e depois
+# de limit_figure
+def payload_sizes(n, seed=0):
+    import plotly.express as px
+
+    rng = np.random.default_rng(seed)
+    renda = np.round(rng.lognormal(7.3, 0.9, n), 0)
+    idade = rng.integers(14, 90, n)
+    figures = {
+        "histograma": px.histogram(x=renda, nbins=50),
+        "linha": px.line(x=np.arange(n), y=np.cumsum(renda)),
+        "dispersao": px.scatter(x=idade, y=renda),
+    }
+    return {
+        name: (len(fig.to_json()), len(limit_figure(fig).to_json())) for name, fig in figures.items()
+    }
+
+
+if __name__ == "__main__":
+    for n in [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]:
+        for name, (before, after) in payload_sizes(n).items():
+            print(f"{n:>9} linhas  {name:<11} {before / 1024:10.1f} KiB -> {after / 1024:6.1f} KiB")
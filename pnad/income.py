@@ -0,0 +1,172 @@
+# Distribuição de renda por grupo (escolaridade) em contagens por faixa.
+#
+# Em uma passada vetorizada (dois np.bincount), cada valor de renda entra
+# em duas grades por grupo:
+#   - linear, de 0 a RENDA_MAXIMA em faixas de LARGURA_FAIXA, para os
+#     histogramas e a KDE do gráfico (a KDE é uma convolução via FFT das
+#     contagens com um núcleo gaussiano, sem passar pelas linhas);
+#   - logarítmica, com erro relativo ALFA (como o DDSketch), para os quantis
+#     (mediana, p90, p99) de toda a renda, inclusive acima de RENDA_MAXIMA.
+# As contagens são somáveis: lotes ou filtros diferentes se combinam com
+# merge(), e o gráfico pode ser refeito para qualquer filtro sem os dados.
+# O cubo (pnad.cube) guarda a faixa e o balde de cada valor por célula
+# (income_bins) e monta a distribuição de qualquer filtro com
+# distribution_from_bins, sem reler a renda do snapshot.
+import numpy as np
+import pandas as pd
+
+from pnad.aggregates import dimension_codes
+
+RENDA_MAXIMA = 100000
+LARGURA_FAIXA = 100
+
+# Erro relativo máximo dos quantis e faixa de valores coberta pelo sketch
+ALFA = 0.01
+_GAMMA = (1 + ALFA) / (1 - ALFA)
+_LOG_GAMMA = np.log(_GAMMA)
+_N_LOG = int(np.ceil(np.log(1e8) / _LOG_GAMMA)) + 1
+
+# Colunas das grades linear e logarítmica
+N_LINEAR = RENDA_MAXIMA // LARGURA_FAIXA
+N_SKETCH = 1 + _N_LOG
+
+QUANTIS = (0.5, 0.9, 0.99)
+
+
+class IncomeDistribution:
+    # linear: (grupos, faixas) contagens na grade linear
+    # sketch: (grupos, 1 + _N_LOG) contagens na grade logarítmica; a coluna
+    #         0 guarda renda <= 0
+    def __init__(self, groups, linear, sketch):
+        self.groups = list(groups)
+        self.linear = linear
+        self.sketch = sketch
+
+    @property
+    def edges(self):
+        return np.arange(self.linear.shape[1] + 1) * LARGURA_FAIXA
+
+    def counts(self):
+        return pd.Series(self.sketch.sum(axis=1), index=self.groups)
+
+    def merge(self, other):
+        groups = self.groups + [g for g in other.groups if g not in self.groups]
+        linear = np.zeros((len(groups), self.linear.shape[1]), dtype=np.result_type(self.linear, other.linear))
+        sketch = np.zeros((len(groups), self.sketch.shape[1]), dtype=np.result_type(self.sketch, other.sketch))
+        for source in (self, other):
+            rows = [groups.index(g) for g in source.groups]
+            linear[rows] += source.linear
+            sketch[rows] += source.sketch
+        return IncomeDistribution(groups, linear, sketch)
+
+    # Histograma com `bins` faixas iguais entre 0 e RENDA_MAXIMA (`bins`
+    # deve dividir o número de faixas da grade linear)
+    def histogram(self, group, bins=50):
+        row = self.linear[self.groups.index(group)]
+        counts = row.reshape(bins, -1).sum(axis=1)
+        return np.linspace(0, self.edges[-1], bins + 1), counts
+
+    # KDE gaussiana sobre a grade linear, na escala das contagens de um
+    # histograma com `bins` faixas (como o kde=True do seaborn). A largura
+    # de banda segue a regra de Scott, calculada a partir das contagens.
+    def kde(self, group, bins=50):
+        counts = self.linear[self.groups.index(group)].astype(float)
+        n = counts.sum()
+        centers = self.edges[:-1] + LARGURA_FAIXA / 2
+        if n < 2:
+            return centers, np.zeros_like(centers)
+        mean = (counts * centers).sum() / n
+        std = np.sqrt((counts * (centers - mean) ** 2).sum() / (n - 1))
+        bandwidth = max(std * n ** (-1 / 5), LARGURA_FAIXA) / LARGURA_FAIXA
+
+        size = len(counts)
+        offsets = np.arange(-size, size + 1)
+        kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+        kernel /= kernel.sum()
+        n_fft = 1 << int(np.ceil(np.log2(size + len(kernel) - 1)))
+        smoothed = np.fft.irfft(np.fft.rfft(counts, n_fft) * np.fft.rfft(kernel, n_fft), n_fft)
+        smoothed = smoothed[size : 2 * size].clip(min=0)
+        return centers, smoothed * (size / bins)
+
+    # Quantis da renda com erro relativo de até ALFA
+    def quantiles(self, group, qs=QUANTIS):
+        row = self.sketch[self.groups.index(group)]
+        total = row.sum()
+        if total == 0:
+            return pd.Series(np.nan, index=list(qs))
+        cumulative = np.cumsum(row)
+        values = []
+        for q in qs:
+            bucket = int(np.searchsorted(cumulative, q * (total - 1), side="right"))
+            values.append(0.0 if bucket == 0 else 2 * _GAMMA ** (bucket - 1) / (_GAMMA + 1))
+        return pd.Series(values, index=list(qs))
+
+    def quantile_table(self, qs=QUANTIS):
+        # sem grupos (filtro sem renda), uma tabela vazia com as colunas
+        table = pd.DataFrame(
+            [self.quantiles(group, qs).to_numpy() for group in self.groups],
+            index=self.groups,
+            columns=[f"p{round(q * 100)}" for q in qs],
+            dtype=float,
+        )
+        table.insert(0, "n", self.counts())
+        return table
+
+
+def _log_buckets(renda):
+    buckets = np.zeros(len(renda), dtype=np.int64)
+    positive = renda > 0
+    index = np.ceil(np.log(np.maximum(renda[positive], 1.0)) / _LOG_GAMMA).astype(np.int64)
+    buckets[positive] = 1 + np.clip(index, 0, _N_LOG - 1)
+    return buckets
+
+
+# Faixa da grade linear (-1 fora de 0 a RENDA_MAXIMA) e balde da grade
+# logarítmica de cada valor de renda
+def income_bins(renda):
+    linear = np.full(len(renda), -1, dtype=np.int64)
+    in_range = (renda >= 0) & (renda <= RENDA_MAXIMA)
+    linear[in_range] = np.minimum(renda[in_range] // LARGURA_FAIXA, N_LINEAR - 1)
+    return linear, _log_buckets(renda)
+
+
+# Distribuição a partir das faixas de cada valor (income_bins) e do código
+# do grupo dele; com `weights`, cada posição conta `weights` valores (com
+# pesos fracionários, como o peso amostral, as contagens ficam em float)
+def distribution_from_bins(codes, groups, linear, buckets, weights=None):
+    dtype = np.int64 if weights is None or weights.dtype.kind in "iu" else float
+    in_range = linear >= 0
+    linear_counts = np.bincount(
+        codes[in_range] * N_LINEAR + linear[in_range],
+        weights=None if weights is None else weights[in_range],
+        minlength=len(groups) * N_LINEAR,
+    )
+    sketch = np.bincount(codes * N_SKETCH + buckets, weights=weights, minlength=len(groups) * N_SKETCH)
+    return IncomeDistribution(
+        groups,
+        linear_counts.astype(dtype).reshape(len(groups), N_LINEAR),
+        sketch.astype(dtype).reshape(len(groups), N_SKETCH),
+    )
+
+
+# Distribuição da renda por `group` (ignora linhas sem renda)
+def income_distribution(df, group="escolaridade"):
+    codes, groups = dimension_codes(df, group)
+    renda = df["renda"].to_numpy(dtype=float, na_value=np.nan)
+    valid = ~np.isnan(renda) & (codes >= 0)
+    codes = codes[valid].astype(np.int64)
+    return distribution_from_bins(codes, groups, *income_bins(renda[valid]))
+
+
+# Agregador para pnad.ingest: distribuição atualizada lote a lote
+class IncomeAggregator:
+    def __init__(self, group="escolaridade"):
+        self.group = group
+        self.distribution = None
+
+    def update(self, chunk):
+        partial = income_distribution(chunk, self.group)
+        self.distribution = partial if self.distribution is None else self.distribution.merge(partial)
+
+    def result(self):
+        return self.distribution
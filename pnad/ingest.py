@@ -0,0 +1,148 @@
+# Ingestão em lotes de extratos da PNAD COVID-19 maiores que a memória.
+#
+# O extrato é lido em lotes de tamanho fixo (CSV, Parquet, um diretório de
+# arquivos exportados do BigQuery ou o próprio snapshot). Cada lote recebe
+# as mesmas conversões do notebook (data a partir de ano/mes e idade
+# numérica) e atualiza agregadores incrementais; opcionalmente é gravado
+# no snapshot. Os lotes vão para um snapshot temporário ao lado do destino,
+# que só substitui o atual no fim (ingerir o mesmo extrato de novo não
+# duplica as linhas). A memória fica limitada ao tamanho do lote mais o cubo,
+# qualquer que seja o número de linhas.
+#
+# Uso: python -m pnad.ingest extrato.csv|extrato.parquet|diretorio [--lote N] [--snapshot DIR]
+import glob
+import os
+import shutil
+import sys
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from pnad.cube import CUBE_PATH, build_cube
+
+TAMANHO_LOTE = 250_000
+
+# Arquivos de exportação aceitos em um diretório (ex.: EXPORT DATA do
+# BigQuery gera 000000000000.csv, 000000000001.csv, ...)
+PADROES_EXPORTACAO = ("*.parquet", "*.csv", "*.csv.gz")
+
+
+def _iter_file(path, batch_size, columns):
+    if path.endswith((".csv", ".csv.gz")):
+        yield from pd.read_csv(path, chunksize=batch_size, usecols=columns, dtype={"idade": "string"})
+    else:
+        parquet = pq.ParquetFile(path, memory_map=True)
+        for batch in parquet.iter_batches(batch_size=batch_size, columns=columns):
+            yield batch.to_pandas()
+
+
+# Lotes de até batch_size linhas (DataFrames) lidos da origem
+def iter_batches(source, batch_size=TAMANHO_LOTE, columns=None):
+    if not os.path.isdir(source):
+        yield from _iter_file(source, batch_size, columns)
+        return
+    if any(name.startswith("ano=") for name in os.listdir(source)):
+        from pnad.snapshot import open_snapshot
+
+        for batch in open_snapshot(source).to_batches(columns=columns, batch_size=batch_size):
+            if batch.num_rows:
+                yield batch.to_pandas()
+        return
+    paths = sorted({path for pattern in PADROES_EXPORTACAO for path in glob.glob(os.path.join(source, pattern))})
+    if not paths:
+        raise FileNotFoundError(f"nenhum arquivo de exportação em {source}")
+    for path in paths:
+        yield from _iter_file(path, batch_size, columns)
+
+
+# Conversões do notebook aplicadas a um lote
+def prepare_chunk(df):
+    df = df.copy()
+    if "ano" in df and "mes" in df:
+        # equivalente a pd.to_datetime(ano + '-' + mes, format='%Y-%m'), sem
+        # montar uma string por linha
+        df["data"] = pd.to_datetime(pd.DataFrame({"year": df["ano"], "month": df["mes"], "day": 1}))
+    if "idade" in df:
+        df["idade"] = pd.to_numeric(df["idade"], errors="coerce")
+    return df
+
+
+# Cubo de agregados atualizado lote a lote (Cube.merge é exato para as
+# contagens; as somas de renda diferem do cálculo em memória apenas pelo
+# arredondamento de ponto flutuante da ordem de soma)
+class CubeAggregator:
+    def __init__(self):
+        self.cube = None
+        self.rows = 0
+
+    def update(self, chunk):
+        partial = build_cube(chunk)
+        self.cube = partial if self.cube is None else self.cube.merge(partial)
+        self.rows += len(chunk)
+
+    def result(self):
+        return self.cube
+
+
+# Lê a origem em lotes, atualiza os agregadores e, se snapshot_root for
+# dado, grava os lotes em um snapshot temporário, compactado e trocado pelo
+# de snapshot_root no fim. Retorna os agregadores.
+def ingest(source, aggregators=None, batch_size=TAMANHO_LOTE, snapshot_root=None, columns=None):
+    from pnad.snapshot import compact_snapshot, replace_snapshot, write_snapshot
+
+    if aggregators is None:
+        aggregators = [CubeAggregator()]
+    staging = None
+    if snapshot_root is not None:
+        staging = f"{os.path.normpath(snapshot_root)}.ingest-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+    try:
+        for raw in iter_batches(source, batch_size, columns):
+            if staging is not None:
+                write_snapshot(raw, staging, append=True)
+            chunk = prepare_chunk(raw)
+            for aggregator in aggregators:
+                aggregator.update(chunk)
+        if staging is not None:
+            os.makedirs(staging, exist_ok=True)
+            compact_snapshot(staging)
+            replace_snapshot(staging, snapshot_root)
+    finally:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+    return aggregators
+
+
+# Ingestão completa: snapshot em snapshot_root (opcional) e cubo em
+# cube_path, com as versões do snapshot nos metadados, como em
+# cube_for_snapshot (o painel reaproveita o cubo em vez de remontá-lo)
+def ingest_extract(source, snapshot_root=None, cube_path=CUBE_PATH, batch_size=TAMANHO_LOTE):
+    (cubes,) = ingest(source, batch_size=batch_size, snapshot_root=snapshot_root)
+    cube = cubes.result()
+    metadata = {}
+    if snapshot_root is not None:
+        from pnad.snapshot import month_versions, snapshot_version
+
+        cube.month_versions = month_versions(snapshot_root)
+        metadata["snapshot_version"] = snapshot_version(snapshot_root)
+    cube.save(cube_path, metadata=metadata)
+    return cubes.rows, cube
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args:
+        sys.exit("uso: python -m pnad.ingest extrato.csv|extrato.parquet|diretorio [--lote N] [--snapshot DIR]")
+    options = {"--lote": str(TAMANHO_LOTE), "--snapshot": None}
+    positional = []
+    while args:
+        arg = args.pop(0)
+        if arg in options:
+            options[arg] = args.pop(0)
+        else:
+            positional.append(arg)
+
+    rows, cube = ingest_extract(
+        positional[0], snapshot_root=options["--snapshot"], batch_size=int(options["--lote"])
+    )
+    print(f"{rows} linhas em lotes de {options['--lote']}; cubo com {len(cube)} células em {CUBE_PATH}")
@@ -0,0 +1,324 @@
+# Instrumentação das execuções (reruns) do painel.
+#
+# Com PNAD_METRICS=log (ou debug), cada execução do app.py registra, por
+# seção: tempo de parede, bytes enviados ao navegador por tipo de elemento
+# (markdown, plotly_chart, ...), bytes das imagens referenciadas, acertos e
+# faltas dos caches, a variação de RSS e o pico de RSS durante a seção. Ao fim da execução o resumo vira
+# uma linha JSON no logger "pnad.metrics" (stderr ou PNAD_METRICS_FILE) e
+# fica nas últimas execuções do processo (recent_runs), que o painel de
+# depuração da barra lateral mostra com PNAD_METRICS=debug.
+#
+# Os bytes enviados são medidos nas mensagens (ForwardMsg) que o Streamlit
+# enfileira para a sessão, interceptando ScriptRunContext._enqueue; se essa
+# interface interna mudar, só essa medida deixa de ser registrada.
+#
+# A coleta fica em uma variável por thread: cada sessão executa o app.py na
+# sua própria thread, e as funções em cache rodam na mesma thread da
+# execução que as chamou.
+#
+# O pico de RSS é amostrado por uma thread (_RssSampler) a cada
+# PNAD_METRICS_SAMPLE_MS enquanto houver execução aberta: vale para a
+# execução e para cada seção, e não o máximo do processo desde a partida
+# (ru_maxrss). O RSS é do processo todo, então execuções simultâneas de
+# outras sessões entram no pico.
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
+METRICS_MODE = os.environ.get("PNAD_METRICS", "off")
+METRICS_FILE = os.environ.get("PNAD_METRICS_FILE")
+INTERVALO_AMOSTRA = float(os.environ.get("PNAD_METRICS_SAMPLE_MS", "5")) / 1000
+
+# Seção usada para o que é desenhado fora das seções (menu, filtros)
+FORA_DE_SECAO = "(fora de seções)"
+
+logger = logging.getLogger("pnad.metrics")
+
+_local = threading.local()
+_recent = deque(maxlen=200)
+_recent_lock = threading.Lock()
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return 0.0
+
+
+# Amostra o RSS enquanto houver execuções abertas e guarda o máximo no
+# registro da execução e no da seção atual de cada uma. As execuções ficam
+# em um WeakSet: uma execução interrompida (rerun, sessão fechada) sai dele
+# quando é descartada, e a thread termina sozinha quando não resta nenhuma
+class _RssSampler:
+    def __init__(self, interval=INTERVALO_AMOSTRA):
+        self.interval = interval
+        self._runs = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def sample(self, metrics):
+        metrics.peak(_rss_mb())
+
+    def open(self, metrics):
+        self.sample(metrics)
+        with self._lock:
+            self._runs.add(metrics)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pnad-metrics-rss", daemon=True)
+                self._thread.start()
+
+    def close(self, metrics):
+        self.sample(metrics)
+        with self._lock:
+            self._runs.discard(metrics)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            rss = _rss_mb()
+            with self._lock:
+                runs = list(self._runs)
+                if not runs:
+                    self._thread = None
+                    return
+            for metrics in runs:
+                metrics.peak(rss)
+
+
+_sampler = _RssSampler()
+
+
+def _section_record(name):
+    return {
+        "secao": name,
+        "tempo_ms": 0.0,
+        "bytes": {},
+        "imagens_bytes": 0,
+        "cache": {},
+        "rss_delta_mb": 0.0,
+        "rss_pico_mb": 0.0,
+    }
+
+
+class RenderMetrics:
+    def __init__(self, session=None, mode=None):
+        self.session = session
+        self.mode = mode
+        self.started = time.perf_counter()
+        self.sections = {FORA_DE_SECAO: _section_record(FORA_DE_SECAO)}
+        self.current = self.sections[FORA_DE_SECAO]
+        self.rss_pico_mb = 0.0
+        _sampler.open(self)
+
+    @contextmanager
+    def section(self, name):
+        record = self.sections.setdefault(name, _section_record(name))
+        previous, self.current = self.current, record
+        rss = _rss_mb()
+        self.peak(rss)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["tempo_ms"] += (time.perf_counter() - start) * 1000
+            rss_end = _rss_mb()
+            self.peak(rss_end)
+            record["rss_delta_mb"] += rss_end - rss
+            self.current = previous
+
+    # Pico de RSS da execução e da seção atual
+    def peak(self, rss):
+        self.rss_pico_mb = max(self.rss_pico_mb, rss)
+        record = self.current
+        record["rss_pico_mb"] = max(record["rss_pico_mb"], rss)
+
+    def add_bytes(self, kind, size):
+        counts = self.current["bytes"]
+        counts[kind] = counts.get(kind, 0) + size
+
+    def add_image_bytes(self, size):
+        self.current["imagens_bytes"] += size
+
+    def _cache(self, name):
+        return self.current["cache"].setdefault(name, {"hits": 0, "misses": 0})
+
+    # Uma consulta a um cache; faltas podem ser registradas depois, de
+    # dentro da função em cache (cache_miss)
+    def cache_call(self, name, hit=True):
+        self._cache(name)["hits" if hit else "misses"] += 1
+
+    def cache_miss(self, name):
+        counts = self._cache(name)
+        if counts["hits"] > 0:
+            counts["hits"] -= 1
+        counts["misses"] += 1
+
+    def summary(self):
+        _sampler.close(self)
+        total_ms = (time.perf_counter() - self.started) * 1000
+        outside = self.sections[FORA_DE_SECAO]
+        outside["tempo_ms"] = total_ms - sum(
+            record["tempo_ms"] for record in self.sections.values() if record is not outside
+        )
+        sections = []
+        for record in self.sections.values():
+            record = dict(
+                record,
+                tempo_ms=round(record["tempo_ms"], 1),
+                rss_delta_mb=round(record["rss_delta_mb"], 1),
+                rss_pico_mb=round(record["rss_pico_mb"], 1),
+            )
+            record["bytes_total"] = sum(record["bytes"].values())
+            sections.append(record)
+        return {
+            "evento": "render",
+            "hora": round(time.time(), 3),
+            "sessao": self.session,
+            "modo": self.mode,
+            "total_ms": round(total_ms, 1),
+            "bytes_total": sum(record["bytes_total"] for record in sections),
+            "rss_mb": round(_rss_mb(), 1),
+            "rss_pico_mb": round(self.rss_pico_mb, 1),
+            "secoes": sections,
+        }
+
+
+def _configure_logger():
+    if logger.handlers:
+        return
+    handler = logging.FileHandler(METRICS_FILE, encoding="utf-8") if METRICS_FILE else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+# Conta o tamanho de cada mensagem enviada à sessão, pelo tipo de elemento
+def _count_message(msg):
+    metrics = current()
+    if metrics is None:
+        return
+    kind = msg.WhichOneof("type")
+    if kind == "delta":
+        kind = msg.delta.WhichOneof("type")
+        if kind == "new_element":
+            kind = msg.delta.new_element.WhichOneof("type")
+    metrics.add_bytes(kind or "outros", msg.ByteSize())
+
+
+def _script_context():
+    try:
+        from streamlit.runtime.scriptrunner_utils.script_run_context import get_script_run_ctx
+    except ImportError:
+        return None
+    return get_script_run_ctx()
+
+
+def _hook_messages(ctx):
+    # o contexto é o mesmo em todas as execuções da sessão: instala uma vez
+    if ctx is None or not callable(getattr(ctx, "_enqueue", None)) or getattr(ctx, "_pnad_metrics", False):
+        return
+    original = ctx._enqueue
+
+    def enqueue(msg):
+        _count_message(msg)
+        original(msg)
+
+    ctx._enqueue = enqueue
+    ctx._pnad_metrics = True
+
+
+def enabled():
+    return METRICS_MODE in ("log", "debug")
+
+
+# Começa a coleta de uma execução (None se a instrumentação estiver
+# desligada)
+def start_run(mode=None):
+    if not enabled():
+        _local.metrics = None
+        return None
+    _configure_logger()
+    ctx = _script_context()
+    _hook_messages(ctx)
+    _local.metrics = RenderMetrics(getattr(ctx, "session_id", None), mode)
+    return _local.metrics
+
+
+def current():
+    return getattr(_local, "metrics", None)
+
+
+# Encerra a coleta: grava a linha JSON e guarda o resumo em recent_runs
+def finish_run():
+    metrics = current()
+    if metrics is None:
+        return None
+    _local.metrics = None
+    record = metrics.summary()
+    logger.info(json.dumps(record, ensure_ascii=False))
+    with _recent_lock:
+        _recent.append(record)
+    return record
+
+
+@contextmanager
+def section(name):
+    metrics = current()
+    if metrics is None:
+        yield None
+    else:
+        with metrics.section(name) as record:
+            yield record
+
+
+def record_image_bytes(size):
+    metrics = current()
+    if metrics is not None:
+        metrics.add_image_bytes(size)
+
+
+def cache_call(name, hit=True):
+    metrics = current()
+    if metrics is not None:
+        metrics.cache_call(name, hit)
+
+
+def cache_miss(name):
+    metrics = current()
+    if metrics is not None:
+        metrics.cache_miss(name)
+
+
+def recent_runs():
+    with _recent_lock:
+        return list(_recent)
+
+
+# Tempo e bytes por seção nas últimas execuções do processo: número de
+# execuções, mediana e p95 do tempo, média de bytes
+def section_stats(runs=None):
+    by_section = {}
+    for run in recent_runs() if runs is None else runs:
+        for record in run["secoes"]:
+            stats = by_section.setdefault(record["secao"], {"tempos": [], "bytes": []})
+            stats["tempos"].append(record["tempo_ms"])
+            stats["bytes"].append(record["bytes_total"])
+    table = []
+    for name, stats in by_section.items():
+        tempos = sorted(stats["tempos"])
+        table.append({
+            "secao": name,
+            "execucoes": len(tempos),
+            "p50_ms": tempos[len(tempos) // 2],
+            "p95_ms": tempos[min(int(len(tempos) * 0.95), len(tempos) - 1)],
+            "bytes_medio": round(sum(stats["bytes"]) / len(stats["bytes"])),
+        })
+    return table
@@ -0,0 +1,138 @@
+# Atualização mensal incremental do snapshot e do cubo de agregados.
+#
+# O notebook refazia todas as estatísticas sobre o extrato inteiro a cada
+# mês novo da pesquisa. As medidas do cubo (contagens de sintomas e de
+# respostas, somas de renda) são somas, então um mês novo (ou reprocessado)
+# pode entrar como um delta:
+#   1. o extrato do delta é lido em lotes e gravado em um snapshot
+#      temporário, ao lado do atual, enquanto um cubo só do delta é montado;
+#   2. as partições ano=/mes= dos meses do delta substituem as do snapshot
+#      (meses novos são acrescentados, os demais ficam intocados);
+#   3. as células desses meses (e a renda em faixas delas) saem do cubo
+#      salvo e as do delta entram (Cube.merge), sem reler o histórico.
+# O custo é o de ler um mês de linhas, não a série inteira. Se o cubo salvo
+# não corresponde ao snapshot anterior à atualização, ele é refeito a partir
+# do snapshot inteiro.
+#
+# Como só os arquivos dos meses do delta mudam, a versão por mês do snapshot
+# (pnad.snapshot.month_versions) muda só para esses meses. As versões ficam
+# nos metadados do cubo, e o painel só recalcula as tabelas dos gráficos
+# cujo filtro de mês inclui algum deles.
+#
+# Uso: python -m pnad.refresh delta.csv|delta.parquet|diretorio [--snapshot DIR] [--lote N]
+import os
+import shutil
+import sys
+
+import pandas as pd
+
+from pnad.cube import CUBE_PATH, DIMENSOES_CUBO, Cube, build_cube, cube_columns, load_cube
+from pnad.ingest import TAMANHO_LOTE, ingest
+from pnad.snapshot import SNAPSHOT_DIR, month_versions, read_snapshot, snapshot_version
+from pnad.weighted import PESO
+
+
+# Partições de mês de um snapshot: [(caminho relativo "ano=.../mes=...", ano, mes)]
+def month_partitions(root):
+    months = []
+    for year_dir in sorted(os.listdir(root)):
+        if not year_dir.startswith("ano="):
+            continue
+        for month_dir in sorted(os.listdir(os.path.join(root, year_dir))):
+            if month_dir.startswith("mes="):
+                months.append((os.path.join(year_dir, month_dir), int(year_dir[4:]), int(month_dir[4:])))
+    return months
+
+
+# Troca as partições dos meses do snapshot pelas do snapshot temporário. A
+# partição antiga é renomeada com um ponto na frente (ignorada pelas
+# leituras) antes de ser apagada.
+def replace_partitions(staging, root):
+    for relative, _, _ in month_partitions(staging):
+        target = os.path.join(root, relative)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        old = None
+        if os.path.exists(target):
+            old = os.path.join(os.path.dirname(target), f".{os.path.basename(target)}.old-{os.getpid()}")
+            os.replace(target, old)
+        os.replace(os.path.join(staging, relative), target)
+        if old is not None:
+            shutil.rmtree(old)
+
+
+# Linhas de uma tabela do cubo fora dos meses `months`, com as dimensões
+# como categorias (o Parquet devolve o mês como datetime; Cube.merge junta
+# categorias)
+def _without_months(table, months):
+    kept = table[~table["data"].isin(months)].reset_index(drop=True)
+    for dim in DIMENSOES_CUBO:
+        if isinstance(kept[dim].dtype, pd.CategoricalDtype):
+            kept[dim] = kept[dim].cat.remove_unused_categories()
+        else:
+            kept[dim] = kept[dim].astype("category")
+    return kept
+
+
+# Cubo (e renda em faixas) com as células dos meses de `delta` substituídas
+# pelas do delta
+def replace_months(cube, delta):
+    months = list(delta.table["data"].unique())
+    income = None if cube.income_bins is None else _without_months(cube.income_bins, months)
+    return Cube(_without_months(cube.table, months), income_bins=income).merge(delta)
+
+
+def refresh(source, snapshot_root=SNAPSHOT_DIR, cube_path=CUBE_PATH, batch_size=TAMANHO_LOTE):
+    previous = snapshot_version(snapshot_root)
+    cube = None
+    if previous is not None and os.path.exists(cube_path):
+        cube, metadata = load_cube(cube_path)
+        if (
+            metadata.get("snapshot_version") != previous
+            or cube.income_bins is None
+            or cube.has_weights != (PESO in cube_columns(snapshot_root))
+        ):
+            cube = None
+
+    staging = f"{os.path.normpath(snapshot_root)}.refresh-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    try:
+        (delta,) = ingest(source, batch_size=batch_size, snapshot_root=staging)
+        if delta.rows == 0:
+            raise ValueError(f"delta vazio: {source}")
+        months = [f"{year:04d}-{month:02d}" for _, year, month in month_partitions(staging)]
+        replace_partitions(staging, snapshot_root)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    delta_cube = delta.result()
+    if cube is not None and cube.has_weights != delta_cube.has_weights:
+        cube = None
+    incremental = cube is not None
+    versions = month_versions(snapshot_root)
+    if cube is None:
+        cube = build_cube(read_snapshot(columns=cube_columns(snapshot_root), root=snapshot_root))
+    else:
+        cube = replace_months(cube, delta_cube)
+    cube.month_versions = versions
+    cube.save(cube_path, metadata={"snapshot_version": snapshot_version(snapshot_root)})
+    return {"linhas": delta.rows, "meses": months, "celulas": len(cube), "incremental": incremental}
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args:
+        sys.exit("uso: python -m pnad.refresh delta.csv|delta.parquet|diretorio [--snapshot DIR] [--lote N]")
+    options = {"--lote": str(TAMANHO_LOTE), "--snapshot": SNAPSHOT_DIR}
+    positional = []
+    while args:
+        arg = args.pop(0)
+        if arg in options:
+            options[arg] = args.pop(0)
+        else:
+            positional.append(arg)
+
+    result = refresh(positional[0], snapshot_root=options["--snapshot"], batch_size=int(options["--lote"]))
+    print(
+        f"{result['linhas']} linhas dos meses {', '.join(result['meses'])}; "
+        f"cubo com {result['celulas']} células em {CUBE_PATH}"
+    )
@@ -0,0 +1,36 @@
+# Colunas do extrato da PNAD COVID-19 usado no notebook
+# (consulta em basedosdados.br_ibge_pnad_covid.microdados)
+
+SINTOMAS = ["dificuldade_respiracao", "dor_olhos", "perda_oufato_paladar", "tosse"]
+
+# Colunas de resposta com poucos valores distintos ('Sim', 'Não', ...)
+CATEGORICAS = [
+    "sigla_uf",
+    "sexo",
+    "escolaridade",
+    *SINTOMAS,
+    "empregado",
+    "este_domicilio_e",
+    "aula_presencial",
+    "buscou_ajuda_medica",
+    "restringiu_contato_com_pessoas",
+    "home_office",
+    "resultado_covid_cotonete",
+    "resultado_covid_sangue_furo_dedo",
+    "resultado_covid_sangue_veia_braco",
+]
+
+# Níveis de escolaridade na ordem da consulta (a005 de 1 a 8)
+ESCOLARIDADES = [
+    "Sem instrução",
+    "Fundamental incompleto",
+    "Fundamental completa",
+    "Médio incompleto",
+    "Médio completo",
+    "Superior incompleto",
+    "Superior completo",
+    "Pós-graduação, mestrado ou doutorado",
+]
+
+# Partições do snapshot em Parquet (ano=2020/mes=5/sigla_uf=SP/...)
+PARTICOES = ["ano", "mes", "sigla_uf"]
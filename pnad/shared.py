@@ -0,0 +1,167 @@
+# Artefatos compartilhados entre os processos do painel (modo de serviço).
+#
+# Com vários processos do Streamlit atrás de um balanceador, cada um montava
+# o cubo, relia o snapshot para a distribuição de renda, calculava as
+# tabelas dos gráficos e codificava as imagens por conta própria: o trabalho
+# e a memória cresciam com o número de processos. Com PNAD_SHARED_DIR
+# definido, esses artefatos são montados uma vez e lidos pelos demais:
+#   - tabelas (cubo e tabelas dos gráficos): Arrow IPC sem compressão, lidas
+#     com memory map. As páginas ficam no cache de páginas do sistema,
+#     compartilhadas entre os processos, em vez de serem decodificadas no
+#     heap de cada um;
+#   - textos (imagens em base64 do modo inline): arquivos simples.
+# O snapshot já é Parquet lido com memory map, então é compartilhado do
+# mesmo jeito; o que os processos deixam de repetir é o trabalho em cima
+# dele.
+#
+# Quem não encontra um artefato pega um lock exclusivo (flock) da chave e o
+# monta; os outros processos esperam o lock e leem o resultado. A gravação é
+# atômica (diretório temporário + os.replace), então um leitor nunca vê um
+# artefato pela metade. As chaves ficam sob a versão do snapshot, e prune()
+# apaga as versões antigas (quem ainda as tem mapeadas continua lendo: no
+# Linux o arquivo só some de fato quando o último mapeamento é fechado).
+# Um processo que ainda não viu a versão nova continua usando a antiga, então
+# prune() só apaga versões sem leitura nem gravação há PNAD_SHARED_GRACE_S
+# segundos: cada acesso atualiza o mtime do diretório da versão.
+import fcntl
+import hashlib
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+SHARED_DIR = os.environ.get("PNAD_SHARED_DIR")
+
+# Segundos sem uso antes de uma versão antiga poder ser apagada por prune()
+CARENCIA = float(os.environ.get("PNAD_SHARED_GRACE_S", 600))
+
+EXTENSAO = ".arrow"
+
+
+class SharedStore:
+    def __init__(self, root=SHARED_DIR):
+        self.root = root
+        self.hits = 0
+        self.misses = 0
+
+    # Diretório do artefato: <raiz>/<espaço>/<versão>/<hash da chave>
+    def _path(self, namespace, version, key):
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()[:16]
+        return os.path.join(self.root, namespace, str(version), digest)
+
+    @contextmanager
+    def _lock(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Lê o artefato ou, se ele não existir, monta com build() e grava com
+    # dump(valor, diretório); só um processo por chave executa build()
+    def _get_or_build(self, path, build, dump, load):
+        if os.path.isdir(path):
+            self.hits += 1
+            _touch(os.path.dirname(path))
+            return load(path)
+        with self._lock(path):
+            if os.path.isdir(path):
+                self.hits += 1
+                return load(path)
+            value = build()
+            tmp = f"{path}.{os.getpid()}.tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            dump(value, tmp)
+            os.replace(tmp, path)
+            self.misses += 1
+        return load(path)
+
+    # DataFrame, ou dicionário (aninhado) de DataFrames, como nas tabelas
+    # dos gráficos (pnad.charts.chart_data)
+    def frames(self, namespace, version, key, build):
+        return self._get_or_build(self._path(namespace, version, key), build, _dump_frames, _load_frames)
+
+    def text(self, namespace, version, key, build):
+        return self._get_or_build(self._path(namespace, version, key), build, _dump_text, _load_text)
+
+    # Remove as versões de um espaço diferentes de `keep` (uma versão, ou
+    # uma função que recebe o nome da versão e diz se ela fica) e sem uso há
+    # mais de `grace` segundos
+    def prune(self, namespace, keep, grace=CARENCIA):
+        base = os.path.join(self.root, namespace)
+        if not os.path.isdir(base):
+            return
+        if not callable(keep):
+            keep = str(keep).__eq__
+        limit = time.time() - grace
+        for name in os.listdir(base):
+            if keep(name):
+                continue
+            path = os.path.join(base, name)
+            try:
+                if os.stat(path).st_mtime > limit:
+                    continue
+            except FileNotFoundError:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _dump_frames(value, directory):
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    if isinstance(value, pd.DataFrame):
+        value = {"": value}
+    for name, item in value.items():
+        if isinstance(item, dict):
+            os.makedirs(os.path.join(directory, name))
+            _dump_frames(item, os.path.join(directory, name))
+            continue
+        table = pa.Table.from_pandas(item)
+        with ipc.new_file(os.path.join(directory, name + EXTENSAO), table.schema) as writer:
+            writer.write_table(table)
+
+
+def _load_frames(directory):
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    value = {}
+    for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+        if entry.is_dir():
+            value[entry.name] = _load_frames(entry.path)
+        elif entry.name.endswith(EXTENSAO):
+            # split_blocks evita juntar as colunas em um bloco novo: as
+            # colunas numéricas sem nulos continuam apontando para o mapeamento
+            table = ipc.open_file(pa.memory_map(entry.path)).read_all()
+            value[entry.name[: -len(EXTENSAO)]] = table.to_pandas(split_blocks=True)
+    return value.pop("") if "" in value else value
+
+
+def _dump_text(value, directory):
+    with open(os.path.join(directory, "valor.txt"), "w", encoding="utf-8") as out:
+        out.write(value)
+
+
+def _load_text(directory):
+    with open(os.path.join(directory, "valor.txt"), encoding="utf-8") as f:
+        return f.read()
+
+
+# Armazém configurado em PNAD_SHARED_DIR (None fora do modo de serviço)
+def shared_store():
+    return SharedStore(SHARED_DIR) if SHARED_DIR else None
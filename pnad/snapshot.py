@@ -0,0 +1,197 @@
+# Snapshot local do extrato da PNAD COVID-19 em Parquet particionado.
+#
+# O extrato é baixado do BigQuery uma única vez e gravado em
+# dados/snapshot/ano=.../mes=.../sigla_uf=.../, com as colunas de resposta
+# codificadas como dicionário (categorias). As leituras seguintes usam
+# memory map e carregam só as colunas e partições pedidas, em vez de
+# consultar o BigQuery e manter ~1M de strings por coluna em memória.
+#
+# Uso: python -m pnad.snapshot extrato.parquet|extrato.csv [destino]
+#
+# pandas e pyarrow são importados dentro das funções: o painel consulta
+# snapshot_version() a cada execução, inclusive sem snapshot, e não deve
+# carregar essas bibliotecas só para isso.
+import hashlib
+import os
+import shutil
+import sys
+import uuid
+
+from pnad.schema import CATEGORICAS, PARTICOES
+
+SNAPSHOT_DIR = os.environ.get("PNAD_SNAPSHOT_DIR", os.path.join("dados", "snapshot"))
+
+
+# Converte os tipos do extrato: categorias para as respostas e inteiros
+# compactos para ano, mes, idade e morador
+def prepare(df):
+    import pandas as pd
+
+    df = df.copy()
+    for col in CATEGORICAS:
+        if col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    for col, dtype in (("ano", "int16"), ("mes", "int8")):
+        if col in df:
+            df[col] = df[col].astype(dtype)
+    for col in ("idade", "morador"):
+        if col in df:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int16")
+    return df
+
+
+# append=True acrescenta arquivos às partições existentes (ingestão em
+# lotes); senão as partições presentes em df são substituídas
+def write_snapshot(df, root=SNAPSHOT_DIR, append=False):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    table = pa.Table.from_pandas(prepare(df), preserve_index=False)
+    partitioning = ds.partitioning(
+        pa.schema([table.schema.field(col) for col in PARTICOES]), flavor="hive"
+    )
+    ds.write_dataset(
+        table,
+        root,
+        format="parquet",
+        partitioning=partitioning,
+        existing_data_behavior="overwrite_or_ignore" if append else "delete_matching",
+        basename_template=f"part-{uuid.uuid4().hex[:12]}-{{i}}.parquet" if append else "part-{i}.parquet",
+        # sem isso cada lote de entrada vira um row group de poucas centenas
+        # de linhas por partição, e a leitura fica dominada por metadados
+        min_rows_per_group=1 << 17,
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+    )
+
+
+# Junta os arquivos de cada partição em um só (após gravações com
+# append=True); lê uma partição por vez, então a memória fica limitada ao
+# tamanho de uma partição (um mês de uma UF)
+def compact_snapshot(root=SNAPSHOT_DIR):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    for dirpath, _, filenames in os.walk(root):
+        parts = sorted(name for name in filenames if name.endswith(".parquet"))
+        if len(parts) < 2:
+            continue
+        table = pa.concat_tables(
+            [pq.read_table(os.path.join(dirpath, name)) for name in parts], promote_options="permissive"
+        ).unify_dictionaries()
+        tmp = os.path.join(dirpath, f".compact-{os.getpid()}.tmp")
+        pq.write_table(table, tmp, compression="zstd")
+        for name in parts:
+            os.remove(os.path.join(dirpath, name))
+        os.replace(tmp, os.path.join(dirpath, "part-0.parquet"))
+
+
+# Troca o snapshot inteiro pelo de `staging` (gravado ao lado, no mesmo
+# sistema de arquivos): o atual é renomeado antes de ser apagado, então uma
+# segunda ingestão do mesmo extrato não duplica as linhas
+def replace_snapshot(staging, root=SNAPSHOT_DIR):
+    old = None
+    if os.path.exists(root):
+        old = f"{os.path.normpath(root)}.old-{os.getpid()}"
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(root, old)
+    os.replace(staging, root)
+    if old is not None:
+        shutil.rmtree(old)
+
+
+def snapshot_exists(root=SNAPSHOT_DIR):
+    return os.path.isdir(root) and any(name.startswith("ano=") for name in os.listdir(root))
+
+
+# Identifica o conteúdo atual do snapshot (muda quando algum arquivo é
+# regravado); None se não houver snapshot
+def snapshot_version(root=SNAPSHOT_DIR):
+    stamps = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            stat = os.stat(os.path.join(dirpath, filename))
+            stamps.append((os.path.relpath(os.path.join(dirpath, filename), root), stat.st_mtime_ns, stat.st_size))
+    if not stamps:
+        return None
+    return hashlib.sha1(repr(sorted(stamps)).encode()).hexdigest()
+
+
+# Versão de cada mês do snapshot ({"2020-05": hash, ...}): uma atualização
+# mensal (pnad.refresh) regrava só as partições dos seus meses, então só a
+# versão desses meses muda
+def month_versions(root=SNAPSHOT_DIR):
+    stamps = {}
+    for dirpath, _, filenames in os.walk(root):
+        parts = dict(
+            part.split("=", 1) for part in os.path.relpath(dirpath, root).split(os.sep) if "=" in part
+        )
+        if "ano" not in parts or "mes" not in parts:
+            continue
+        month = f"{int(parts['ano']):04d}-{int(parts['mes']):02d}"
+        for filename in filenames:
+            stat = os.stat(os.path.join(dirpath, filename))
+            stamps.setdefault(month, []).append(
+                (os.path.relpath(os.path.join(dirpath, filename), root), stat.st_mtime_ns, stat.st_size)
+            )
+    return {month: hashlib.sha1(repr(sorted(items)).encode()).hexdigest() for month, items in sorted(stamps.items())}
+
+
+def open_snapshot(root=SNAPSHOT_DIR):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    partitioning = ds.partitioning(
+        pa.schema([("ano", pa.int16()), ("mes", pa.int8()), ("sigla_uf", pa.string())]), flavor="hive"
+    )
+    return ds.dataset(
+        root,
+        format="parquet",
+        partitioning=partitioning,
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+
+
+# Filtro de partição/coluna no formato {"mes": [5, 6], "sigla_uf": "SP"}
+def filter_expression(filters):
+    import pyarrow.dataset as ds
+
+    if filters is None or isinstance(filters, ds.Expression):
+        return filters
+    expression = None
+    for col, value in filters.items():
+        if isinstance(value, (list, tuple, set)):
+            condition = ds.field(col).isin(list(value))
+        else:
+            condition = ds.field(col) == value
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+# Lê o snapshot como DataFrame, só com as colunas e partições pedidas
+def read_snapshot(columns=None, filters=None, root=SNAPSHOT_DIR):
+    import pyarrow.compute as pc
+
+    dataset = open_snapshot(root)
+    table = dataset.to_table(columns=columns, filter=filter_expression(filters))
+    if "sigla_uf" in table.column_names:
+        index = table.column_names.index("sigla_uf")
+        table = table.set_column(index, "sigla_uf", pc.dictionary_encode(table.column(index)))
+    return table.to_pandas()
+
+
+def load_extract(path):
+    import pandas as pd
+
+    if path.endswith(".csv"):
+        return pd.read_csv(path, dtype={"idade": "string"})
+    return pd.read_parquet(path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("uso: python -m pnad.snapshot extrato.parquet|extrato.csv [destino]")
+    destino = sys.argv[2] if len(sys.argv) > 2 else SNAPSHOT_DIR
+    extrato = load_extract(sys.argv[1])
+    write_snapshot(extrato, destino)
+    print(f"{len(extrato)} linhas gravadas em {destino}")
@@ -0,0 +1,229 @@
+# Variantes responsivas das imagens do painel (capa e gráficos).
+#
+# Para cada imagem de origem gera versões redimensionadas em AVIF e WebP
+# (e JPEG progressivo para fotos) em algumas larguras, e um manifest.json
+# com os srcsets. O navegador escolhe a menor variante que atende à largura
+# exibida. O processamento é incremental: só imagens alteradas desde a
+# última execução são reprocessadas.
+#
+# Uso: python -m pnad.variants [--force] [imagens...]
+#
+# O PIL é importado só nas funções que geram as variantes: o painel usa
+# apenas o manifesto (VariantManifest) e não deve carregá-lo na partida.
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+VARIANTS_DIR = os.path.join("static", "variants")
+MANIFEST_NAME = "manifest.json"
+
+WIDTHS = (480, 800, 1200, 1600, 2400)
+QUALITY = {"avif": 55, "webp": 80, "jpeg": 80}
+
+
+def default_sources():
+    return ["images/unsplash.jpg"] + sorted(glob.glob("graficos/*.png"))
+
+
+def available_formats(photo):
+    from PIL import features
+
+    formats = ["avif"] if features.check("avif") else []
+    formats.append("webp")
+    if photo:
+        formats.append("jpeg")
+    return formats
+
+
+def _file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def load_manifest(variants_dir=VARIANTS_DIR):
+    try:
+        with open(os.path.join(variants_dir, MANIFEST_NAME), encoding="utf-8") as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(manifest, variants_dir):
+    path = os.path.join(variants_dir, MANIFEST_NAME)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _save_variant(image, fmt, path):
+    if fmt == "jpeg":
+        image.convert("RGB").save(path, "JPEG", quality=QUALITY[fmt], progressive=True, optimize=True)
+    elif fmt == "webp":
+        image.save(path, "WEBP", quality=QUALITY[fmt], method=6)
+    else:
+        image.save(path, "AVIF", quality=QUALITY[fmt])
+
+
+# Gera as variantes de uma imagem; retorna a entrada do manifesto
+def build_variants(source_path, digest, variants_dir=VARIANTS_DIR):
+    from PIL import Image
+
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    with Image.open(source_path) as original:
+        original.load()
+        width, height = original.size
+        photo = original.format == "JPEG"
+        image = original if original.mode in ("RGB", "RGBA") else original.convert("RGBA")
+
+        widths = [w for w in WIDTHS if w < width]
+        if width <= WIDTHS[-1]:
+            widths.append(width)
+        variants = {fmt: [] for fmt in available_formats(photo)}
+        for target_width in widths:
+            target_height = round(height * target_width / width)
+            resized = image if target_width == width else image.resize((target_width, target_height), Image.LANCZOS)
+            for fmt in variants:
+                name = f"{stem}-{target_width}w.{digest[:12]}.{'jpg' if fmt == 'jpeg' else fmt}"
+                _save_variant(resized, fmt, os.path.join(variants_dir, name))
+                variants[fmt].append(
+                    {"width": target_width, "file": name, "bytes": os.path.getsize(os.path.join(variants_dir, name))}
+                )
+
+    return {"sha256": digest, "width": width, "height": height, "variants": variants}
+
+
+# Atualiza as variantes das imagens alteradas; retorna (manifesto, reprocessadas)
+def build_all(sources=None, variants_dir=VARIANTS_DIR, force=False):
+    os.makedirs(variants_dir, exist_ok=True)
+    manifest = load_manifest(variants_dir)
+    rebuilt = []
+    for source_path in sources or default_sources():
+        key = os.path.normpath(source_path)
+        stat = os.stat(source_path)
+        entry = manifest.get(key)
+        if not force and entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+            continue
+        digest = _file_digest(source_path)
+        if force or not entry or entry["sha256"] != digest:
+            if entry:
+                _remove_variants(entry, variants_dir)
+            entry = build_variants(source_path, digest, variants_dir)
+            rebuilt.append(key)
+        entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        manifest[key] = entry
+        _save_manifest(manifest, variants_dir)
+    return manifest, rebuilt
+
+
+def _remove_variants(entry, variants_dir):
+    for files in entry["variants"].values():
+        for variant in files:
+            try:
+                os.remove(os.path.join(variants_dir, variant["file"]))
+            except OSError:
+                pass
+
+
+# Manifesto lido pelo app, recarregado quando o arquivo muda no disco.
+# Entradas cuja imagem de origem mudou depois da geração são ignoradas.
+class VariantManifest:
+    def __init__(self, variants_dir=VARIANTS_DIR, url_prefix="app/static/variants", check_interval=2.0):
+        self.variants_dir = variants_dir
+        self.url_prefix = url_prefix
+        self.check_interval = check_interval
+        self._stamp = None
+        self._checked = None
+        self._entries = {}
+        self._current = {}
+        self._lock = threading.Lock()
+
+    def get(self, image_path):
+        now = time.monotonic()
+        with self._lock:
+            if self._checked is None or now - self._checked >= self.check_interval:
+                try:
+                    stamp = os.stat(os.path.join(self.variants_dir, MANIFEST_NAME)).st_mtime_ns
+                except OSError:
+                    stamp = None
+                if stamp != self._stamp:
+                    self._entries = load_manifest(self.variants_dir) if stamp else {}
+                    self._stamp = stamp
+                self._current = {}
+                self._checked = now
+
+            key = os.path.normpath(image_path)
+            if key not in self._current:
+                entry = self._entries.get(key)
+                try:
+                    stat = os.stat(key)
+                except OSError:
+                    entry = None
+                else:
+                    if entry and (entry.get("mtime_ns"), entry.get("size")) != (stat.st_mtime_ns, stat.st_size):
+                        entry = None
+                self._current[key] = entry
+            return self._current[key]
+
+    # Variante que um navegador com AVIF (ou WebP) baixa para a largura
+    # exibida, em densidade 1: a menor que cobre a largura, ou a maior.
+    # Devolve (url, bytes), ou None se não houver variantes.
+    def chosen_variant(self, image_path, display_width):
+        entry = self.get(image_path)
+        if entry is None:
+            return None
+        variants = entry["variants"]
+        fmt = next((fmt for fmt in ("avif", "webp", "jpeg") if variants.get(fmt)), None)
+        if fmt is None:
+            return None
+        options = sorted(variants[fmt], key=lambda v: v["width"])
+        variant = next((v for v in options if v["width"] >= display_width), options[-1])
+        return f"{self.url_prefix}/{variant['file']}", variant["bytes"]
+
+    # Monta <picture> com um srcset por formato; None se não houver variantes.
+    # fallback_src é usado pelos navegadores sem suporte a AVIF/WebP quando
+    # não há variante JPEG (gráficos em PNG).
+    def picture_html(self, image_path, alt, css_class, fallback_src, sizes=None):
+        entry = self.get(image_path)
+        if entry is None:
+            return None
+        variants = entry["variants"]
+        if sizes is None:
+            sizes = f"(max-width: {entry['width']}px) 100vw, {entry['width']}px"
+
+        def srcset(fmt):
+            return ", ".join(f"{self.url_prefix}/{v['file']} {v['width']}w" for v in variants[fmt])
+
+        sources = "".join(
+            f'<source type="image/{fmt}" srcset="{srcset(fmt)}" sizes="{sizes}">'
+            for fmt in ("avif", "webp")
+            if fmt in variants
+        )
+        if "jpeg" in variants:
+            fallback = f'src="{self.url_prefix}/{variants["jpeg"][-1]["file"]}" srcset="{srcset("jpeg")}" sizes="{sizes}"'
+        else:
+            fallback = f'src="{fallback_src}"'
+        return (
+            f"<picture>{sources}"
+            f'<img {fallback} width="{entry["width"]}" height="{entry["height"]}" '
+            f'style="aspect-ratio: {entry["width"]} / {entry["height"]}; height: auto" alt="{alt}" class="{css_class}">'
+            f"</picture>"
+        )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    force = "--force" in args
+    paths = [arg for arg in args if arg != "--force"]
+    manifest, rebuilt = build_all(paths or None, force=force)
+    for key, entry in sorted(manifest.items()):
+        smallest = min(v["bytes"] for files in entry["variants"].values() for v in files)
+        status = "gerado" if key in rebuilt else "inalterado"
+        print(f"{key:<28} {os.path.getsize(key) / 1024:8.1f} KiB -> menor variante {smallest / 1024:7.1f} KiB ({status})")
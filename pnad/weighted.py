@@ -0,0 +1,236 @@
+# Estimativas ponderadas pelo peso amostral da PNAD COVID-19.
+#
+# Os gráficos contam respondentes, mas a PNAD é uma amostra com pesos: cada
+# pessoa representa `v1032` pessoas da população (peso com pós-estratificação;
+# a coluna pode ser trocada com PNAD_WEIGHT_COLUMN). Este módulo estima
+# totais, proporções e médias ponderados, com erro padrão, por qualquer
+# quebra, sem groupby do pandas:
+#   - as dimensões viram um código de célula por linha, como no cubo;
+#   - cada soma necessária (n, Σw, Σw², Σwy, Σw²y, Σw²y²) é um np.bincount
+#     sobre esse código; respostas categóricas usam um código combinado
+#     célula × resposta, então cada coluna é lida uma só vez;
+#   - estimativas e variâncias de qualquer quebra saem dessas somas, que se
+#     somam entre lotes ou meses (merge), como as medidas do cubo.
+#
+# A variância é a de linearização (Taylor) para domínios, tratando cada
+# pessoa como uma unidade sorteada com reposição. O extrato não traz estrato
+# nem UPA, então o erro padrão não inclui o efeito do plano amostral e tende
+# a ser menor que o oficial do IBGE.
+#
+# Uso: python -m pnad.weighted [snapshot] [--peso COLUNA]
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from pnad.aggregates import dimension_codes
+
+PESO = os.environ.get("PNAD_WEIGHT_COLUMN", "v1032")
+
+
+class WeightedAggregates:
+    # sums: {(coluna, soma): array}; ("", "n"|"w"|"w2") valem para todas as
+    #       linhas, com forma (n_1 + 1, ..., n_k + 1) (o último índice de cada
+    #       dimensão guarda os valores ausentes). Colunas categóricas têm um
+    #       eixo a mais com as respostas (+ ausente); numéricas guardam as
+    #       somas só das linhas com valor.
+    # values: {coluna categórica: respostas}
+    def __init__(self, sums, dims, labels, values):
+        self.sums = sums
+        self.dims = tuple(dims)
+        self.labels = dict(labels)
+        self.values = dict(values)
+
+    # Número de linhas da amostra, usado no fator n / (n - 1) da variância
+    @property
+    def n(self):
+        return int(self.sums[("", "n")].sum())
+
+    # Soma as dimensões não pedidas e tira as células de valor ausente das
+    # pedidas; eixos extras (respostas) são mantidos
+    def _rollup(self, array, dims):
+        axes = [self.dims.index(dim) for dim in dims]
+        others = tuple(i for i in range(len(self.dims)) if i not in axes)
+        cube = array.sum(axis=others) if others else array
+        if len(axes) > 1:
+            cube = np.moveaxis(cube, list(range(len(axes))), np.argsort(axes))
+        cube = cube[tuple(slice(0, len(self.labels[dim])) for dim in dims)]
+        return cube.reshape(-1, *cube.shape[len(dims):])
+
+    def _index(self, dims, answers=None):
+        levels = [self.labels[dim] for dim in dims]
+        names = list(dims)
+        if answers is not None:
+            levels.append(answers[0])
+            names.append(answers[1])
+        if not levels:
+            return pd.Index(["total"])
+        if len(levels) == 1:
+            return pd.CategoricalIndex(levels[0], categories=levels[0], name=names[0])
+        return pd.MultiIndex.from_product(levels, names=names)
+
+    def _table(self, estimate, variance, count, index):
+        estimate = np.asarray(estimate, dtype=float).reshape(-1)
+        se = np.sqrt(np.clip(np.asarray(variance, dtype=float).reshape(-1), 0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cv = np.where(estimate != 0, se / np.abs(estimate), np.nan)
+        return pd.DataFrame(
+            {"estimativa": estimate, "erro_padrao": se, "cv": cv, "n": np.asarray(count).reshape(-1)}, index=index
+        )
+
+    def _factor(self):
+        n = self.n
+        return n / (n - 1) if n > 1 else np.nan
+
+    # Variância de linearização de uma razão Σwy / Σwa no domínio, com
+    # z = w (y - R a) / Σwa; as somas vêm só das linhas do domínio
+    def _ratio(self, wy, w2y2, w2y, wa, w2a):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = wy / wa
+            variance = self._factor() * (w2y2 - 2 * ratio * w2y + ratio**2 * w2a) / wa**2
+        return ratio, variance
+
+    # População estimada (Σw) por célula
+    def population(self, *dims):
+        w, w2, n = (self._rollup(self.sums[("", key)], dims) for key in ("w", "w2", "n"))
+        variance = self._factor() * (w2 - w**2 / self.n)
+        return self._table(w, variance, n, self._index(dims))
+
+    # Totais ponderados: pessoas por resposta (coluna categórica) ou soma
+    # de y (coluna numérica)
+    def totals(self, col, *dims):
+        if col in self.values:
+            w, w2, n = (self._rollup(self.sums[(col, key)], dims)[..., :-1] for key in ("w", "w2", "n"))
+            variance = self._factor() * (w2 - w**2 / self.n)
+            return self._table(w, variance, n, self._index(dims, (self.values[col], col)))
+        wy, w2y2, n = (self._rollup(self.sums[(col, key)], dims) for key in ("wy", "w2y2", "n"))
+        variance = self._factor() * (w2y2 - wy**2 / self.n)
+        return self._table(wy, variance, n, self._index(dims))
+
+    # Proporção de cada resposta entre as pessoas que responderam, por
+    # célula (como value_counts(normalize=True), mas ponderada)
+    def proportions(self, col, *dims):
+        w, w2, n = (self._rollup(self.sums[(col, key)], dims)[..., :-1] for key in ("w", "w2", "n"))
+        wa = w.sum(axis=-1, keepdims=True)
+        w2a = w2.sum(axis=-1, keepdims=True)
+        # resposta indicadora: y² = y, então Σw²y² = Σw²y
+        ratio, variance = self._ratio(w, w2, w2, wa, w2a)
+        count = np.broadcast_to(n.sum(axis=-1, keepdims=True), n.shape)
+        return self._table(ratio, variance, count, self._index(dims, (self.values[col], col)))
+
+    # Média ponderada de uma coluna numérica entre as linhas com valor
+    def means(self, col, *dims):
+        wy, w2y2, w2y, wa, w2a, n = (
+            self._rollup(self.sums[(col, key)], dims) for key in ("wy", "w2y2", "w2y", "w", "w2", "n")
+        )
+        ratio, variance = self._ratio(wy, w2y2, w2y, wa, w2a)
+        return self._table(ratio, variance, n, self._index(dims))
+
+    # Soma as somas de outra parte dos dados (outro lote, outro mês)
+    def merge(self, other):
+        labels = {
+            dim: self.labels[dim] + [v for v in other.labels[dim] if v not in self.labels[dim]] for dim in self.dims
+        }
+        values = {
+            col: answers + [v for v in other.values[col] if v not in answers] for col, answers in self.values.items()
+        }
+        sums = {}
+        for key in self.sums:
+            col = key[0]
+            shape = [len(labels[dim]) + 1 for dim in self.dims]
+            if col in values:
+                shape.append(len(values[col]) + 1)
+            merged = np.zeros(shape, dtype=self.sums[key].dtype)
+            for source in (self, other):
+                positions = [
+                    [labels[dim].index(v) for v in source.labels[dim]] + [len(labels[dim])] for dim in self.dims
+                ]
+                if col in values:
+                    positions.append([values[col].index(v) for v in source.values[col]] + [len(values[col])])
+                merged[np.ix_(*positions)] += source.sums[key]
+            sums[key] = merged
+        return WeightedAggregates(sums, self.dims, labels, values)
+
+
+def _bincount(key, weights, size):
+    return np.bincount(key, weights=weights, minlength=size)
+
+
+# Somas ponderadas de `categoricas` (proporções e totais por resposta) e de
+# `numericas` (médias e totais) por célula de `dims`. weight=None usa peso 1
+# (as estimativas viram contagens de respondentes).
+def weighted_aggregates(df, dims=("sexo", "sigla_uf"), categoricas=(), numericas=(), weight=PESO):
+    if weight is None:
+        w = np.ones(len(df))
+    else:
+        if weight not in df:
+            raise KeyError(f"coluna de peso '{weight}' não encontrada (PNAD_WEIGHT_COLUMN)")
+        w = pd.to_numeric(df[weight], errors="coerce").to_numpy(dtype=float, na_value=0.0)
+    w2 = w * w
+
+    cell = np.zeros(len(df), dtype=np.int64)
+    labels = {}
+    shape = []
+    for dim in dims:
+        codes, dim_labels = dimension_codes(df, dim)
+        size = len(dim_labels) + 1
+        cell = cell * size + np.where(codes < 0, size - 1, codes)
+        labels[dim] = dim_labels
+        shape.append(size)
+    n_cells = int(np.prod(shape)) if shape else 1
+
+    sums = {
+        ("", "n"): _bincount(cell, None, n_cells).reshape(shape),
+        ("", "w"): _bincount(cell, w, n_cells).reshape(shape),
+        ("", "w2"): _bincount(cell, w2, n_cells).reshape(shape),
+    }
+    values = {}
+    for col in categoricas:
+        codes, answers = dimension_codes(df, col)
+        k = len(answers) + 1
+        key = cell * k + np.where(codes < 0, k - 1, codes)
+        for name, weights in (("n", None), ("w", w), ("w2", w2)):
+            sums[(col, name)] = _bincount(key, weights, n_cells * k).reshape(*shape, k)
+        values[col] = answers
+    for col in numericas:
+        y = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        valid = ~np.isnan(y)
+        key, wv, yv = cell[valid], w[valid], y[valid]
+        w2v = w2[valid]
+        for name, weights in (
+            ("n", None),
+            ("w", wv),
+            ("w2", w2v),
+            ("wy", wv * yv),
+            ("w2y", w2v * yv),
+            ("w2y2", w2v * yv * yv),
+        ):
+            sums[(col, name)] = _bincount(key, weights, n_cells).reshape(shape)
+    return WeightedAggregates(sums, dims, labels, values)
+
+
+if __name__ == "__main__":
+    from pnad.snapshot import SNAPSHOT_DIR, open_snapshot, read_snapshot
+
+    args = sys.argv[1:]
+    peso = PESO
+    if "--peso" in args:
+        position = args.index("--peso")
+        peso = args[position + 1]
+        del args[position : position + 2]
+    root = args[0] if args else SNAPSHOT_DIR
+    if peso not in open_snapshot(root).schema.names:
+        sys.exit(f"o snapshot em {root} não tem a coluna de peso '{peso}': inclua-a no extrato ou use --peso")
+
+    df = read_snapshot(
+        columns=["sexo", "sigla_uf", "buscou_ajuda_medica", "home_office", "renda", peso], root=root
+    )
+    aggregates = weighted_aggregates(
+        df, ("sexo", "sigla_uf"), categoricas=["buscou_ajuda_medica", "home_office"], numericas=["renda"], weight=peso
+    )
+    pd.set_option("display.width", 160)
+    print(aggregates.population("sexo"), end="\n\n")
+    print(aggregates.proportions("buscou_ajuda_medica", "sexo"), end="\n\n")
+    print(aggregates.proportions("home_office"), end="\n\n")
+    print(aggregates.means("renda", "sigla_uf"))
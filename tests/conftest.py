@@ -0,0 +1,7 @@
+# Verificações do pacote pnad e do app.py: python -m pytest (na raiz)
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
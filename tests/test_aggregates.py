@@ -0,0 +1,44 @@
+# Contagens de sintomas (pnad.aggregates) contra o cálculo do notebook
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_extract
+from pnad.aggregates import FAIXAS_ETARIAS, LIMITES_IDADE, count_symptoms
+from pnad.schema import SINTOMAS
+from pnad.snapshot import prepare
+
+
+@pytest.fixture(scope="module")
+def extrato():
+    df = make_extract(20_000, seed=3)
+    # idades ausentes e inválidas ficam fora das faixas, como no pd.cut
+    df.loc[df.index[::97], "idade"] = None
+    df.loc[df.index[::101], "idade"] = "ignorado"
+    return df
+
+
+def _faixa(df):
+    idade = pd.to_numeric(df["idade"], errors="coerce")
+    return pd.cut(idade, bins=LIMITES_IDADE, labels=FAIXAS_ETARIAS, right=False)
+
+
+# Texto (como o extrato do BigQuery) e categorias (como o snapshot)
+@pytest.mark.parametrize("tipos", ["texto", "categorias"])
+def test_counts_match_pandas(extrato, tipos):
+    df = extrato if tipos == "texto" else prepare(extrato)
+    counts = count_symptoms(df)
+    sim = pd.DataFrame({col: (extrato[col] == "Sim").astype(int) for col in SINTOMAS})
+
+    pd.testing.assert_series_equal(counts.total(), sim.sum(), check_dtype=False)
+
+    expected = sim.groupby(_faixa(extrato), observed=False).sum()
+    np.testing.assert_array_equal(counts.by("faixa_etaria").to_numpy(), expected.to_numpy())
+    assert list(counts.by("faixa_etaria").index) == FAIXAS_ETARIAS
+
+    expected = sim.groupby([extrato["sigla_uf"], extrato["sexo"]]).sum()
+    result = counts.by("sigla_uf", "sexo")
+    np.testing.assert_array_equal(result.loc[expected.index].to_numpy(), expected.to_numpy())
+
+    expected = extrato.groupby([_faixa(extrato), extrato["sexo"]], observed=False).size()
+    np.testing.assert_array_equal(counts.respondents("faixa_etaria", "sexo").to_numpy(), expected.to_numpy())
@@ -0,0 +1,61 @@
+# Execuções do app.py com streamlit.testing
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from conftest import ROOT
+
+
+@pytest.fixture
+def lazy_app(monkeypatch):
+    monkeypatch.setenv("PNAD_PAGE_MODE", "lazy")
+    monkeypatch.setenv("PNAD_METRICS", "off")
+    return AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+
+
+def _sections(at):
+    return [m.value for m in at.markdown if m.value.startswith("<a id=")]
+
+
+# Cada escolha no menu do modo lazy vale já na execução seguinte, inclusive
+# duas escolhas diferentes em seguida
+def test_lazy_menu_follows_each_selection(lazy_app):
+    at = lazy_app.run()
+    assert _sections(at) == ["<a id='introducao'></a>"]
+    for anchor in ("sintomas-clinicos", "Conclusao", "introducao"):
+        at.sidebar.radio[0].set_value(anchor).run()
+        assert not at.exception
+        assert _sections(at) == [f"<a id='{anchor}'></a>"]
+        assert at.query_params["secao"] == anchor
+
+
+def test_lazy_menu_starts_from_query_param(lazy_app):
+    lazy_app.query_params["secao"] = "Conclusao"
+    at = lazy_app.run()
+    assert _sections(at) == ["<a id='Conclusao'></a>"]
+
+
+# Com PNAD_METRICS=log cada execução registra as seções desenhadas; as
+# imagens estáticas contam só na primeira vez que a sessão as referencia
+def test_metrics_log_records_sections(lazy_app, monkeypatch):
+    from pnad import metrics
+
+    monkeypatch.setattr(metrics, "METRICS_MODE", "log")
+    monkeypatch.setenv("PNAD_ASSET_MODE", "static")
+    at = lazy_app.run()
+    assert not at.exception
+    first = metrics.recent_runs()[-1]
+    sections = {record["secao"]: record for record in first["secoes"]}
+    assert set(sections) == {metrics.FORA_DE_SECAO, "introducao"}
+    intro = sections["introducao"]
+    assert intro["tempo_ms"] > 0 and intro["bytes_total"] > 0
+    assert intro["bytes"]["markdown"] > 0 and intro["imagens_bytes"] > 0
+    assert 0 < intro["rss_pico_mb"] <= first["rss_pico_mb"]
+    assert first["bytes_total"] == sum(record["bytes_total"] for record in first["secoes"])
+
+    at.run()
+    second = metrics.recent_runs()[-1]
+    assert second is not first
+    intro = next(record for record in second["secoes"] if record["secao"] == "introducao")
+    assert intro["imagens_bytes"] == 0
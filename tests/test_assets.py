@@ -0,0 +1,22 @@
+# Publicação das imagens como arquivos estáticos (pnad.assets.StaticAssets)
+import os
+
+from pnad.assets import StaticAssets
+
+
+# Um hash novo apaga a cópia anterior da mesma imagem, e só dela
+def test_publish_removes_superseded_copy(tmp_path):
+    static = tmp_path / "static"
+    assets = StaticAssets(static_dir=str(static))
+    image = tmp_path / "graf1.png"
+    other = tmp_path / "graf10.png"
+    image.write_bytes(b"v1")
+    other.write_bytes(b"outra")
+    first = assets.publish(str(image))
+    kept = assets.publish(str(other))
+    assert assets.publish(str(image)) == first
+
+    image.write_bytes(b"v2")
+    second = assets.publish(str(image))
+    assert second != first
+    assert sorted(os.listdir(static)) == sorted([second, kept])
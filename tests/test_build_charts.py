@@ -0,0 +1,64 @@
+# Build incremental dos gráficos estáticos (pnad.build_charts)
+import os
+
+import pytest
+
+from benchmarks.synthetic import make_extract
+from pnad import build_charts
+from pnad.build_charts import TAREFAS, build_charts as build, code_inputs
+from pnad.snapshot import write_snapshot
+
+
+def test_code_inputs_follow_the_data_code():
+    graf1 = code_inputs(TAREFAS["graf1"].render)
+    graf10 = code_inputs(TAREFAS["graf10"].render)
+    assert "modulo:pnad.aggregates" in graf1 and "pnad.build_charts._grid" in graf1
+    assert "modulo:pnad.income" in graf10 and "modulo:pnad.income" not in graf1
+    assert "pnad.build_charts.render_renda_escolaridade" not in graf1
+
+
+def test_input_hash_changes_with_dpi(monkeypatch):
+    task = TAREFAS["graf1"]
+    hashes = {col: "h" for col in task.columns}
+    before = task.input_hash(hashes)
+    assert task.input_hash(hashes) == before
+    monkeypatch.setattr(build_charts, "DPI", build_charts.DPI * 2)
+    assert task.input_hash(hashes) != before
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    root = str(tmp_path / "snapshot")
+    write_snapshot(make_extract(3_000, seed=2), root)
+    return root
+
+
+def _mtimes(output_dir, names):
+    return {name: os.stat(os.path.join(output_dir, f"{name}.png")).st_mtime_ns for name in names}
+
+
+# Entradas iguais: nada é redesenhado; uma coluna ou um módulo de dados
+# alterado redesenha só os gráficos que dependem dele
+def test_skip_and_rebuild(tmp_path, snapshot, monkeypatch):
+    output = str(tmp_path / "graficos")
+    names = ["graf1", "graf10"]
+    built, skipped = build(names, root=snapshot, output_dir=output, workers=1)
+    assert sorted(built) == names and skipped == []
+    stamps = _mtimes(output, names)
+
+    assert build(names, root=snapshot, output_dir=output, workers=1) == ([], names)
+    assert _mtimes(output, names) == stamps
+
+    df = make_extract(3_000, seed=2)
+    df["renda"] = df["renda"] * 2
+    write_snapshot(df, snapshot)
+    assert build(names, root=snapshot, output_dir=output, workers=1) == (["graf10"], ["graf1"])
+
+    source = build_charts._source
+    monkeypatch.setattr(
+        build_charts,
+        "_source",
+        lambda obj: source(obj) + ("# outra KDE" if getattr(obj, "__name__", "") == "pnad.income" else ""),
+    )
+    assert build(names, root=snapshot, output_dir=output, workers=1) == (["graf10"], ["graf1"])
+    assert _mtimes(output, ["graf1"]) == {"graf1": stamps["graf1"]}
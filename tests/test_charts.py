@@ -0,0 +1,26 @@
+# Tabelas e figuras dos gráficos (pnad.charts) a partir do cubo
+import pytest
+
+from benchmarks.synthetic import make_extract
+from pnad.charts import FIGURES, build_figure, chart_data
+from pnad.cube import build_cube
+
+
+@pytest.fixture(scope="module")
+def cube():
+    return build_cube(make_extract(2_000, seed=4))
+
+
+# Um filtro sem nenhuma célula (ex.: UF inexistente ou combinação sem
+# respondentes) dá tabelas vazias e figuras sem dados, não um erro
+@pytest.mark.parametrize("weighted", [False, True])
+def test_empty_filter_builds_every_figure(cube, weighted):
+    empty = cube.filter(sigla_uf=["ZZ"])
+    if weighted:
+        empty = empty.weighted()
+    assert len(empty) == 0
+    data = chart_data(empty, empty.income_distribution())
+    assert data["renda_uf"].empty and data["renda_escolaridade"]["quantis"].empty
+    assert list(data["renda_escolaridade"]["quantis"].columns) == ["n", "p50", "p90", "p99"]
+    for name in FIGURES:
+        build_figure(name, data)
@@ -0,0 +1,92 @@
+# Cubo de agregados (pnad.cube) com extratos sintéticos
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_extract
+from pnad.cube import build_cube, load_cube
+from pnad.income import income_distribution
+
+
+@pytest.fixture(scope="module")
+def extrato():
+    return make_extract(5_000)
+
+
+@pytest.fixture(scope="module")
+def cube(extrato):
+    return build_cube(extrato)
+
+
+def test_income_total(extrato, cube):
+    renda = extrato["renda"].dropna()
+    total = cube.income()
+    assert list(total.index) == ["total"]
+    assert total.loc["total", "n"] == len(renda)
+    assert total.loc["total", "media"] == pytest.approx(renda.mean())
+    assert total.loc["total", "desvio"] == pytest.approx(renda.std())
+
+
+def test_rollup_total_keeps_counts_as_integers(cube):
+    total = cube.rollup()
+    assert isinstance(total["n"], np.integer)
+    assert isinstance(total["renda_soma"], np.floating)
+    assert cube.symptoms().dtype == np.int64
+    assert cube.answers("home_office").dtype == np.int64
+
+
+def _assert_counts(result, expected):
+    result = result.loc[list(expected.index), list(expected.columns)]
+    assert result.dtypes.eq(np.int64).all()
+    np.testing.assert_array_equal(result.to_numpy(), expected.to_numpy())
+
+
+# Filtros do painel contra um crosstab dos dados brutos filtrados
+def test_filters_match_crosstab(extrato, cube):
+    maio = cube.values("data")[0]
+    assert (maio.year, maio.month) == (2020, 5)
+    ufs = cube.values("sigla_uf")[:5]
+    filtered = cube.filter(data=[maio], sigla_uf=ufs, sexo="mulher", escolaridade=[])
+    rows = extrato[(extrato["mes"] == 5) & extrato["sigla_uf"].isin(ufs) & (extrato["sexo"] == "mulher")]
+
+    expected = pd.crosstab(rows["sigla_uf"], rows["home_office"])
+    result = filtered.answers("home_office", "sigla_uf")
+    _assert_counts(result, expected)
+    expected = (rows["buscou_ajuda_medica"] == "Sim").sum()
+    assert filtered.answers("buscou_ajuda_medica")["Sim"] == expected
+    assert filtered.rollup()["n"] == len(rows)
+
+
+# Cubos de partes dos dados somados com merge dão o cubo do extrato inteiro
+def test_merge_matches_single_build(extrato, cube):
+    merged = build_cube(extrato[extrato["mes"] != 6]).merge(build_cube(extrato[extrato["mes"] == 6]))
+    for dims in [("data",), ("sigla_uf", "sexo"), ("faixa_etaria", "escolaridade")]:
+        pd.testing.assert_frame_equal(merged.rollup(*dims).sort_index(), cube.rollup(*dims).sort_index())
+    expected = pd.crosstab(extrato["escolaridade"], extrato["restringiu_contato_com_pessoas"])
+    result = merged.answers("restringiu_contato_com_pessoas", "escolaridade")
+    _assert_counts(result, expected)
+
+
+def _assert_same_distribution(result, expected):
+    assert result.groups == expected.groups
+    np.testing.assert_array_equal(result.linear, expected.linear)
+    np.testing.assert_array_equal(result.sketch, expected.sketch)
+
+
+# Renda em faixas do cubo filtrado contra a distribuição das linhas
+# filtradas; merge e save/load mantêm as faixas
+def test_income_distribution_from_bins(extrato, cube, tmp_path):
+    _assert_same_distribution(cube.income_distribution(), income_distribution(extrato))
+    ufs = cube.values("sigla_uf")[:3]
+    rows = extrato[extrato["sigla_uf"].isin(ufs) & (extrato["sexo"] == "homem")]
+    filtered = cube.filter(sigla_uf=ufs, sexo="homem")
+    _assert_same_distribution(filtered.income_distribution(), income_distribution(rows))
+
+    merged = build_cube(extrato[extrato["mes"] != 6]).merge(build_cube(extrato[extrato["mes"] == 6]))
+    _assert_same_distribution(merged.income_distribution(), income_distribution(extrato))
+
+    path = str(tmp_path / "cubo.parquet")
+    cube.save(path)
+    loaded, _ = load_cube(path)
+    loaded = loaded.filter(sigla_uf=ufs, sexo="homem")
+    _assert_same_distribution(loaded.income_distribution(), income_distribution(rows))
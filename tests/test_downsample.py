@@ -0,0 +1,117 @@
+# Redução das séries dos gráficos (pnad.downsample.limit_figure)
+import numpy as np
+import pytest
+import plotly.express as px
+import plotly.graph_objects as go
+
+from pnad.downsample import PIXELS_POR_CELULA, limit_figure
+
+LARGURA = 200
+ALTURA = 160
+
+
+def _dados(n=5_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=n), rng.lognormal(size=n), rng.integers(1, 5, n)
+
+
+# LTTB: um ponto por pixel, mantendo as pontas e um pico isolado
+def test_line_keeps_width_points_and_peak():
+    x = np.arange(5_000)
+    y = np.sin(x / 300)
+    y[2_345] = 10
+    fig = limit_figure(px.line(x=x, y=y), LARGURA, ALTURA)
+    (trace,) = fig.data
+    assert len(trace.x) == LARGURA
+    assert np.all(np.diff(trace.x) > 0)
+    assert trace.x[0] == 0 and trace.x[-1] == x[-1]
+    assert 2_345 in trace.x and trace.y.max() == 10
+
+
+def test_scatter_becomes_heatmap_with_all_points():
+    x, y, _ = _dados()
+    fig = limit_figure(px.scatter(x=x, y=y), LARGURA, ALTURA)
+    (trace,) = fig.data
+    assert trace.type == "heatmap"
+    assert trace.z.shape == (ALTURA // PIXELS_POR_CELULA, LARGURA // PIXELS_POR_CELULA)
+    assert np.nansum(trace.z) == len(x)
+
+
+def test_histogram_becomes_bars_with_same_counts():
+    x, _, _ = _dados()
+    fig = limit_figure(px.histogram(x=x, nbins=30), LARGURA, ALTURA)
+    (trace,) = fig.data
+    assert trace.type == "bar"
+    counts, edges = np.histogram(x, bins=30)
+    np.testing.assert_array_equal(trace.y, counts)
+    np.testing.assert_allclose(trace.x, (edges[:-1] + edges[1:]) / 2)
+
+
+def test_histogram2d_count_becomes_heatmap():
+    x, y, _ = _dados()
+    fig = limit_figure(go.Figure(go.Histogram2d(x=x, y=y)), LARGURA, ALTURA)
+    (trace,) = fig.data
+    assert trace.type == "heatmap"
+    assert np.nansum(trace.z) == len(x)
+
+
+# z agregado por célula (histfunc="sum"), como em px.density_heatmap
+def test_histogram2d_z_sum_becomes_heatmap():
+    x, y, z = _dados()
+    fig = limit_figure(px.density_heatmap(x=x, y=y, z=z, histfunc="sum"), LARGURA, ALTURA)
+    (trace,) = fig.data
+    assert trace.type == "heatmap"
+    assert np.nansum(trace.z) == pytest.approx(z.sum(), rel=1e-6)
+
+
+def test_histogram_histnorm_and_cumulative():
+    x, _, _ = _dados()
+    (trace,) = limit_figure(px.histogram(x=x, nbins=40, histnorm="probability"), LARGURA, ALTURA).data
+    assert trace.type == "bar" and trace.y.sum() == pytest.approx(1)
+    (trace,) = limit_figure(px.histogram(x=x, nbins=40, histnorm="probability density"), LARGURA, ALTURA).data
+    assert (trace.y * trace.width).sum() == pytest.approx(1)
+    (trace,) = limit_figure(px.histogram(x=x, nbins=40, cumulative=True), LARGURA, ALTURA).data
+    assert trace.y[-1] == len(x) and np.all(np.diff(trace.y) >= 0)
+
+
+def test_histogram_sum_of_y():
+    x, y, _ = _dados()
+    (trace,) = limit_figure(px.histogram(x=x, y=y, nbins=40, histfunc="sum"), LARGURA, ALTURA).data
+    assert trace.type == "bar"
+    assert trace.y.sum() == pytest.approx(y.sum())
+
+
+@pytest.mark.parametrize("build", [px.box, px.violin])
+def test_box_and_violin_become_precomputed_boxes(build):
+    _, y, grupo = _dados()
+    (trace,) = limit_figure(build(x=grupo.astype(str), y=y), LARGURA, ALTURA).data
+    assert trace.type == "box"
+    for position, q1, median, q3, upper in zip(trace.x, trace.q1, trace.median, trace.q3, trace.upperfence):
+        values = y[grupo.astype(str) == position]
+        assert (q1, median, q3) == pytest.approx(tuple(np.percentile(values, [25, 50, 75])))
+        assert upper == values[values <= q3 + 1.5 * (q3 - q1)].max()
+
+
+# O JSON enviado não cresce com o número de linhas
+@pytest.mark.parametrize(
+    "build",
+    [
+        lambda x, y, z: px.line(x=np.arange(len(x)), y=y),
+        lambda x, y, z: px.scatter(x=x, y=y),
+        lambda x, y, z: px.histogram(x=x, nbins=50),
+        lambda x, y, z: px.histogram(x=x, histnorm="percent", cumulative=True),
+        lambda x, y, z: px.histogram(x=x, y=y, histfunc="avg"),
+        lambda x, y, z: px.density_heatmap(x=x, y=y),
+        lambda x, y, z: px.density_heatmap(x=x, y=y, z=z, histfunc="sum"),
+        lambda x, y, z: px.box(x=z, y=y),
+        lambda x, y, z: px.violin(y=y),
+    ],
+)
+def test_payload_does_not_depend_on_rows(build):
+    sizes = [len(limit_figure(build(*_dados(n)), LARGURA, ALTURA).to_json()) for n in (5_000, 50_000)]
+    assert sizes[1] < sizes[0] * 1.1
+
+
+def test_small_figure_is_unchanged():
+    fig = px.scatter(x=[1, 2, 3], y=[3, 1, 2])
+    assert limit_figure(fig, LARGURA, ALTURA) is fig
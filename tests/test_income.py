@@ -0,0 +1,77 @@
+# Distribuição de renda em faixas (pnad.income) contra o cálculo direto
+# sobre os valores
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_extract
+from pnad.income import ALFA, LARGURA_FAIXA, RENDA_MAXIMA, income_distribution
+
+
+@pytest.fixture(scope="module")
+def extrato():
+    df = make_extract(20_000, seed=7)
+    # cauda acima de RENDA_MAXIMA: fica fora da grade linear, mas entra nos quantis
+    df.loc[df.index[::211], "renda"] = 250_000.0
+    return df
+
+
+def _renda(df, group):
+    return np.sort(df.loc[df["escolaridade"] == group, "renda"].dropna().to_numpy())
+
+
+# Cada quantil tem erro relativo de até ALFA em relação ao valor exato da
+# posição q * (n - 1)
+def test_quantiles_within_relative_error(extrato):
+    distribution = income_distribution(extrato)
+    qs = (0.01, 0.25, 0.5, 0.9, 0.99, 1.0)
+    for group in distribution.groups:
+        values = _renda(extrato, group)
+        expected = values[(np.array(qs) * (len(values) - 1)).astype(int)]
+        result = distribution.quantiles(group, qs).to_numpy()
+        np.testing.assert_array_less(np.abs(result - expected), ALFA * expected + 1e-9)
+    assert distribution.counts().sum() == extrato["renda"].notna().sum()
+
+
+# KDE por FFT sobre as faixas contra a soma direta dos núcleos gaussianos
+# nos centros das faixas, com a mesma largura de banda
+def test_kde_matches_direct_kde(extrato):
+    distribution = income_distribution(extrato)
+    bins = 50
+    for group in distribution.groups[:3]:
+        values = _renda(extrato, group)
+        values = values[values <= RENDA_MAXIMA]
+        x, density = distribution.kde(group, bins)
+
+        counts = distribution.linear[distribution.groups.index(group)]
+        n = counts.sum()
+        mean = (counts * x).sum() / n
+        std = np.sqrt((counts * (x - mean) ** 2).sum() / (n - 1))
+        bandwidth = max(std * n ** (-1 / 5), LARGURA_FAIXA)
+        kernel = np.exp(-0.5 * ((x[:, None] - values[None, :]) / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+        expected = kernel.sum(axis=1) * RENDA_MAXIMA / bins
+
+        assert np.abs(density - expected).max() < 0.02 * expected.max()
+
+
+def test_histogram_matches_numpy(extrato):
+    distribution = income_distribution(extrato)
+    group = distribution.groups[0]
+    values = _renda(extrato, group)
+    edges, counts = distribution.histogram(group, bins=50)
+    expected, _ = np.histogram(values[values <= RENDA_MAXIMA], bins=edges)
+    # np.histogram fecha a última faixa à direita, como a grade linear
+    np.testing.assert_array_equal(counts, expected)
+
+
+# Distribuições de partes dos dados somadas com merge dão a do extrato inteiro
+def test_merge_matches_single_pass(extrato):
+    whole = income_distribution(extrato)
+    parts = [extrato[extrato["sexo"] == "mulher"], extrato[extrato["sexo"] != "mulher"]]
+    merged = income_distribution(parts[0]).merge(income_distribution(parts[1]))
+    assert sorted(merged.groups) == sorted(whole.groups)
+    for group in whole.groups:
+        i, j = merged.groups.index(group), whole.groups.index(group)
+        np.testing.assert_array_equal(merged.linear[i], whole.linear[j])
+        np.testing.assert_array_equal(merged.sketch[i], whole.sketch[j])
+    pd.testing.assert_frame_equal(merged.quantile_table().loc[whole.groups], whole.quantile_table())
@@ -0,0 +1,57 @@
+# Ingestão em lotes (pnad.ingest) com extratos sintéticos
+import os
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_extract
+from pnad.cube import DIMENSOES_CUBO, build_cube, cube_for_snapshot, load_cube
+from pnad.ingest import ingest_extract, prepare_chunk
+from pnad.snapshot import read_snapshot, snapshot_version
+
+
+@pytest.fixture
+def extrato(tmp_path):
+    df = make_extract(6_000, seed=7)
+    path = str(tmp_path / "extrato.parquet")
+    df.to_parquet(path)
+    return df, path
+
+
+def _sorted(table):
+    return table.sort_values(DIMENSOES_CUBO).reset_index(drop=True)
+
+
+# Ingerir o mesmo extrato duas vezes dá o mesmo snapshot e o mesmo cubo do
+# cálculo em memória
+def test_ingest_twice_matches_in_memory(tmp_path, extrato):
+    df, path = extrato
+    root = str(tmp_path / "snapshot")
+    cube_path = str(tmp_path / "cubo.parquet")
+    for _ in range(2):
+        rows, _ = ingest_extract(path, snapshot_root=root, cube_path=cube_path, batch_size=1_000)
+        assert rows == len(df)
+
+    assert len(read_snapshot(columns=["idade"], root=root)) == len(df)
+    assert not [name for name in os.listdir(tmp_path) if ".ingest-" in name or ".old-" in name]
+    cube, _ = load_cube(cube_path)
+    expected = build_cube(prepare_chunk(df))
+    measures = [col for col in expected.table.columns if col not in DIMENSOES_CUBO]
+    pd.testing.assert_frame_equal(
+        _sorted(cube.table)[measures], _sorted(expected.table)[measures], check_dtype=False, atol=1e-6
+    )
+    rebuilt = build_cube(read_snapshot(columns=list(df.columns), root=root))
+    assert rebuilt.rollup()["n"] == len(df)
+
+
+# O cubo gravado pela ingestão é reaproveitado pelo painel
+def test_cube_for_snapshot_reuses_ingested_cube(tmp_path, extrato):
+    _, path = extrato
+    root = str(tmp_path / "snapshot")
+    cube_path = str(tmp_path / "cubo.parquet")
+    ingest_extract(path, snapshot_root=root, cube_path=cube_path)
+    mtime = os.stat(cube_path).st_mtime_ns
+
+    cube = cube_for_snapshot(snapshot_version(root), path=cube_path, snapshot_root=root)
+    assert cube.month_versions
+    assert os.stat(cube_path).st_mtime_ns == mtime
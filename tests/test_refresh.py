@@ -0,0 +1,53 @@
+# Versões dos meses gravadas com o cubo (pnad.cube) e atualização mensal
+# (pnad.refresh), com extratos sintéticos
+import numpy as np
+
+from benchmarks.synthetic import make_extract
+from pnad.cube import cube_for_snapshot, load_cube
+from pnad.income import income_distribution
+from pnad.refresh import refresh
+from pnad.snapshot import month_versions, read_snapshot, snapshot_version, write_snapshot
+
+
+def test_cube_carries_month_versions_through_refresh(tmp_path):
+    root = str(tmp_path / "snapshot")
+    path = str(tmp_path / "cubo.parquet")
+    write_snapshot(make_extract(3_000, meses=(5, 6)), root)
+
+    cube = cube_for_snapshot(snapshot_version(root), path=path, snapshot_root=root)
+    before = month_versions(root)
+    assert cube.month_versions == before
+    assert load_cube(path)[0].month_versions == before
+
+    delta = str(tmp_path / "delta.parquet")
+    make_extract(1_000, seed=1, meses=(6, 7)).to_parquet(delta)
+    assert refresh(delta, snapshot_root=root, cube_path=path)["incremental"]
+
+    after = month_versions(root)
+    assert load_cube(path)[0].month_versions == after
+    assert after["2020-05"] == before["2020-05"]
+    assert after["2020-06"] != before["2020-06"]
+    assert "2020-07" in after
+
+    # a renda em faixas dos meses do delta também é trocada
+    result = load_cube(path)[0].income_distribution()
+    expected = income_distribution(read_snapshot(columns=["renda", "escolaridade"], root=root))
+    assert sorted(result.groups) == sorted(expected.groups)
+    for group in expected.groups:
+        np.testing.assert_array_equal(
+            result.sketch[result.groups.index(group)], expected.sketch[expected.groups.index(group)]
+        )
+
+
+# Um cubo salvo antes das versões por mês é remontado
+def test_cube_without_month_versions_is_rebuilt(tmp_path):
+    root = str(tmp_path / "snapshot")
+    path = str(tmp_path / "cubo.parquet")
+    write_snapshot(make_extract(1_000, meses=(5,)), root)
+    version = snapshot_version(root)
+    cube = cube_for_snapshot(version, path=path, snapshot_root=root)
+    cube.month_versions = {}
+    cube.save(path, metadata={"snapshot_version": version})
+
+    assert cube_for_snapshot(version, path=path, snapshot_root=root).month_versions == month_versions(root)
+
@@ -0,0 +1,40 @@
+# Armazém de artefatos compartilhados entre processos (pnad.shared)
+import os
+import time
+
+import pandas as pd
+
+from pnad.shared import SharedStore
+
+
+def test_frames_round_trip(tmp_path):
+    store = SharedStore(str(tmp_path))
+    df = pd.DataFrame({"uf": pd.Categorical(["SP", "RJ"]), "n": [3, 4], "renda": [1.5, None]})
+    built = store.frames("graficos", "v1", "chave", lambda: {"tabela": df, "outras": {"x": df}})
+    again = store.frames("graficos", "v1", "chave", lambda: None)
+    for value in (built, again):
+        pd.testing.assert_frame_equal(value["tabela"], df)
+        pd.testing.assert_frame_equal(value["outras"]["x"], df)
+    assert store.stats() == {"hits": 1, "misses": 1}
+
+
+def test_prune_keeps_matching_versions(tmp_path):
+    store = SharedStore(str(tmp_path))
+    for version in ("a-b", "a", "b-c"):
+        store.text("graficos", version, "chave", lambda: "x")
+    store.prune("graficos", keep=lambda name: set(name.split("-")) <= {"a", "b"}, grace=0)
+    assert sorted(os.listdir(tmp_path / "graficos")) == ["a", "a-b"]
+
+
+# Versões antigas ainda em uso por outro processo (acesso recente) ficam
+def test_prune_skips_versions_used_within_grace(tmp_path):
+    store = SharedStore(str(tmp_path))
+    for version in ("velha", "em-uso", "atual"):
+        store.text("cubo", version, "cubo", lambda: "x")
+    old = time.time() - 3600
+    for version in ("velha", "em-uso"):
+        os.utime(tmp_path / "cubo" / version, (old, old))
+    assert store.text("cubo", "em-uso", "cubo", lambda: None) == "x"
+
+    store.prune("cubo", keep="atual", grace=600)
+    assert sorted(os.listdir(tmp_path / "cubo")) == ["atual", "em-uso"]
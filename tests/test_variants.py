@@ -0,0 +1,19 @@
+# Variantes responsivas das imagens (pnad.variants)
+import os
+
+from PIL import Image
+
+from pnad.variants import VariantManifest, build_all
+
+
+def test_picture_keeps_aspect_ratio(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("graficos")
+    Image.new("RGB", (1991, 690), "white").save("graficos/graf3.png")
+    manifest, rebuilt = build_all(["graficos/graf3.png"], variants_dir="variants")
+    assert rebuilt == ["graficos/graf3.png"]
+    assert build_all(["graficos/graf3.png"], variants_dir="variants")[1] == []
+
+    html = VariantManifest("variants").picture_html("graficos/graf3.png", "Gráfico", "graf", "fallback.png")
+    assert 'width="1991" height="690"' in html
+    assert "aspect-ratio: 1991 / 690; height: auto" in html
@@ -0,0 +1,101 @@
+# Estimativas ponderadas (pnad.weighted) contra o cálculo direto, com a
+# variável linearizada z de cada estimativa
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_extract
+from pnad.cube import build_cube
+from pnad.weighted import PESO, weighted_aggregates
+
+
+@pytest.fixture(scope="module")
+def extrato():
+    return make_extract(8_000, seed=5)
+
+
+@pytest.fixture(scope="module")
+def aggregates(extrato):
+    return weighted_aggregates(
+        extrato, ("sexo", "sigla_uf"), categoricas=["home_office"], numericas=["renda"], weight=PESO
+    )
+
+
+# Variância com reposição de um total de z: n / (n - 1) Σ (z - média)²
+def _variance(z):
+    return len(z) * np.var(z, ddof=1)
+
+
+def test_population_and_totals(extrato, aggregates):
+    w = extrato[PESO].to_numpy()
+    domain = (extrato["sexo"] == "mulher").to_numpy()
+    result = aggregates.population("sexo").loc["mulher"]
+    assert result["estimativa"] == pytest.approx(w[domain].sum())
+    assert result["erro_padrao"] == pytest.approx(np.sqrt(_variance(w * domain)))
+
+    y = extrato["renda"].fillna(0).to_numpy()
+    result = aggregates.totals("renda", "sexo").loc["mulher"]
+    assert result["estimativa"] == pytest.approx((w * y)[domain].sum())
+    assert result["erro_padrao"] == pytest.approx(np.sqrt(_variance(w * y * domain)))
+
+
+def test_proportions(extrato, aggregates):
+    w = extrato[PESO].to_numpy()
+    domain = (extrato["sigla_uf"] == "SP").to_numpy()
+    y = (extrato["home_office"] == "Sim").to_numpy()
+    total = w[domain].sum()
+    p = (w * y)[domain].sum() / total
+    z = domain * w * (y - p) / total
+
+    result = aggregates.proportions("home_office", "sigla_uf").loc[("SP", "Sim")]
+    assert result["estimativa"] == pytest.approx(p)
+    assert result["erro_padrao"] == pytest.approx(np.sqrt(_variance(z)))
+    assert result["n"] == domain.sum()
+
+
+def test_means(extrato, aggregates):
+    w = extrato[PESO].to_numpy()
+    renda = extrato["renda"].to_numpy()
+    domain = ((extrato["sexo"] == "homem") & (extrato["sigla_uf"] == "BA")).to_numpy() & ~np.isnan(renda)
+    y = np.nan_to_num(renda)
+    total = w[domain].sum()
+    mean = (w * y)[domain].sum() / total
+    z = domain * w * (y - mean) / total
+
+    result = aggregates.means("renda", "sexo", "sigla_uf").loc[("homem", "BA")]
+    assert result["estimativa"] == pytest.approx(mean)
+    assert result["erro_padrao"] == pytest.approx(np.sqrt(_variance(z)))
+
+
+# Somas de duas partes (merge) dão as mesmas estimativas do extrato inteiro
+def test_merge_matches_single_pass(extrato, aggregates):
+    parts = [extrato[extrato["mes"] == 5], extrato[extrato["mes"] != 5]]
+    merged = weighted_aggregates(parts[0], ("sexo", "sigla_uf"), ["home_office"], ["renda"]).merge(
+        weighted_aggregates(parts[1], ("sexo", "sigla_uf"), ["home_office"], ["renda"])
+    )
+    for method, args in [("proportions", ("home_office", "sigla_uf")), ("means", ("renda", "sexo"))]:
+        pd.testing.assert_frame_equal(
+            getattr(merged, method)(*args).sort_index(), getattr(aggregates, method)(*args).sort_index()
+        )
+
+
+# As medidas ponderadas do cubo (Cube.weighted) dão as mesmas estimativas,
+# também depois de um filtro e de um merge
+def test_cube_weighted_matches_estimates(extrato, aggregates):
+    cube = build_cube(extrato[extrato["mes"] != 6]).merge(build_cube(extrato[extrato["mes"] == 6]))
+    weighted = cube.weighted()
+    np.testing.assert_allclose(
+        weighted.rollup("sexo")["n"].sort_index(), aggregates.population("sexo")["estimativa"].sort_index()
+    )
+    np.testing.assert_allclose(
+        weighted.income("sexo", "sigla_uf")["media"].sort_index(),
+        aggregates.means("renda", "sexo", "sigla_uf")["estimativa"].dropna().sort_index(),
+    )
+
+    shares = cube.filter(sigla_uf=["SP", "BA"]).weighted().shares("home_office", "sigla_uf") / 100
+    expected = aggregates.proportions("home_office", "sigla_uf")["estimativa"].unstack()
+    np.testing.assert_allclose(shares.loc[["SP", "BA"]], expected.loc[["SP", "BA"], shares.columns])
+
+    total = weighted.income_distribution().counts().sum()
+    assert total == pytest.approx(extrato.loc[extrato["renda"].notna(), PESO].sum())
+    assert not build_cube(extrato.drop(columns=PESO)).has_weights